@@ -1,21 +1,74 @@
 from __future__ import annotations
 
 import asyncio
-import json
-from typing import AsyncGenerator
+import math
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncGenerator, AsyncIterator, Dict, List, Literal, Optional
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from core.config import AppSettings, get_settings
-from core.schemas import ComplaintAnalysis, ComplaintPayload, StreamChunk
-from core.services.logging import setup_logging
+from core.config import get_settings
+from core.schemas import BatchRequest, ComplaintAnalysis, ComplaintPayload, JobInfo, StreamChunk
+from core.services.batch import run_batch
+from core.services.jobs import SUCCEEDED, Job, JobStore, JobWorkerPool
+from core.services.logging import get_logger, setup_logging
+from core.services.metrics import CONTENT_TYPE, REGISTRY
 from core.services.orchestrator import ComplaintOrchestrator
+from core.services.transport import CircuitOpenError, LLMBackpressureError
 
 setup_logging()
+logger = get_logger(__name__)
 
-app = FastAPI(title="AI Complaint Agent", version="0.1.0")
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"]
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to response headers; streaming bodies continue after this.",
+    ["method", "route"],
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the orchestrator (and its LLM client) and the job workers once per process."""
+    settings = get_settings()
+    orchestrator = ComplaintOrchestrator(settings=settings)
+    await orchestrator.astart()
+    app.state.orchestrator = orchestrator
+    app.state.jobs = store = settings.build_job_store()
+    app.state.job_workers = workers = None
+    if store is not None:
+        app.state.job_workers = workers = JobWorkerPool(
+            store,
+            lambda payload: _run_job(orchestrator, payload),
+            workers=settings.jobs_workers,
+            visibility_timeout=settings.jobs_visibility_timeout_seconds,
+            max_attempts=settings.jobs_max_attempts,
+            retry_backoff_seconds=settings.jobs_retry_backoff_seconds,
+            poll_interval=settings.jobs_poll_interval_seconds,
+        )
+        workers.start()
+    try:
+        yield
+    finally:
+        if workers is not None:
+            await workers.stop()
+        if store is not None:
+            store.close()
+        await orchestrator.aclose()
+
+
+async def _run_job(orchestrator: ComplaintOrchestrator, payload: str) -> str:
+    analysis = await orchestrator.aanalyze_structured(ComplaintPayload.model_validate_json(payload))
+    return analysis.model_dump_json()
+
+
+app = FastAPI(title="AI Complaint Agent", version="0.1.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -25,48 +78,218 @@ app.add_middleware(
 )
 
 
-def get_orchestrator(settings: AppSettings = Depends(get_settings)) -> ComplaintOrchestrator:
-    return ComplaintOrchestrator(settings=settings)
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # The route template keeps label cardinality bounded (no ids in paths).
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(request.method, route, str(status))
+        HTTP_LATENCY.observe(request.method, route, value=time.perf_counter() - started)
+
+
+def get_orchestrator(request: Request) -> ComplaintOrchestrator:
+    return request.app.state.orchestrator
 
 
 @app.get("/health")
-async def health() -> dict:
-    return {"status": "ok"}
+async def health(request: Request) -> dict:
+    status: dict = {"status": "ok"}
+    orchestrator = getattr(request.app.state, "orchestrator", None)
+    if orchestrator is not None and hasattr(orchestrator.llm, "stats"):
+        status["llm"] = orchestrator.llm.stats()
+    if orchestrator is not None and len(orchestrator.clients) > 1:
+        status["llm_models"] = {stage: getattr(llm, "model", "") for stage, llm in orchestrator.llms.items()}
+    if orchestrator is not None:
+        status["llm_calls"] = orchestrator.caller.stats()
+    if orchestrator is not None and orchestrator.cache is not None:
+        status["cache"] = orchestrator.cache.stats()
+    if orchestrator is not None and orchestrator.dedup is not None:
+        status["dedup"] = orchestrator.dedup.stats()
+    if orchestrator is not None and orchestrator.singleflight is not None:
+        status["coalesce"] = orchestrator.singleflight.stats()
+    if orchestrator is not None and orchestrator.router is not None:
+        status["router"] = {"fastpath": orchestrator.router_hits, "llm": orchestrator.router_misses}
+    if orchestrator is not None and hasattr(orchestrator.classifier, "stats"):
+        status["classification_batching"] = orchestrator.classifier.stats()
+    if orchestrator is not None and orchestrator.compactor is not None:
+        status["context_tokens"] = dict(orchestrator.context_tokens)
+    jobs = getattr(request.app.state, "jobs", None)
+    if jobs is not None:
+        status["jobs"] = await asyncio.to_thread(jobs.stats)
+    return status
+
+
+def _collect_component_metrics(orchestrator: ComplaintOrchestrator) -> None:
+    """Copy totals and levels owned by other components into the registry."""
+    # Two clients may use the same model with different settings; the stages they serve are unique.
+    stages: Dict[int, List[str]] = {}
+    for stage, llm in orchestrator.llms.items():
+        stages.setdefault(id(llm), []).append(stage)
+    gauge = REGISTRY.gauge("llm_gate", "In-flight gate levels.", ["client", "field"])
+    state = REGISTRY.gauge("llm_circuit_state", "1 for the breaker's current state.", ["client", "state"])
+    for llm in orchestrator.clients:
+        stats = llm.stats() if hasattr(llm, "stats") else {}
+        client = "+".join(stages[id(llm)])
+        for field in ("limit", "in_flight", "waiting"):
+            if field in stats:
+                gauge.set(client, field, value=stats[field])
+        breaker = stats.get("breaker")
+        if breaker is not None:
+            for name in ("closed", "half_open", "open"):
+                state.set(client, name, value=1 if breaker["state"] == name else 0)
+
+    calls = REGISTRY.counter("llm_call_events_total", "Retries, timeouts and hedges.", ["event"])
+    caller = orchestrator.caller.stats()
+    for event in ("retries", "timeouts", "hedges_fired", "hedges_won"):
+        calls.set_total(event, value=caller[event])
+
+    if orchestrator.cache is not None:
+        cache = orchestrator.cache.stats()
+        lookups = REGISTRY.counter("llm_cache_lookups_total", "Response cache lookups by result.", ["result"])
+        for result in ("memory_hits", "disk_hits", "misses"):
+            lookups.set_total(result, value=cache[result])
+    if orchestrator.dedup is not None:
+        dedup = orchestrator.dedup.stats()
+        lookups = REGISTRY.counter("dedup_lookups_total", "Near-duplicate lookups by result.", ["result"])
+        lookups.set_total("hit", value=dedup["hits"])
+        lookups.set_total("miss", value=dedup["misses"])
+    if orchestrator.singleflight is not None:
+        coalesce = orchestrator.singleflight.stats()
+        shared = REGISTRY.counter("coalesced_requests_total", "Requests by coalescing role.", ["role"])
+        shared.set_total("leader", value=coalesce["leaders"])
+        shared.set_total("follower", value=coalesce["followers"])
+    if orchestrator.compactor is not None:
+        context = REGISTRY.counter("context_tokens_total", "Estimated upstream context tokens.", ["kind"])
+        for kind, value in orchestrator.context_tokens.items():
+            context.set_total(kind, value=value)
+
+
+@app.get("/metrics")
+async def metrics(request: Request) -> PlainTextResponse:
+    orchestrator = getattr(request.app.state, "orchestrator", None)
+    if orchestrator is not None:
+        _collect_component_metrics(orchestrator)
+    jobs = getattr(request.app.state, "jobs", None)
+    if jobs is not None:
+        gauge = REGISTRY.gauge("jobs", "Jobs in the durable queue by status.", ["status"])
+        for status, count in (await asyncio.to_thread(jobs.stats)).items():
+            gauge.set(status, value=count)
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+PipelineMode = Literal["multi_agent", "fused"]
 
 
 @app.post("/analyze", response_model=ComplaintAnalysis)
-async def analyze(payload: ComplaintPayload, orchestrator: ComplaintOrchestrator = Depends(get_orchestrator)):
-    return await orchestrator.aanalyze(payload)
+async def analyze(
+    payload: ComplaintPayload,
+    orchestrator: ComplaintOrchestrator = Depends(get_orchestrator),
+) -> ComplaintAnalysis:
+    try:
+        return await orchestrator.aanalyze_structured(payload)
+    except ValueError as exc:  # the model's JSON stayed invalid after repair
+        logger.warning("analyze.structured.failed", error=str(exc)[:200])
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    except CircuitOpenError as exc:
+        retry_after = str(max(1, math.ceil(exc.retry_after)))
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": retry_after}) from exc
+    except LLMBackpressureError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"}) from exc
+    except asyncio.TimeoutError as exc:
+        raise HTTPException(status_code=504, detail="The LLM provider did not answer in time.") from exc
 
 
 @app.post("/analyze/stream")
 async def analyze_stream(
     payload: ComplaintPayload,
+    mode: Optional[PipelineMode] = Query(default=None),
     orchestrator: ComplaintOrchestrator = Depends(get_orchestrator),
 ) -> StreamingResponse:
     async def event_stream() -> AsyncGenerator[bytes, None]:
-        analysis = await orchestrator.aanalyze(payload)
-        sections = [
-            ("summary", analysis.summary),
-            ("emotions", json.dumps(analysis.emotions, ensure_ascii=False)),
-            ("strategy", json.dumps([step.model_dump() for step in analysis.strategy], ensure_ascii=False)),
-            ("formal_reply", analysis.formal_reply),
-            (
-                "meta",
-                json.dumps(
-                    {
-                        "category": analysis.category.value,
-                        "risk_level": analysis.risk_level,
-                        "confidence": analysis.router.confidence,
-                    },
-                    ensure_ascii=False,
-                ),
-            ),
-        ]
-        for section, payload_text in sections:
-            chunk = StreamChunk(section=section, payload=payload_text)
+        try:
+            async for chunk in orchestrator.astream(payload, mode=mode):
+                yield (chunk.model_dump_json() + "\n").encode("utf-8")
+        except Exception as exc:  # headers are already sent; report in-band
+            logger.exception("analyze.stream.failed")
+            chunk = StreamChunk(section="error", payload=str(exc))
             yield (chunk.model_dump_json() + "\n").encode("utf-8")
-            await asyncio.sleep(0)
 
-    return StreamingResponse(event_stream(), media_type="application/json")
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    batch: BatchRequest,
+    mode: Optional[PipelineMode] = Query(default=None),
+    concurrency: Optional[int] = Query(default=None, ge=1),
+    orchestrator: ComplaintOrchestrator = Depends(get_orchestrator),
+) -> StreamingResponse:
+    """Analyze many complaints, streaming one NDJSON line per item as it finishes."""
+    settings = orchestrator.settings
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(batch.items)} items; the limit is {settings.batch_max_items}.",
+        )
+    limit = min(concurrency or settings.batch_concurrency, settings.batch_concurrency)
+
+    async def result_stream() -> AsyncGenerator[bytes, None]:
+        logger.info("analyze.batch.start", items=len(batch.items), concurrency=limit)
+        async for result in run_batch(orchestrator, batch.items, concurrency=limit, mode=mode):
+            yield (result.model_dump_json() + "\n").encode("utf-8")
+        logger.info("analyze.batch.end", items=len(batch.items))
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+def get_job_store(request: Request) -> JobStore:
+    store = getattr(request.app.state, "jobs", None)
+    if store is None:
+        raise HTTPException(status_code=503, detail="The job queue is disabled (JOBS_ENABLED=false).")
+    return store
+
+
+def _job_info(job: Job) -> JobInfo:
+    result = None
+    if job.status == SUCCEEDED and job.result:
+        result = ComplaintAnalysis.model_validate_json(job.result)
+    return JobInfo(
+        id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        created_at=datetime.fromtimestamp(job.created_at, tz=timezone.utc),
+        updated_at=datetime.fromtimestamp(job.updated_at, tz=timezone.utc),
+        result=result,
+        error=job.error,
+    )
+
+
+@app.post("/jobs", response_model=JobInfo, status_code=202)
+async def create_job(
+    payload: ComplaintPayload,
+    request: Request,
+    response: Response,
+    store: JobStore = Depends(get_job_store),
+) -> JobInfo:
+    """Queue a structured analysis and return its id at once; poll ``GET /jobs/{id}``."""
+    job = await asyncio.to_thread(store.enqueue, payload.model_dump_json())
+    workers = getattr(request.app.state, "job_workers", None)
+    if workers is not None:
+        workers.notify()
+    logger.info("jobs.enqueued", job=job.id)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return _job_info(job)
+
 
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str, store: JobStore = Depends(get_job_store)) -> JobInfo:
+    job = await asyncio.to_thread(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return _job_info(job)
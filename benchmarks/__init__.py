@@ -0,0 +1 @@
+"""Offline throughput and latency benchmarks that need no provider API key."""
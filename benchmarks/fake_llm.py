@@ -0,0 +1,109 @@
+"""A stand-in LLM whose latency and output length follow a configurable distribution."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Mapping, Optional
+
+_WORDS = (
+    "نعتذر عن التأخير وسنتابع الطلب مع فريق الشحن ونبلغكم بالنتيجة خلال يوم عمل "
+    "ونقدر صبركم وتواصلكم معنا ونعمل على تحسين الخدمة وتعويضكم بما يناسب"
+).split()
+
+
+@dataclass
+class FakeLLMProfile:
+    """Time to first token is log-normal around ``latency_ms``; then tokens arrive at ``tokens_per_second``."""
+
+    latency_ms: float = 600.0
+    latency_sigma: float = 0.4
+    output_tokens: int = 180
+    output_sigma: float = 0.3
+    tokens_per_second: float = 120.0
+    error_rate: float = 0.0
+    seed: Optional[int] = 7
+
+
+class FakeLLM:
+    """Implements the LLM surface the agents use: ``complete``, ``acomplete`` and ``astream``.
+
+    Replies are shaped after the prompt so downstream parsing works: the fused
+    prompt gets four section headers and a response schema gets valid JSON.
+    """
+
+    provider = "fake"
+    model = "fake-llm"
+    temperature = 0.0
+
+    def __init__(self, profile: Optional[FakeLLMProfile] = None) -> None:
+        self.profile = profile or FakeLLMProfile()
+        self._rng = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _sample(self) -> tuple[float, float, int]:
+        profile = self.profile
+        with self._lock:
+            self.calls += 1
+            first = profile.latency_ms / 1000 * math.exp(self._rng.gauss(0, profile.latency_sigma))
+            tokens = max(1, int(profile.output_tokens * math.exp(self._rng.gauss(0, profile.output_sigma))))
+            failed = self._rng.random() < profile.error_rate
+        if failed:
+            raise ConnectionError("fake provider error")
+        return first, tokens / max(profile.tokens_per_second, 1e-9), tokens
+
+    def _text(self, prompt: str, tokens: int, response_schema: Optional[Mapping[str, Any]]) -> str:
+        words = " ".join(_WORDS[i % len(_WORDS)] for i in range(max(1, int(tokens / 1.5))))
+        if response_schema is not None:
+            return json.dumps(
+                {
+                    "category": "delivery_issue",
+                    "confidence": 0.8,
+                    "rationale": "تأخر التوصيل",
+                    "summary": words[:120],
+                    "emotions": ["غضب", "إحباط"],
+                    "risk_level": "medium",
+                    "strategy": [
+                        {
+                            "action_title": f"الخطوة {step}",
+                            "owner_role": "فريق خدمة العملاء",
+                            "timeline": "خلال 24 ساعة",
+                            "success_metric": "تأكيد العميل",
+                        }
+                        for step in range(1, 4)
+                    ],
+                    "formal_reply": words,
+                },
+                ensure_ascii=False,
+            )
+        if "٤. الرد الرسمي" in prompt:
+            quarter = max(1, len(words) // 4)
+            body = [words[i * quarter : (i + 1) * quarter] or "—" for i in range(4)]
+            titles = ("١. التصنيف", "٢. فهم المشاعر", "٣. خطة المعالجة", "٤. الرد الرسمي")
+            return "\n".join(f"{title}\n{text}" for title, text in zip(titles, body))
+        return words
+
+    def complete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        first, rest, tokens = self._sample()
+        time.sleep(first + rest)
+        return SimpleNamespace(text=self._text(prompt, tokens, response_schema))
+
+    async def acomplete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        first, rest, tokens = self._sample()
+        await asyncio.sleep(first + rest)
+        return SimpleNamespace(text=self._text(prompt, tokens, response_schema))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        first, rest, tokens = self._sample()
+        await asyncio.sleep(first)
+        lines = self._text(prompt, tokens, None).splitlines(keepends=True)
+        for line in lines:
+            await asyncio.sleep(rest / len(lines))
+            yield line
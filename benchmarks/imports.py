@@ -0,0 +1,153 @@
+"""Measure cold-start import time of the API and the Streamlit UI.
+
+Each sample is a fresh interpreter run with ``-X importtime``, so nothing is
+cached in ``sys.modules``. The report has the median wall time of the
+imports and the import time per top-level package, largest first.
+
+Usage::
+
+    python -m benchmarks.imports
+    python -m benchmarks.imports --target api --repeat 10 --top 15 -o imports.json
+    python -m benchmarks.imports --module core.services.orchestrator
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def script_imports(path: Path) -> List[str]:
+    """Modules a script imports at top level, without executing the script."""
+    modules: List[str] = []
+    for node in ast.parse(path.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+TARGETS = {
+    "api": lambda: ["backend.main"],
+    # Running the script itself would start rendering; its imports are the cold-start cost.
+    "ui": lambda: script_imports(ROOT / "frontend" / "app.py"),
+}
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of ``-X importtime`` output as name, depth, self and cumulative microseconds."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append(
+            {"name": name.strip(), "depth": depth, "self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+        )
+    return rows
+
+
+def sample(modules: Sequence[str]) -> Dict[str, Any]:
+    """Import ``modules`` in a fresh interpreter and return its importtime rows and wall time."""
+    code = (
+        "import time; started = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "print(time.perf_counter() - started)"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        last = completed.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(last[0])
+    return {"wall_seconds": float(completed.stdout.strip().splitlines()[-1]), "rows": parse_importtime(completed.stderr)}
+
+
+def by_package(rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """Self time summed per top-level package, in microseconds."""
+    totals: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        totals[row["name"].split(".")[0]] += row["self_us"]
+    return dict(totals)
+
+
+def profile(modules: Sequence[str], repeat: int, top: int) -> Dict[str, Any]:
+    runs = [sample(modules) for _ in range(repeat)]
+    packages: Dict[str, List[int]] = defaultdict(list)
+    for run in runs:
+        for package, micros in by_package(run["rows"]).items():
+            packages[package].append(micros)
+    heaviest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:top]
+    walls = [run["wall_seconds"] for run in runs]
+    return {
+        "modules": list(modules),
+        "repeat": repeat,
+        "wall_ms": {
+            "median": round(statistics.median(walls) * 1000, 1),
+            "min": round(min(walls) * 1000, 1),
+            "max": round(max(walls) * 1000, 1),
+        },
+        "modules_loaded": len(runs[-1]["rows"]),
+        "packages_ms": {package: round(statistics.median(micros) / 1000, 1) for package, micros in heaviest},
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.imports", description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=sorted(TARGETS), action="append", help="Default: all targets.")
+    parser.add_argument("--module", action="append", default=[], help="Profile an arbitrary module instead.")
+    parser.add_argument("--repeat", "-n", type=int, default=5, help="Fresh interpreters per target.")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list per target.")
+    parser.add_argument("--output", "-o", help="Write the JSON report here instead of stdout.")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.module:
+        targets = {module: [module] for module in args.module}
+    else:
+        targets = {name: TARGETS[name]() for name in args.target or sorted(TARGETS)}
+
+    results: Dict[str, Any] = {}
+    for name, modules in targets.items():
+        try:
+            results[name] = profile(modules, args.repeat, args.top)
+        except RuntimeError as exc:  # e.g. streamlit is not installed in this environment
+            results[name] = {"modules": modules, "error": str(exc)}
+            print(f"{name}: {exc}", file=sys.stderr)
+            continue
+        print(f"{name}: median {results[name]['wall_ms']['median']}ms", file=sys.stderr)
+
+    report = {
+        "targets": results,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
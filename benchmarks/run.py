@@ -0,0 +1,240 @@
+"""Drive the orchestrator or the API against ``FakeLLM`` and report JSON.
+
+Usage::
+
+    python -m benchmarks.run --target orchestrator --concurrency 1,8,32 --requests 200
+    python -m benchmarks.run --target api --endpoint stream --latency-ms 300 -o bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.fake_llm import FakeLLM, FakeLLMProfile
+from core.config import AppSettings
+from core.schemas import CompanyDetails, ComplaintPayload
+from core.services.orchestrator import ComplaintOrchestrator
+
+_COMPLAINTS = (
+    "طلبت شحنة غذاء وتأخر السائق {n} ساعة ولم يرد على الاتصالات.",
+    "تم خصم المبلغ مرتين من بطاقتي في الطلب رقم {n} ولم يصلني أي رد.",
+    "التطبيق يتوقف عند الدفع منذ التحديث الأخير، حاولت {n} مرات دون فائدة.",
+    "أريد استرجاع المنتج رقم {n} لأنه وصل تالفًا والتغليف ممزق.",
+)
+
+# Benchmarks measure pipeline code, so shortcuts that skip it are off by default.
+DEFAULT_OVERRIDES = {
+    "LLM_WARMUP": False,
+    "DEDUP_ENABLED": False,
+    "COALESCE_ENABLED": False,
+    "LLM_CACHE_ENABLED": False,
+}
+
+
+def build_payloads(count: int) -> List[ComplaintPayload]:
+    """Distinct complaints so no cache or dedup layer can answer from memory."""
+    return [
+        ComplaintPayload(
+            complaint_text=_COMPLAINTS[index % len(_COMPLAINTS)].format(n=index + 1),
+            company=CompanyDetails(name="سريع", service="توصيل المنازل"),
+        )
+        for index in range(count)
+    ]
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], errors: int, wall: float, concurrency: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 2)  # noqa: E731
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "mean": to_ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            "p50": to_ms(percentile(ordered, 0.50)),
+            "p90": to_ms(percentile(ordered, 0.90)),
+            "p95": to_ms(percentile(ordered, 0.95)),
+            "p99": to_ms(percentile(ordered, 0.99)),
+            "max": to_ms(ordered[-1]) if ordered else 0.0,
+        },
+    }
+
+
+async def drive(
+    call: Callable[[ComplaintPayload], Awaitable[Any]],
+    payloads: Sequence[ComplaintPayload],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Run ``call`` over ``payloads`` with ``concurrency`` workers and summarize."""
+    queue: asyncio.Queue[ComplaintPayload] = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            payload = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await call(payload)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+
+def build_orchestrator(profile: FakeLLMProfile, overrides: Dict[str, Any]) -> ComplaintOrchestrator:
+    settings = AppSettings(**{**DEFAULT_OVERRIDES, **overrides})
+    return ComplaintOrchestrator(settings=settings, llm=FakeLLM(profile))
+
+
+def _orchestrator_call(orchestrator: ComplaintOrchestrator, args: argparse.Namespace):
+    if args.endpoint == "analyze":
+        return orchestrator.aanalyze_structured
+    if args.endpoint == "stream":
+
+        async def consume(payload: ComplaintPayload) -> None:
+            async for _ in orchestrator.astream(payload, mode=args.mode):
+                pass
+
+        return consume
+    return lambda payload: orchestrator.aanalyze(payload, mode=args.mode)
+
+
+def _api_call(client, args: argparse.Namespace):
+    async def call(payload: ComplaintPayload) -> None:
+        body = payload.model_dump()
+        if args.endpoint == "stream":
+            params = {"mode": args.mode} if args.mode else {}
+            async with client.stream("POST", "/analyze/stream", json=body, params=params) as response:
+                response.raise_for_status()
+                async for _ in response.aiter_lines():
+                    pass
+            return
+        response = await client.post("/analyze", json=body)
+        response.raise_for_status()
+
+    return call
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    profile = FakeLLMProfile(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        output_tokens=args.output_tokens,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    overrides = dict(item.split("=", 1) for item in args.set)
+    results = []
+    for concurrency in args.concurrency:
+        # A fresh orchestrator per level keeps warm state from skewing the next one.
+        orchestrator = build_orchestrator(profile, overrides)
+        payloads = build_payloads(args.requests)
+        try:
+            if args.target == "api":
+                import httpx
+
+                from backend.main import app
+
+                # ASGITransport skips the lifespan, so install the fake-backed orchestrator.
+                app.state.orchestrator = orchestrator
+                transport = httpx.ASGITransport(app=app)
+                try:
+                    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                        result = await drive(_api_call(client, args), payloads, concurrency)
+                finally:
+                    del app.state.orchestrator
+            else:
+                result = await drive(_orchestrator_call(orchestrator, args), payloads, concurrency)
+        finally:
+            await orchestrator.aclose()
+        result["llm_calls"] = orchestrator.llm.calls
+        results.append(result)
+        print(
+            f"concurrency={concurrency} rps={result['throughput_rps']} "
+            f"p50={result['latency_ms']['p50']}ms p99={result['latency_ms']['p99']}ms errors={result['errors']}",
+            file=sys.stderr,
+        )
+
+    return {
+        "target": args.target,
+        "endpoint": args.endpoint,
+        "mode": args.mode,
+        "profile": vars(profile),
+        "overrides": {**DEFAULT_OVERRIDES, **overrides},
+        "results": results,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=["orchestrator", "api"], default="orchestrator")
+    parser.add_argument(
+        "--endpoint",
+        choices=["text", "analyze", "stream"],
+        default="text",
+        help="text = aanalyze (orchestrator only), analyze = structured JSON, stream = NDJSON stream.",
+    )
+    parser.add_argument("--mode", choices=["multi_agent", "fused"], help="Pipeline mode for text/stream.")
+    parser.add_argument("--concurrency", "-c", type=_int_list, default=[1, 4, 16], help="Comma-separated levels.")
+    parser.add_argument("--requests", "-n", type=int, default=100, help="Requests per concurrency level.")
+    parser.add_argument("--latency-ms", type=float, default=600.0, help="Median time to first token.")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal spread of that latency.")
+    parser.add_argument("--output-tokens", type=int, default=180)
+    parser.add_argument("--tokens-per-second", type=float, default=120.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="AppSettings override.")
+    parser.add_argument("--output", "-o", help="Write the JSON report here instead of stdout.")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.target == "api" and args.endpoint == "text":
+        args.endpoint = "analyze"
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,26 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+import time
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+from core.services.cache import ResponseCache, make_cache_key
+from core.services.compaction import estimate_tokens
+from core.services.metrics import REGISTRY, TOKEN_BUCKETS
+from core.services.resilience import ResilientCaller
+
+TokenSink = Callable[[str], None]
+
+AGENT_CALLS = REGISTRY.counter("agent_calls_total", "Agent calls by outcome.", ["agent", "outcome"])
+AGENT_LATENCY = REGISTRY.histogram(
+    "agent_call_duration_seconds", "Agent call latency, including retries and hedges.", ["agent"]
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "agent_prompt_tokens", "Estimated prompt tokens per agent call.", ["agent"], buckets=TOKEN_BUCKETS
+)
+COMPLETION_TOKENS = REGISTRY.histogram(
+    "agent_completion_tokens", "Estimated completion tokens per agent call.", ["agent"], buckets=TOKEN_BUCKETS
+)
 
 
 class LlamaIndexAgent:
@@ -14,22 +33,152 @@ class LlamaIndexAgent:
         llm: Any,
         system_prompt: str,
         verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        name: str = "agent",
+        caller: Optional[ResilientCaller] = None,
     ) -> None:
         self.llm = llm
         self.system_prompt = system_prompt
         self.verbose = verbose
+        self.cache = cache
+        self.name = name
+        self.caller = caller
+
+    async def achat(
+        self,
+        message: str,
+        on_token: Optional[TokenSink] = None,
+        *,
+        response_schema: Optional[Mapping[str, Any]] = None,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """Chat with the agent asynchronously.
 
-    async def achat(self, message: str) -> str:
-        """Chat with the agent asynchronously."""
-        full_prompt = f"{self.system_prompt}\n\n{message}"
-        result = await self.llm.acomplete(full_prompt)
+        When ``on_token`` is given and the LLM exposes ``astream``, each text
+        delta is forwarded as soon as it arrives; otherwise the whole reply is
+        forwarded once it is complete. ``response_schema`` asks the provider
+        for JSON constrained to that schema and disables streaming.
+
+        ``validate`` raises ``ValueError`` for replies that must not be cached;
+        they are still returned so the caller can repair them, and cached
+        entries that fail it are dropped.
+
+        With a ``caller``, each attempt runs under the stage's deadline and
+        transient errors are retried. Streams are never hedged and are only
+        retried while no token has been forwarded yet.
+        """
+        full_prompt = self._build_prompt(message)
+        key = self._cache_key(full_prompt, response_schema)
+        if key is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None and not self._is_valid(cached, validate):
+                await self.cache.adelete(key)
+                cached = None
+            if cached is not None:
+                AGENT_CALLS.inc(self.name, "cache_hit")
+                if on_token is not None:
+                    on_token(cached)
+                return cached
+
+        started = time.perf_counter()
+        try:
+            text = await self._agenerate(full_prompt, on_token, response_schema)
+        except Exception:
+            AGENT_CALLS.inc(self.name, "error")
+            raise
+        AGENT_CALLS.inc(self.name, "ok")
+        AGENT_LATENCY.observe(self.name, value=time.perf_counter() - started)
+        PROMPT_TOKENS.observe(self.name, value=estimate_tokens(full_prompt))
+        COMPLETION_TOKENS.observe(self.name, value=estimate_tokens(text))
+
+        if key is not None and text and self._is_valid(text, validate):
+            await self.cache.aset(key, text)
+        return text
+
+    @staticmethod
+    def _is_valid(text: str, validate: Optional[Callable[[str], Any]]) -> bool:
+        if validate is None:
+            return True
+        try:
+            validate(text)
+        except ValueError:
+            return False
+        return True
+
+    async def _agenerate(
+        self,
+        full_prompt: str,
+        on_token: Optional[TokenSink],
+        response_schema: Optional[Mapping[str, Any]],
+    ) -> str:
+        if on_token is not None and response_schema is None and hasattr(self.llm, "astream"):
+            parts = []
+
+            async def stream() -> str:
+                async for piece in self.llm.astream(full_prompt):
+                    if piece:
+                        parts.append(piece)
+                        on_token(piece)
+                return "".join(parts).strip()
+
+            text = await self._call(stream, hedge=False, can_retry=lambda: not parts)
+        else:
+            text = await self._call(lambda: self._acomplete(full_prompt, response_schema))
+            if on_token is not None and text:
+                on_token(text)
+        return text
+
+    async def _acomplete(self, full_prompt: str, response_schema: Optional[Mapping[str, Any]]) -> str:
+        if response_schema is None:
+            result = await self.llm.acomplete(full_prompt)
+        else:
+            result = await self.llm.acomplete(full_prompt, response_schema=response_schema)
         return self._extract_text(result)
 
+    async def _call(self, factory: Callable[[], Awaitable[str]], **options: Any) -> str:
+        if self.caller is None:
+            return await factory()
+        return await self.caller.call(self.name, factory, **options)
+
     def chat(self, message: str) -> str:
-        """Chat with the agent synchronously."""
-        full_prompt = f"{self.system_prompt}\n\n{message}"
+        """Chat with the agent synchronously.
+
+        Async-only clients (``OpenAICompatibleLLM``) raise ``NotImplementedError``;
+        use ``achat`` with them.
+        """
+        full_prompt = self._build_prompt(message)
+        key = self._cache_key(full_prompt)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         result = self.llm.complete(full_prompt)
-        return self._extract_text(result)
+        text = self._extract_text(result)
+        if key is not None and text:
+            self.cache.set(key, text)
+        return text
+
+    def _cache_key(
+        self,
+        full_prompt: str,
+        response_schema: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_cache_key(
+            getattr(self.llm, "provider", type(self.llm).__name__),
+            getattr(self.llm, "model", ""),
+            getattr(self.llm, "temperature", None),
+            full_prompt,
+            response_schema,
+            getattr(self.llm, "max_output_tokens", None),
+        )
+
+    def _build_prompt(self, message: str) -> str:
+        """Prefix the system prompt, if any, to the user message."""
+        if not self.system_prompt:
+            return message
+        return f"{self.system_prompt}\n\n{message}"
 
     @staticmethod
     def _extract_text(raw: Any) -> str:
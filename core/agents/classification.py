@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, List, Optional
 
-from core.agents.base import LlamaIndexAgent
+from core.agents.base import LlamaIndexAgent, TokenSink
 from core.schemas import ComplaintPayload
+from core.services.cache import ResponseCache
+from core.services.resilience import ResilientCaller
 
 
 CLASSIFICATION_SYSTEM_PROMPT = """
@@ -17,14 +19,29 @@ CLASSIFICATION_SYSTEM_PROMPT = """
 class ClassificationAgent:
     """Agent that classifies the complaint type using LlamaIndex."""
 
-    def __init__(self, *, llm: Any, verbose: bool = False) -> None:
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        caller: Optional[ResilientCaller] = None,
+    ) -> None:
         self.agent_wrapper = LlamaIndexAgent(
             llm=llm,
             system_prompt=CLASSIFICATION_SYSTEM_PROMPT,
             verbose=verbose,
+            cache=cache,
+            name="classification",
+            caller=caller,
         )
 
-    async def aclassify(self, payload: ComplaintPayload) -> str:
+    async def aclassify(
+        self,
+        payload: ComplaintPayload,
+        *,
+        on_token: Optional[TokenSink] = None,
+    ) -> str:
         """Classify the complaint and return classification text."""
         message = f"""
         قم بتصنيف الشكوى التالية:
@@ -36,6 +53,29 @@ class ClassificationAgent:
         1. حدد نوع الشكوى من: (مشكلة في التوصيل | مشكلة في الدفع | مشكلة تقنية | استفسار عام | استرجاع/استبدال | أخرى)
         2. اشرح سبب التصنيف في جملة أو جملتين بالعربية.
 
+        اكتب الإجابة بالعربية فقط.
+        """
+        return await self.agent_wrapper.achat(message, on_token=on_token)
+
+    async def aclassify_many(self, payloads: List[ComplaintPayload]) -> str:
+        """Classify several complaints in one call; answers are numbered per complaint."""
+        blocks = "\n".join(
+            f"""
+        === الشكوى {index} ===
+        الشركة: {payload.company.as_label()}
+        نص الشكوى: {payload.complaint_text}
+        """
+            for index, payload in enumerate(payloads, start=1)
+        )
+        message = f"""
+        قم بتصنيف كل شكوى من الشكاوى التالية بشكل مستقل:
+        {blocks}
+
+        المطلوب لكل شكوى:
+        1. حدد نوع الشكوى من: (مشكلة في التوصيل | مشكلة في الدفع | مشكلة تقنية | استفسار عام | استرجاع/استبدال | أخرى)
+        2. اشرح سبب التصنيف في جملة أو جملتين بالعربية.
+
+        ابدأ إجابة كل شكوى بسطر مستقل بالشكل "=== الشكوى N ===" بنفس الترقيم، ولا تدمج الإجابات.
         اكتب الإجابة بالعربية فقط.
         """
         return await self.agent_wrapper.achat(message)
@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
-from core.agents.base import LlamaIndexAgent
+from core.agents.base import LlamaIndexAgent, TokenSink
 from core.schemas import ComplaintPayload
+from core.services.cache import ResponseCache
+from core.services.resilience import ResilientCaller
 
 
 EMOTION_SYSTEM_PROMPT = """
@@ -17,21 +19,37 @@ EMOTION_SYSTEM_PROMPT = """
 class EmotionAgent:
     """Agent that analyzes customer emotions using LlamaIndex."""
 
-    def __init__(self, *, llm: Any, verbose: bool = False) -> None:
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        caller: Optional[ResilientCaller] = None,
+    ) -> None:
         self.agent_wrapper = LlamaIndexAgent(
             llm=llm,
             system_prompt=EMOTION_SYSTEM_PROMPT,
             verbose=verbose,
+            cache=cache,
+            name="emotion",
+            caller=caller,
         )
 
-    async def aanalyze_emotions(self, payload: ComplaintPayload, classification: str) -> str:
+    async def aanalyze_emotions(
+        self,
+        payload: ComplaintPayload,
+        classification: Optional[str] = None,
+        *,
+        on_token: Optional[TokenSink] = None,
+    ) -> str:
         """Analyze emotions and return emotion analysis text."""
+        context = f"\nالتصنيف: {classification}" if classification else ""
         message = f"""
         قم بتحليل المشاعر في الشكوى التالية:
 
         الشركة: {payload.company.as_label()}
-        نص الشكوى: {payload.complaint_text}
-        التصنيف: {classification}
+        نص الشكوى: {payload.complaint_text}{context}
 
         المطلوب:
         1. حدد المشاعر الأساسية للعميل (مثل: غضب، إحباط، قلق، خيبة أمل، رضا، خوف)
@@ -40,4 +58,4 @@ class EmotionAgent:
 
         اكتب الإجابة بالعربية فقط.
         """
-        return await self.agent_wrapper.achat(message)
+        return await self.agent_wrapper.achat(message, on_token=on_token)
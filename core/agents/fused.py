@@ -0,0 +1,47 @@
+"""Single-call agent that produces the whole analysis in one prompt."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from core.agents.base import LlamaIndexAgent, TokenSink
+from core.prompts.templates import build_analysis_prompt
+from core.schemas import ComplaintPayload
+from core.services.cache import ResponseCache
+from core.services.resilience import ResilientCaller
+
+
+class FusedAnalysisAgent:
+    """Agent that asks for all four sections in one LLM round-trip."""
+
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        caller: Optional[ResilientCaller] = None,
+    ) -> None:
+        # build_analysis_prompt already carries the persona and output rules.
+        self.agent_wrapper = LlamaIndexAgent(
+            llm=llm,
+            system_prompt="",
+            verbose=verbose,
+            cache=cache,
+            name="fused",
+            caller=caller,
+        )
+
+    async def aanalyze(
+        self,
+        payload: ComplaintPayload,
+        *,
+        on_token: Optional[TokenSink] = None,
+    ) -> str:
+        """Run the one-shot analysis prompt and return the raw text."""
+        message = build_analysis_prompt(
+            complaint=payload.complaint_text,
+            company=payload.company.as_label(),
+            notes=payload.notes,
+        )
+        return await self.agent_wrapper.achat(message, on_token=on_token)
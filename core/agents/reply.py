@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
-from core.agents.base import LlamaIndexAgent
+from core.agents.base import LlamaIndexAgent, TokenSink
 from core.schemas import ComplaintPayload
+from core.services.cache import ResponseCache
+from core.services.resilience import ResilientCaller
 
 
 REPLY_SYSTEM_PROMPT = """
@@ -17,11 +19,21 @@ REPLY_SYSTEM_PROMPT = """
 class ReplyAgent:
     """Agent that creates formal customer reply using LlamaIndex."""
 
-    def __init__(self, *, llm: Any, verbose: bool = False) -> None:
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        caller: Optional[ResilientCaller] = None,
+    ) -> None:
         self.agent_wrapper = LlamaIndexAgent(
             llm=llm,
             system_prompt=REPLY_SYSTEM_PROMPT,
             verbose=verbose,
+            cache=cache,
+            name="reply",
+            caller=caller,
         )
 
     async def acreate_reply(
@@ -30,6 +42,8 @@ class ReplyAgent:
         classification: str,
         emotions: str,
         strategy: str,
+        *,
+        on_token: Optional[TokenSink] = None,
     ) -> str:
         """Create formal reply and return reply text."""
         extra = f"\nملاحظات إضافية: {payload.notes}" if payload.notes else ""
@@ -53,4 +67,4 @@ class ReplyAgent:
 
         اكتب الرد بالعربية فقط، واجعله 3-4 فقرات.
         """
-        return await self.agent_wrapper.achat(message)
+        return await self.agent_wrapper.achat(message, on_token=on_token)
@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
-from core.agents.base import LlamaIndexAgent
+from core.agents.base import LlamaIndexAgent, TokenSink
 from core.schemas import ComplaintPayload
+from core.services.cache import ResponseCache
+from core.services.resilience import ResilientCaller
 
 
 STRATEGY_SYSTEM_PROMPT = """
@@ -17,28 +19,40 @@ STRATEGY_SYSTEM_PROMPT = """
 class StrategyAgent:
     """Agent that creates resolution strategy using LlamaIndex."""
 
-    def __init__(self, *, llm: Any, verbose: bool = False) -> None:
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        caller: Optional[ResilientCaller] = None,
+    ) -> None:
         self.agent_wrapper = LlamaIndexAgent(
             llm=llm,
             system_prompt=STRATEGY_SYSTEM_PROMPT,
             verbose=verbose,
+            cache=cache,
+            name="strategy",
+            caller=caller,
         )
 
     async def acreate_strategy(
         self,
         payload: ComplaintPayload,
         classification: str,
-        emotions: str,
+        emotions: Optional[str] = None,
+        *,
+        on_token: Optional[TokenSink] = None,
     ) -> str:
         """Create resolution strategy and return strategy text."""
+        emotion_line = f"\nتحليل المشاعر: {emotions}" if emotions else ""
         extra = f"\nملاحظات إضافية: {payload.notes}" if payload.notes else ""
         message = f"""
         قم بإنشاء خطة حل للمشكلة التالية:
 
         الشركة: {payload.company.as_label()}
         نص الشكوى: {payload.complaint_text}
-        التصنيف: {classification}
-        تحليل المشاعر: {emotions}
+        التصنيف: {classification}{emotion_line}
         {extra}
 
         المطلوب:
@@ -50,4 +64,4 @@ class StrategyAgent:
 
         اكتب الإجابة بالعربية فقط.
         """
-        return await self.agent_wrapper.achat(message)
+        return await self.agent_wrapper.achat(message, on_token=on_token)
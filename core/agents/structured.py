@@ -0,0 +1,65 @@
+"""Single-call agent that returns the analysis as validated JSON."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from core.agents.base import LlamaIndexAgent
+from core.prompts.parsing import parse_structured
+from core.prompts.structured import ANALYSIS_SCHEMA, build_repair_prompt, build_structured_prompt
+from core.schemas import ComplaintPayload, StructuredAnalysis
+from core.services.cache import ResponseCache
+from core.services.logging import get_logger
+from core.services.resilience import ResilientCaller
+
+logger = get_logger(__name__)
+
+
+class StructuredAnalysisAgent:
+    """Agent that asks for compact JSON and parses it into ``StructuredAnalysis``."""
+
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        verbose: bool = False,
+        cache: Optional[ResponseCache] = None,
+        caller: Optional[ResilientCaller] = None,
+        max_repairs: int = 1,
+    ) -> None:
+        # build_structured_prompt already carries the persona and output rules.
+        self.agent_wrapper = LlamaIndexAgent(
+            llm=llm,
+            system_prompt="",
+            verbose=verbose,
+            cache=cache,
+            name="structured",
+            caller=caller,
+        )
+        self.max_repairs = max_repairs
+        self.repairs = 0
+
+    async def aanalyze(self, payload: ComplaintPayload) -> StructuredAnalysis:
+        """Run the JSON prompt; malformed replies get up to ``max_repairs`` fix-up calls."""
+        message = build_structured_prompt(
+            complaint=payload.complaint_text,
+            company=payload.company.as_label(),
+            notes=payload.notes,
+        )
+        # Only replies that parse are cached, so a bad one is asked for again next time.
+        raw = await self.agent_wrapper.achat(message, response_schema=ANALYSIS_SCHEMA, validate=parse_structured)
+        attempt = 0
+        while True:
+            try:
+                return parse_structured(raw)
+            except ValueError as exc:
+                if attempt >= self.max_repairs:
+                    raise ValueError(f"Structured output could not be parsed: {exc}") from exc
+                attempt += 1
+                self.repairs += 1
+                logger.warning("agent.structured.repair", attempt=attempt, error=str(exc)[:200])
+                raw = await self.agent_wrapper.achat(
+                    build_repair_prompt(raw, str(exc)[:500]),
+                    response_schema=ANALYSIS_SCHEMA,
+                    validate=parse_structured,
+                )
@@ -0,0 +1,336 @@
+"""Command-line entry points for offline work.
+
+Usage::
+
+    python -m core.cli analyze-file complaints.jsonl --output results.jsonl
+    python -m core.cli train-router labelled.jsonl --model models/router.npz
+    python -m core.cli eval-router labelled.jsonl --model models/router.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from core.config import get_settings
+from core.prompts.parsing import category_from_text, split_sections
+from core.schemas import BatchItem, CompanyDetails, ComplaintCategory, ComplaintPayload
+from core.services.batch import run_batch
+from core.services.logging import get_logger, setup_logging
+from core.services.orchestrator import ComplaintOrchestrator
+
+logger = get_logger(__name__)
+
+# fsync the output after this many results so a crash loses little work.
+_SYNC_EVERY = 50
+
+
+def iter_rows(path: Path, fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(row_number, row)`` lazily from a JSONL or CSV file."""
+    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+        if fmt == "csv":
+            for number, row in enumerate(csv.DictReader(handle), start=1):
+                yield number, row
+            return
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield number, {"__error__": f"invalid JSON: {exc}"}
+
+
+def row_to_item(number: int, row: Dict[str, Any], args: argparse.Namespace) -> BatchItem:
+    """Map an exported row onto a ``BatchItem``; raises on malformed rows."""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    company = row.get(args.company_field)
+    if isinstance(company, dict):
+        details = CompanyDetails(**company)
+    else:
+        details = CompanyDetails(
+            name=company or args.default_company,
+            service=row.get(args.service_field) or None,
+        )
+    payload = ComplaintPayload(
+        complaint_text=row.get(args.text_field) or "",
+        company=details,
+        notes=row.get(args.notes_field) or None,
+    )
+    item_id = row.get(args.id_field)
+    return BatchItem(id=str(item_id) if item_id not in (None, "") else f"row-{number}", payload=payload)
+
+
+def _load_records(path: Path) -> List[Dict[str, Any]]:
+    """Records of a JSONL file this command appends to; a torn last line is trimmed."""
+    records: List[Dict[str, Any]] = []
+    if not path.exists():
+        return records
+    valid_bytes = 0
+    with path.open("rb") as handle:
+        for raw in handle:
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            if not raw.endswith(b"\n"):
+                break
+            records.append(record)
+            valid_bytes += len(raw)
+    if valid_bytes != path.stat().st_size:
+        with path.open("r+b") as handle:
+            handle.truncate(valid_bytes)
+    return records
+
+
+def load_completed(output: Path) -> Set[str]:
+    """Ids already written to the output file."""
+    return {str(record["id"]) for record in _load_records(output)}
+
+
+def load_invalid(errors: Path) -> Set[int]:
+    """Input row numbers already reported as invalid; rows that failed analysis are retried."""
+    return {int(record["row"]) for record in _load_records(errors) if record.get("invalid")}
+
+
+def _write(handle: TextIO, record: Dict[str, Any]) -> None:
+    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    handle.flush()
+
+
+async def analyze_file(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    source = Path(args.input)
+    output = Path(args.output)
+    errors_path = Path(args.errors) if args.errors else output.with_suffix(output.suffix + ".errors")
+    fmt = args.format or ("csv" if source.suffix.lower() == ".csv" else "jsonl")
+
+    completed = load_completed(output)
+    invalid = load_invalid(errors_path)
+    if completed or invalid:
+        logger.info("cli.resume", already_done=len(completed), already_invalid=len(invalid), output=str(output))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    counts = {"ok": 0, "failed": 0, "skipped": 0, "invalid": 0}
+
+    with output.open("a", encoding="utf-8") as out, errors_path.open("a", encoding="utf-8") as err:
+
+        def items() -> Iterator[BatchItem]:
+            emitted = 0
+            for number, row in iter_rows(source, fmt):
+                if args.limit is not None and emitted >= args.limit:
+                    return
+                if number in invalid:
+                    counts["skipped"] += 1
+                    continue
+                try:
+                    item = row_to_item(number, row, args)
+                except (ValidationError, ValueError, TypeError) as exc:
+                    counts["invalid"] += 1
+                    record = {"id": f"row-{number}", "row": number, "ok": False, "invalid": True}
+                    _write(err, {**record, "error": f"invalid row: {exc}"})
+                    continue
+                if item.id in completed:
+                    counts["skipped"] += 1
+                    continue
+                emitted += 1
+                yield item
+
+        orchestrator = ComplaintOrchestrator(settings=settings)
+        await orchestrator.astart()
+        started = time.perf_counter()
+        try:
+            concurrency = args.concurrency or settings.batch_concurrency
+            async for result in run_batch(orchestrator, items(), concurrency=concurrency, mode=args.mode):
+                record = result.model_dump()
+                if result.ok:
+                    counts["ok"] += 1
+                    _write(out, record)
+                    if counts["ok"] % _SYNC_EVERY == 0:
+                        os.fsync(out.fileno())
+                else:
+                    counts["failed"] += 1
+                    _write(err, record)
+                processed = counts["ok"] + counts["failed"]
+                if processed % args.progress_every == 0:
+                    rate = processed / max(time.perf_counter() - started, 1e-9)
+                    logger.info("cli.progress", **counts, rows_per_second=round(rate, 2))
+        finally:
+            os.fsync(out.fileno())
+            await orchestrator.aclose()
+
+    logger.info("cli.done", **counts, output=str(output), errors=str(errors_path))
+    return 0 if counts["failed"] == 0 else 1
+
+
+def load_labelled(path: Path, args: argparse.Namespace) -> Tuple[List[str], List[ComplaintCategory]]:
+    """Read (text, category) pairs from stored analyses.
+
+    The label is the ``--label-field`` value when it is a ``ComplaintCategory``
+    value; otherwise the category is recovered from the classification section
+    of the stored analysis text in ``--analysis-field``.
+    """
+    fmt = "csv" if path.suffix.lower() == ".csv" else "jsonl"
+    texts: List[str] = []
+    labels: List[ComplaintCategory] = []
+    for _, row in iter_rows(path, fmt):
+        text = row.get(args.text_field)
+        if not text:
+            continue
+        label: Optional[ComplaintCategory] = None
+        raw_label = row.get(args.label_field)
+        if raw_label:
+            try:
+                label = ComplaintCategory(raw_label)
+            except ValueError:
+                label = category_from_text(str(raw_label))
+        elif row.get(args.analysis_field):
+            analysis = str(row[args.analysis_field])
+            label = category_from_text(split_sections(analysis).get("classification", analysis))
+        if label is not None:
+            texts.append(text)
+            labels.append(label)
+    return texts, labels
+
+
+def _split_holdout(texts: List[str], labels: List[ComplaintCategory], holdout: float, seed: int = 7):
+    order = list(range(len(texts)))
+    random.Random(seed).shuffle(order)
+    cut = int(len(order) * (1 - holdout))
+    train, test = order[:cut], order[cut:]
+    return (
+        ([texts[i] for i in train], [labels[i] for i in train]),
+        ([texts[i] for i in test], [labels[i] for i in test]),
+    )
+
+
+def evaluate_router(
+    router,
+    texts: List[str],
+    labels: List[ComplaintCategory],
+    threshold: float,
+) -> Dict[str, Any]:
+    """Accuracy overall and on the confident slice, plus the share of LLM calls saved."""
+    correct = confident = confident_correct = 0
+    started = time.perf_counter()
+    for text, label in zip(texts, labels):
+        decision = router.decide(text)
+        hit = decision.category == label
+        correct += hit
+        if decision.confidence >= threshold:
+            confident += 1
+            confident_correct += hit
+    elapsed = time.perf_counter() - started
+    total = max(len(texts), 1)
+    return {
+        "samples": len(texts),
+        "threshold": threshold,
+        "accuracy": round(correct / total, 4),
+        "fastpath_share": round(confident / total, 4),
+        "fastpath_accuracy": round(confident_correct / confident, 4) if confident else None,
+        "microseconds_per_prediction": round(elapsed / total * 1e6, 1),
+    }
+
+
+async def train_router(args: argparse.Namespace) -> int:
+    from core.services.router import FastPathRouter
+
+    texts, labels = load_labelled(Path(args.input), args)
+    if len(texts) < 2:
+        logger.error("cli.router.no_data", input=args.input)
+        return 1
+    (train_texts, train_labels), (test_texts, test_labels) = _split_holdout(texts, labels, args.holdout)
+    router = FastPathRouter()
+    report = router.fit(train_texts, train_labels, epochs=args.epochs, learning_rate=args.learning_rate)
+    router.save(args.model)
+    logger.info("cli.router.trained", samples=report.samples, loss=report.final_loss, model=args.model)
+    if test_texts:
+        threshold = args.threshold if args.threshold is not None else get_settings().router_threshold
+        print(json.dumps(evaluate_router(router, test_texts, test_labels, threshold), ensure_ascii=False))
+    return 0
+
+
+async def eval_router(args: argparse.Namespace) -> int:
+    from core.services.router import FastPathRouter
+
+    router = FastPathRouter.load(args.model)
+    texts, labels = load_labelled(Path(args.input), args)
+    threshold = args.threshold if args.threshold is not None else get_settings().router_threshold
+    print(json.dumps(evaluate_router(router, texts, labels, threshold), ensure_ascii=False))
+    return 0
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def _add_label_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("input", help="JSONL/CSV of labelled complaints or stored analyses.")
+    parser.add_argument("--model", default="models/router.npz", help="Router model path.")
+    parser.add_argument("--text-field", default="complaint_text")
+    parser.add_argument("--label-field", default="category", help="ComplaintCategory value or Arabic label.")
+    parser.add_argument("--analysis-field", default="result", help="Stored analysis text to derive labels from.")
+    parser.add_argument("--threshold", type=float, help="Confidence threshold (default: ROUTER_THRESHOLD).")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description="AI complaint agent tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser(
+        "analyze-file",
+        help="Analyze a JSONL/CSV complaint dump; re-running resumes after the last written row.",
+    )
+    analyze.add_argument("input", help="Path to a .jsonl or .csv export.")
+    analyze.add_argument("--output", "-o", required=True, help="JSONL file for successful results (appended).")
+    analyze.add_argument("--errors", help="JSONL file for failed/invalid rows (default: <output>.errors).")
+    analyze.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension).")
+    analyze.add_argument("--concurrency", "-c", type=int, help="Rows in flight (default: BATCH_CONCURRENCY).")
+    analyze.add_argument("--mode", choices=["multi_agent", "fused"], help="Pipeline mode override.")
+    analyze.add_argument("--limit", type=int, help="Stop after this many new rows.")
+    analyze.add_argument("--id-field", default="id")
+    analyze.add_argument("--text-field", default="complaint_text")
+    analyze.add_argument("--company-field", default="company")
+    analyze.add_argument("--service-field", default="service")
+    analyze.add_argument("--notes-field", default="notes")
+    analyze.add_argument("--default-company", default="غير محدد", help="Company name for rows without one.")
+    analyze.add_argument("--progress-every", type=_positive_int, default=100, help="Log progress every N rows.")
+    analyze.set_defaults(handler=analyze_file)
+
+    train = commands.add_parser("train-router", help="Train the local fast-path classifier.")
+    _add_label_arguments(train)
+    train.add_argument("--epochs", type=int, default=20)
+    train.add_argument("--learning-rate", type=float, default=5.0)
+    train.add_argument("--holdout", type=float, default=0.2, help="Share of rows kept for evaluation.")
+    train.set_defaults(handler=train_router)
+
+    evaluate = commands.add_parser("eval-router", help="Report router accuracy, fast-path share and speed.")
+    _add_label_arguments(evaluate)
+    evaluate.set_defaults(handler=eval_router)
+
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    setup_logging()
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,34 +2,354 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from functools import lru_cache
-import asyncio
-from types import SimpleNamespace
-from typing import Literal, Optional
+from typing import Any, Dict, Literal, Optional, Tuple
 
-import google.generativeai as genai
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from core.services.cache import MemoryLRUCache, ResponseCache, SQLiteCache
+from core.services.jobs import JobStore
+from core.services.ratelimit import SharedRateLimiter
+from core.services.resilience import CallPolicy, ResilientCaller
+from core.services.transport import AIMDLimiter, CircuitBreaker, InflightGate, ProviderGuard
+
+# Agents whose model can be tiered; "default" serves the rest (fused, structured).
+LLM_STAGES = ("default", "classification", "emotion", "strategy", "reply")
+
+
+@dataclass(frozen=True)
+class LLMProfile:
+    """Everything that tells one LLM client apart from another."""
+
+    provider: str
+    model: str
+    temperature: float
+    max_output_tokens: Optional[int] = None
+
 
 class AppSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     llm_api_key: str = Field("", alias="LLM_API_KEY")
-    llm_provider: Literal["openai", "gemini"] = Field("gemini", alias="LLM_PROVIDER")
+    llm_provider: Literal["openai", "gemini", "replay"] = Field("gemini", alias="LLM_PROVIDER")
     llm_model: str = Field("gemini-2.5-flash", alias="LLM_MODEL")
     llm_base_url: Optional[str] = Field(default=None, alias="LLM_BASE_URL")
+    llm_temperature: float = Field(0.2, ge=0, le=2, alias="LLM_TEMPERATURE")
+    llm_max_output_tokens: Optional[int] = Field(default=None, ge=1, alias="LLM_MAX_OUTPUT_TOKENS")
+    # Per-provider credentials for mixed-provider profiles; LLM_API_KEY/LLM_BASE_URL
+    # only ever go to the default provider
+    gemini_api_key: str = Field("", alias="GEMINI_API_KEY")
+    openai_api_key: str = Field("", alias="OPENAI_API_KEY")
+    openai_base_url: Optional[str] = Field(default=None, alias="OPENAI_BASE_URL")
+
+    # Per-agent overrides of the four settings above; unset ones inherit the default
+    llm_provider_classification: Optional[Literal["openai", "gemini"]] = Field(
+        default=None, alias="LLM_PROVIDER_CLASSIFICATION"
+    )
+    llm_model_classification: Optional[str] = Field(default=None, alias="LLM_MODEL_CLASSIFICATION")
+    llm_temperature_classification: Optional[float] = Field(
+        default=None, ge=0, le=2, alias="LLM_TEMPERATURE_CLASSIFICATION"
+    )
+    llm_max_output_tokens_classification: Optional[int] = Field(
+        default=None, ge=1, alias="LLM_MAX_OUTPUT_TOKENS_CLASSIFICATION"
+    )
+    llm_provider_emotion: Optional[Literal["openai", "gemini"]] = Field(default=None, alias="LLM_PROVIDER_EMOTION")
+    llm_model_emotion: Optional[str] = Field(default=None, alias="LLM_MODEL_EMOTION")
+    llm_temperature_emotion: Optional[float] = Field(default=None, ge=0, le=2, alias="LLM_TEMPERATURE_EMOTION")
+    llm_max_output_tokens_emotion: Optional[int] = Field(default=None, ge=1, alias="LLM_MAX_OUTPUT_TOKENS_EMOTION")
+    llm_provider_strategy: Optional[Literal["openai", "gemini"]] = Field(default=None, alias="LLM_PROVIDER_STRATEGY")
+    llm_model_strategy: Optional[str] = Field(default=None, alias="LLM_MODEL_STRATEGY")
+    llm_temperature_strategy: Optional[float] = Field(default=None, ge=0, le=2, alias="LLM_TEMPERATURE_STRATEGY")
+    llm_max_output_tokens_strategy: Optional[int] = Field(
+        default=None, ge=1, alias="LLM_MAX_OUTPUT_TOKENS_STRATEGY"
+    )
+    llm_provider_reply: Optional[Literal["openai", "gemini"]] = Field(default=None, alias="LLM_PROVIDER_REPLY")
+    llm_model_reply: Optional[str] = Field(default=None, alias="LLM_MODEL_REPLY")
+    llm_temperature_reply: Optional[float] = Field(default=None, ge=0, le=2, alias="LLM_TEMPERATURE_REPLY")
+    llm_max_output_tokens_reply: Optional[int] = Field(default=None, ge=1, alias="LLM_MAX_OUTPUT_TOKENS_REPLY")
+
+    pipeline_mode: Literal["multi_agent", "fused"] = Field("multi_agent", alias="PIPELINE_MODE")
+    pipeline_profile: Literal["sequential", "parallel", "wide"] = Field(
+        "parallel", alias="PIPELINE_PROFILE"
+    )
+
+    # LLM_PROVIDER=replay: record wraps LLM_REPLAY_UPSTREAM, replay answers from the cassette
+    llm_replay_mode: Literal["record", "replay"] = Field("replay", alias="LLM_REPLAY_MODE")
+    llm_replay_cassette: str = Field(".cache/llm_cassette.jsonl.gz", alias="LLM_REPLAY_CASSETTE")
+    llm_replay_upstream: Literal["openai", "gemini"] = Field("gemini", alias="LLM_REPLAY_UPSTREAM")
+    llm_replay_latency_scale: float = Field(1.0, ge=0, alias="LLM_REPLAY_LATENCY_SCALE")
+
+    llm_warmup: bool = Field(True, alias="LLM_WARMUP")
+    llm_transport: Literal["async", "thread"] = Field("async", alias="LLM_TRANSPORT")
+    llm_max_inflight: int = Field(8, ge=1, alias="LLM_MAX_INFLIGHT")
+    llm_max_queue: int = Field(256, ge=0, alias="LLM_MAX_QUEUE")
+    llm_executor_workers: int = Field(8, ge=1, alias="LLM_EXECUTOR_WORKERS")
+    # AIMD: LLM_MAX_INFLIGHT is the ceiling; throttling or latency spikes halve the limit
+    llm_adaptive_limit: bool = Field(True, alias="LLM_ADAPTIVE_LIMIT")
+    llm_min_inflight: int = Field(1, ge=1, alias="LLM_MIN_INFLIGHT")
+    llm_latency_tolerance: float = Field(2.0, gt=1, alias="LLM_LATENCY_TOLERANCE")
+    llm_breaker_failures: int = Field(5, ge=0, alias="LLM_BREAKER_FAILURES")
+    llm_breaker_reset_seconds: float = Field(30.0, ge=0, alias="LLM_BREAKER_RESET_SECONDS")
+    # Provider quota shared by all processes on the host and every model of the provider (0 = unlimited)
+    llm_rate_limit_rpm: float = Field(0, ge=0, alias="LLM_RATE_LIMIT_RPM")
+    llm_rate_limit_tpm: float = Field(0, ge=0, alias="LLM_RATE_LIMIT_TPM")
+    llm_rate_limit_path: str = Field(".cache/ratelimit.sqlite3", alias="LLM_RATE_LIMIT_PATH")
+    # Connection pool of the OpenAI-compatible HTTP client; HTTP/2 needs ``httpx[http2]``
+    llm_http2: bool = Field(False, alias="LLM_HTTP2")
+    llm_pool_max_connections: int = Field(20, ge=1, alias="LLM_POOL_MAX_CONNECTIONS")
+    llm_pool_max_keepalive: int = Field(20, ge=0, alias="LLM_POOL_MAX_KEEPALIVE")
+    llm_keepalive_expiry_seconds: float = Field(30.0, ge=0, alias="LLM_KEEPALIVE_EXPIRY_SECONDS")
+
+    llm_timeout_seconds: float = Field(60.0, ge=0, alias="LLM_TIMEOUT_SECONDS")
+    # JSON object of per-stage overrides, e.g. {"classification": 15, "reply": 45}
+    llm_stage_timeouts: Dict[str, float] = Field(default_factory=dict, alias="LLM_STAGE_TIMEOUTS")
+    llm_retries: int = Field(2, ge=0, alias="LLM_RETRIES")
+    llm_retry_backoff_seconds: float = Field(0.5, ge=0, alias="LLM_RETRY_BACKOFF_SECONDS")
+    llm_retry_backoff_max_seconds: float = Field(8.0, ge=0, alias="LLM_RETRY_BACKOFF_MAX_SECONDS")
+    llm_hedge_enabled: bool = Field(False, alias="LLM_HEDGE_ENABLED")
+    llm_hedge_max_ratio: float = Field(0.05, ge=0, le=1, alias="LLM_HEDGE_MAX_RATIO")
+    llm_hedge_min_samples: int = Field(20, ge=1, alias="LLM_HEDGE_MIN_SAMPLES")
+
+    llm_cache_enabled: bool = Field(True, alias="LLM_CACHE_ENABLED")
+    llm_cache_memory_entries: int = Field(1024, ge=0, alias="LLM_CACHE_MEMORY_ENTRIES")
+    llm_cache_path: Optional[str] = Field(".cache/llm_responses.sqlite3", alias="LLM_CACHE_PATH")
+    llm_cache_ttl_seconds: int = Field(7 * 24 * 3600, ge=0, alias="LLM_CACHE_TTL_SECONDS")
+    llm_cache_max_mb: int = Field(256, ge=0, alias="LLM_CACHE_MAX_MB")
+
+    dedup_enabled: bool = Field(True, alias="DEDUP_ENABLED")
+    dedup_threshold: float = Field(0.95, gt=0, le=1, alias="DEDUP_THRESHOLD")
+    dedup_max_entries: int = Field(5000, ge=1, alias="DEDUP_MAX_ENTRIES")
+    dedup_ttl_seconds: int = Field(24 * 3600, ge=0, alias="DEDUP_TTL_SECONDS")
+
+    router_model_path: Optional[str] = Field(default=None, alias="ROUTER_MODEL_PATH")
+    router_threshold: float = Field(0.9, ge=0, le=1, alias="ROUTER_THRESHOLD")
+
+    classify_batch_enabled: bool = Field(False, alias="CLASSIFY_BATCH_ENABLED")
+    classify_batch_window_ms: float = Field(25, ge=0, alias="CLASSIFY_BATCH_WINDOW_MS")
+    classify_batch_max_items: int = Field(8, ge=1, alias="CLASSIFY_BATCH_MAX_ITEMS")
+
+    coalesce_enabled: bool = Field(True, alias="COALESCE_ENABLED")
+
+    context_compaction: bool = Field(True, alias="CONTEXT_COMPACTION")
+    context_budget_emotion: int = Field(60, ge=1, alias="CONTEXT_BUDGET_EMOTION")
+    context_budget_strategy: int = Field(120, ge=1, alias="CONTEXT_BUDGET_STRATEGY")
+    context_budget_reply: int = Field(250, ge=1, alias="CONTEXT_BUDGET_REPLY")
+
+    structured_max_repairs: int = Field(1, ge=0, alias="STRUCTURED_MAX_REPAIRS")
+
+    # POST /jobs: durable SQLite queue drained by a worker pool in each backend process
+    jobs_enabled: bool = Field(True, alias="JOBS_ENABLED")
+    jobs_path: str = Field(".cache/jobs.sqlite3", alias="JOBS_PATH")
+    jobs_workers: int = Field(2, ge=1, alias="JOBS_WORKERS")
+    jobs_visibility_timeout_seconds: float = Field(300.0, gt=0, alias="JOBS_VISIBILITY_TIMEOUT_SECONDS")
+    jobs_max_attempts: int = Field(3, ge=1, alias="JOBS_MAX_ATTEMPTS")
+    jobs_retry_backoff_seconds: float = Field(5.0, ge=0, alias="JOBS_RETRY_BACKOFF_SECONDS")
+    jobs_poll_interval_seconds: float = Field(0.5, gt=0, alias="JOBS_POLL_INTERVAL_SECONDS")
+    # Finished jobs older than this are deleted (0 = keep forever)
+    jobs_retention_seconds: float = Field(7 * 24 * 3600.0, ge=0, alias="JOBS_RETENTION_SECONDS")
+
+    batch_concurrency: int = Field(4, ge=1, alias="BATCH_CONCURRENCY")
+    batch_max_items: int = Field(1000, ge=1, alias="BATCH_MAX_ITEMS")
 
     backend_host: str = Field("0.0.0.0", alias="BACKEND_HOST")
     backend_port: int = Field(8080, alias="BACKEND_PORT")
 
-    def build_llm(self):
-        if not self.llm_api_key:
-            raise ValueError("LLM_API_KEY missing. Please set it in your environment or Streamlit secrets.")
-        if self.llm_provider == "gemini":
-            return _GeminiWrapper(model=self.llm_model, api_key=self.llm_api_key, temperature=0.2)
-        # For OpenAI, you would import and use OpenAI here
-        raise ValueError(f"LLM provider '{self.llm_provider}' is not yet supported. Use 'gemini'.")
+    # Streamlit: stream from this backend instead of running the pipeline in the UI process
+    frontend_backend_url: Optional[str] = Field(default=None, alias="FRONTEND_BACKEND_URL")
+    frontend_timeout_seconds: float = Field(120.0, gt=0, alias="FRONTEND_TIMEOUT_SECONDS")
+    frontend_max_connections: int = Field(20, ge=1, alias="FRONTEND_MAX_CONNECTIONS")
+
+    def llm_profile(self, stage: str = "default") -> LLMProfile:
+        """Resolve one agent's provider, model, temperature and output cap."""
+
+        def pick(setting: str, default: Any) -> Any:
+            value = None if stage == "default" else getattr(self, f"llm_{setting}_{stage}")
+            return default if value is None else value
+
+        provider = self.llm_replay_upstream if self.llm_provider == "replay" else self.llm_provider
+        return LLMProfile(
+            provider=pick("provider", provider),
+            model=pick("model", self.llm_model),
+            temperature=pick("temperature", self.llm_temperature),
+            max_output_tokens=pick("max_output_tokens", self.llm_max_output_tokens),
+        )
+
+    def provider_credentials(self, provider: str) -> Tuple[str, Optional[str]]:
+        """API key and base URL for ``provider``.
+
+        The provider-specific settings win; ``LLM_API_KEY`` and ``LLM_BASE_URL``
+        apply to the default provider only, so a key is never sent to another vendor.
+        """
+        is_default = provider == self.llm_profile().provider
+        fallback_key = self.llm_api_key if is_default else ""
+        if provider == "openai":
+            base_url = self.openai_base_url or (self.llm_base_url if is_default else None)
+            return self.openai_api_key or fallback_key, base_url
+        if provider == "gemini":
+            return self.gemini_api_key or fallback_key, None
+        return fallback_key, None
+
+    def build_llm(self, stage: str = "default"):
+        """Build the client for one agent's profile."""
+        return self._build_client(self.llm_profile(stage))
+
+    def build_llms(self) -> Dict[str, Any]:
+        """Build clients keyed by ``LLM_STAGES``, one per distinct profile.
+
+        Profiles of the same provider share one guard (the quota, breaker and
+        in-flight limit belong to the API key) and, for ``openai``, one
+        connection pool; only model, temperature and output cap differ.
+        """
+        cassette = None
+        if self.llm_provider == "replay":
+            from core.llm.replay import Cassette
+
+            cassette = Cassette(self.llm_replay_cassette)
+        providers: Dict[str, Any] = {}
+        clients: Dict[LLMProfile, Any] = {}
+        by_stage: Dict[str, Any] = {}
+        for stage in LLM_STAGES:
+            profile = self.llm_profile(stage)
+            if profile not in clients:
+                clients[profile] = self._build_client(profile, cassette, providers)
+            by_stage[stage] = clients[profile]
+        return by_stage
+
+    def _build_client(self, profile: LLMProfile, cassette: Any = None, providers: Optional[Dict[str, Any]] = None):
+        if self.llm_provider == "replay":
+            from core.llm.replay import Cassette, ReplayLLM
+
+            upstream = None
+            if self.llm_replay_mode == "record":
+                upstream = self._build_provider(profile, providers)
+            return ReplayLLM(
+                cassette or Cassette(self.llm_replay_cassette),
+                mode=self.llm_replay_mode,
+                upstream=upstream,
+                latency_scale=self.llm_replay_latency_scale,
+            )
+        return self._build_provider(profile, providers)
+
+    def _build_provider(self, profile: LLMProfile, providers: Optional[Dict[str, Any]] = None):
+        """Build a provider client; ``providers`` maps provider names to clients already built."""
+        providers = {} if providers is None else providers
+        first = providers.get(profile.provider)
+        if profile.provider == "openai":
+            from core.llm.openai_compat import OpenAICompatibleLLM
+
+            if first is not None:
+                return first.with_profile(
+                    model=profile.model,
+                    temperature=profile.temperature,
+                    max_output_tokens=profile.max_output_tokens,
+                )
+            api_key, base_url = self.provider_credentials(profile.provider)
+            # Self-hosted servers behind a base URL usually need no key.
+            if not api_key and not base_url:
+                raise ValueError(
+                    "OpenAI API key missing. Set OPENAI_API_KEY (or LLM_API_KEY when openai is the default "
+                    "provider) or point OPENAI_BASE_URL at a compatible server."
+                )
+            client = providers[profile.provider] = OpenAICompatibleLLM(
+                model=profile.model,
+                api_key=api_key,
+                base_url=base_url,
+                temperature=profile.temperature,
+                max_output_tokens=profile.max_output_tokens,
+                guard=self.build_guard(profile.provider),
+                max_connections=self.llm_pool_max_connections,
+                max_keepalive_connections=self.llm_pool_max_keepalive,
+                keepalive_expiry=self.llm_keepalive_expiry_seconds,
+                timeout_seconds=self.llm_timeout_seconds or None,
+                http2=self.llm_http2,
+            )
+            return client
+        if profile.provider == "gemini":
+            api_key, _ = self.provider_credentials(profile.provider)
+            if not api_key:
+                raise ValueError(
+                    "Gemini API key missing. Set GEMINI_API_KEY (or LLM_API_KEY when gemini is the default "
+                    "provider) in your environment or Streamlit secrets."
+                )
+            # Imported here: the SDK's import graph dominates cold start.
+            from core.llm.gemini import GeminiLLM
+
+            client = GeminiLLM(
+                model=profile.model,
+                api_key=api_key,
+                temperature=profile.temperature,
+                max_output_tokens=profile.max_output_tokens,
+                transport=self.llm_transport,
+                guard=first.guard if first is not None else self.build_guard(profile.provider),
+                executor_workers=self.llm_executor_workers,
+            )
+            providers.setdefault(profile.provider, client)
+            return client
+        raise ValueError(f"LLM provider '{profile.provider}' is not yet supported. Use 'gemini' or 'openai'.")
+
+    def build_guard(self, provider: Optional[str] = None) -> ProviderGuard:
+        """Build the in-flight gate, adaptive limit, breaker and rate limit for one provider."""
+        gate = InflightGate(self.llm_max_inflight, max_waiting=self.llm_max_queue)
+        limiter = None
+        if self.llm_adaptive_limit:
+            limiter = AIMDLimiter(
+                gate,
+                min_limit=self.llm_min_inflight,
+                max_limit=self.llm_max_inflight,
+                tolerance=self.llm_latency_tolerance,
+            )
+        breaker = None
+        if self.llm_breaker_failures:
+            breaker = CircuitBreaker(self.llm_breaker_failures, self.llm_breaker_reset_seconds)
+        provider = provider or self.llm_profile().provider
+        rate_limiter = None
+        if self.llm_rate_limit_rpm or self.llm_rate_limit_tpm:
+            rate_limiter = SharedRateLimiter(
+                self.llm_rate_limit_path,
+                scope=provider,
+                requests_per_minute=self.llm_rate_limit_rpm,
+                tokens_per_minute=self.llm_rate_limit_tpm,
+            )
+        return ProviderGuard(gate, limiter=limiter, breaker=breaker, rate_limiter=rate_limiter, provider=provider)
+
+    def build_caller(self) -> ResilientCaller:
+        """Build the deadline/retry/hedging policy shared by all agents."""
+        return ResilientCaller(
+            CallPolicy(
+                timeout_seconds=self.llm_timeout_seconds or None,
+                stage_timeouts=self.llm_stage_timeouts,
+                retries=self.llm_retries,
+                backoff_seconds=self.llm_retry_backoff_seconds,
+                backoff_max_seconds=self.llm_retry_backoff_max_seconds,
+                hedge=self.llm_hedge_enabled,
+                hedge_max_ratio=self.llm_hedge_max_ratio,
+                hedge_min_samples=self.llm_hedge_min_samples,
+            )
+        )
+
+    def build_cache(self) -> Optional[ResponseCache]:
+        """Build the LLM response cache, or None when caching is disabled."""
+        if not self.llm_cache_enabled:
+            return None
+        ttl = self.llm_cache_ttl_seconds or None
+        memory = None
+        if self.llm_cache_memory_entries:
+            memory = MemoryLRUCache(self.llm_cache_memory_entries, ttl_seconds=ttl)
+        disk = None
+        if self.llm_cache_path:
+            max_bytes = self.llm_cache_max_mb * 1024 * 1024 if self.llm_cache_max_mb else None
+            disk = SQLiteCache(self.llm_cache_path, ttl_seconds=ttl, max_bytes=max_bytes)
+        if memory is None and disk is None:
+            return None
+        return ResponseCache(memory=memory, disk=disk)
+
+    def build_job_store(self) -> Optional[JobStore]:
+        """Open the durable job queue, or None when ``POST /jobs`` is disabled."""
+        if not self.jobs_enabled:
+            return None
+        return JobStore(self.jobs_path, retention_seconds=self.jobs_retention_seconds or None)
 
 
 @lru_cache(maxsize=1)
@@ -54,47 +374,3 @@ def get_settings() -> AppSettings:
             pass
     
     return AppSettings()  # type: ignore[arg-type]
-
-
-class _GeminiWrapper:
-    """Minimal wrapper exposing complete/acomplete for Gemini via google.generativeai."""
-
-    def __init__(self, model: str, api_key: str, temperature: float = 0.2) -> None:
-        genai.configure(api_key=api_key)
-
-        # Normalize model name: add 'models/' prefix if missing
-        if not model.startswith("models/"):
-            model_name = f"models/{model}"
-        else:
-            model_name = model
-
-        self._model = genai.GenerativeModel(model_name=model_name)
-        self._generation_config = {"temperature": temperature}
-
-    def complete(self, prompt: str):
-        """Synchronous completion."""
-        response_text = self._generate_text(prompt)
-        return SimpleNamespace(text=response_text)
-
-    async def acomplete(self, prompt: str):
-        """Async completion."""
-        loop = asyncio.get_event_loop()
-        response_text = await loop.run_in_executor(None, self._generate_text, prompt)
-        return SimpleNamespace(text=response_text)
-
-    def _generate_text(self, prompt: str) -> str:
-        """Extract raw text from Gemini."""
-        response = self._model.generate_content(
-            prompt,
-            generation_config=self._generation_config
-        )
-
-        # Gemini sometimes returns text, sometimes candidates
-        if hasattr(response, "text") and response.text:
-            return response.text
-
-        if getattr(response, "candidates", None):
-            parts = response.candidates[0].content.parts
-            return "".join(getattr(part, "text", str(part)) for part in parts)
-
-        return ""
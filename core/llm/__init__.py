@@ -0,0 +1 @@
+"""LLM provider clients exposing ``complete``/``acomplete``/``astream``."""
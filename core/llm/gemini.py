@@ -0,0 +1,187 @@
+"""Gemini client over ``google.generativeai``.
+
+Only imported when a Gemini client is built: the SDK pulls in protobuf,
+gRPC and the Google API core, which dominate the app's cold start.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+
+import google.generativeai as genai
+
+from core.services.compaction import estimate_tokens
+from core.services.transport import InflightGate, ProviderGuard
+
+
+class GeminiLLM:
+    """Minimal wrapper exposing complete/acomplete for Gemini via google.generativeai.
+
+    Async calls go through the SDK's native async client when possible and
+    fall back to a dedicated thread pool otherwise. Either way they pass a
+    ``ProviderGuard``: a circuit breaker, then an ``InflightGate`` whose limit
+    an AIMD controller adapts to throttling and latency.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        temperature: float = 0.2,
+        *,
+        transport: str = "async",
+        max_inflight: int = 8,
+        max_queue: int = 256,
+        executor_workers: int = 8,
+        guard: Optional[ProviderGuard] = None,
+        max_output_tokens: Optional[int] = None,
+    ) -> None:
+        genai.configure(api_key=api_key)
+
+        # Normalize model name: add 'models/' prefix if missing
+        if not model.startswith("models/"):
+            model_name = f"models/{model}"
+        else:
+            model_name = model
+
+        self.provider = "gemini"
+        self.model = model_name
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self._model = genai.GenerativeModel(model_name=model_name)
+        self._generation_config: Dict[str, Any] = {"temperature": temperature}
+        if max_output_tokens is not None:
+            self._generation_config["max_output_tokens"] = max_output_tokens
+        self._transport = transport
+        self._guard = guard or ProviderGuard(InflightGate(max_inflight, max_waiting=max_queue))
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="llm")
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def gate(self) -> InflightGate:
+        return self._guard.gate
+
+    @property
+    def guard(self) -> ProviderGuard:
+        return self._guard
+
+    def stats(self) -> dict:
+        """Transport counters, adaptive limit and breaker state for monitoring."""
+        return {"transport": self._transport, **self._guard.snapshot()}
+
+    def complete(self, prompt: str):
+        """Synchronous completion."""
+        response_text = self._generate_text(prompt)
+        return SimpleNamespace(text=response_text)
+
+    async def acomplete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        """Async completion; ``response_schema`` switches Gemini to constrained JSON output."""
+        config = self._config_for(response_schema)
+        async with self._guard.call(tokens=estimate_tokens(prompt)):
+            if self._use_native_async():
+                response = await self._model.generate_content_async(prompt, generation_config=config)
+                response_text = self._response_text(response)
+            else:
+                loop = asyncio.get_running_loop()
+                response_text = await loop.run_in_executor(
+                    self._executor, self._generate_text, prompt, config
+                )
+        await self._guard.charge(estimate_tokens(response_text))
+        return SimpleNamespace(text=response_text)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async streaming completion yielding text deltas as they arrive."""
+        if not self._use_native_async():
+            result = await self.acomplete(prompt)
+            yield result.text
+            return
+
+        # Stream duration depends on output length, so it is not a latency signal.
+        produced = 0
+        async with self._guard.call(measure=False, tokens=estimate_tokens(prompt)):
+            response = await self._model.generate_content_async(
+                prompt,
+                generation_config=self._generation_config,
+                stream=True,
+            )
+            try:
+                async for chunk in response:
+                    text = self._response_text(chunk)
+                    if text:
+                        produced += estimate_tokens(text)
+                        yield text
+            finally:
+                await self._guard.charge(produced)
+
+    def _use_native_async(self) -> bool:
+        """The SDK's async client binds to the first loop it runs on.
+
+        Callers that spin up a fresh loop per call (``asyncio.run`` in the
+        Streamlit app) therefore use the thread pool after the first call.
+        """
+        if self._transport != "async":
+            return False
+        loop = asyncio.get_running_loop()
+        if self._async_loop is None:
+            self._async_loop = loop
+        return self._async_loop is loop
+
+    async def awarmup(self) -> None:
+        """Open the provider channels ahead of the first request."""
+        loop = asyncio.get_running_loop()
+        # count_tokens is free and initialises both the sync and async clients.
+        calls = [loop.run_in_executor(self._executor, self._model.count_tokens, "ping")]
+        if self._use_native_async():
+            calls.append(self._model.count_tokens_async("ping"))
+        await asyncio.gather(*calls)
+
+    async def aclose(self) -> None:
+        """Close the gRPC channels opened by the model, if any, and the thread pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for attr in ("_async_client", "_client"):
+            client = getattr(self._model, attr, None)
+            transport = getattr(client, "transport", None)
+            if transport is None:
+                continue
+            result = transport.close()
+            if inspect.isawaitable(result):
+                await result
+            setattr(self._model, attr, None)
+
+    def _config_for(self, response_schema: Optional[Mapping[str, Any]]) -> dict:
+        if response_schema is None:
+            return self._generation_config
+        return {
+            **self._generation_config,
+            "response_mime_type": "application/json",
+            "response_schema": dict(response_schema),
+        }
+
+    def _generate_text(self, prompt: str, config: Optional[dict] = None) -> str:
+        """Extract raw text from Gemini."""
+        response = self._model.generate_content(
+            prompt,
+            generation_config=config or self._generation_config
+        )
+        return self._response_text(response)
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """Extract text from a Gemini response or streamed chunk."""
+        # Gemini sometimes returns text, sometimes candidates; ``.text`` raises
+        # when a chunk carries no parts (e.g. the final safety-only chunk).
+        try:
+            if response.text:
+                return response.text
+        except (AttributeError, ValueError):
+            pass
+
+        if getattr(response, "candidates", None):
+            parts = response.candidates[0].content.parts
+            return "".join(getattr(part, "text", str(part)) for part in parts)
+
+        return ""
@@ -0,0 +1,236 @@
+"""OpenAI-compatible chat-completions client on a pooled ``httpx.AsyncClient``.
+
+Works with OpenAI and with self-hosted servers that speak the same API
+(vLLM, TGI, llama.cpp, Ollama). One client and its keep-alive pool are shared
+by every agent, whichever model it asks for; calls pass the same
+``ProviderGuard`` as the Gemini client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+
+import httpx
+
+from core.services.compaction import estimate_tokens
+from core.services.transport import InflightGate, ProviderGuard
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class _LoopBoundClient:
+    """A lazily opened ``httpx.AsyncClient`` owned by the first event loop that asks for it."""
+
+    def __init__(self, factory) -> None:
+        self._factory = factory
+        self.client: Optional[httpx.AsyncClient] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> Optional[httpx.AsyncClient]:
+        """The pooled client, or None when called from a different loop."""
+        loop = asyncio.get_running_loop()
+        if self.client is None:
+            self.client = self._factory()
+            self.loop = loop
+        return self.client if self.loop is loop else None
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            client, self.client, self.loop = self.client, None, None
+            await client.aclose()
+
+
+class OpenAICompatibleLLM:
+    """Minimal client exposing complete/acomplete/astream over ``/chat/completions``.
+
+    Like the Gemini wrapper, the pooled async client belongs to the first
+    event loop that uses it; calls from other loops (``asyncio.run`` per click
+    in Streamlit) get a short-lived client of their own.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        base_url: Optional[str] = None,
+        temperature: float = 0.2,
+        *,
+        max_output_tokens: Optional[int] = None,
+        guard: Optional[ProviderGuard] = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout_seconds: Optional[float] = 60.0,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.provider = "openai"
+        self.model = model
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self._guard = guard or ProviderGuard(InflightGate(max_connections), provider=self.provider)
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout_seconds, connect=min(timeout_seconds or 10.0, 10.0))
+        self._http2 = http2
+        self._transport = transport
+        self._pool = _LoopBoundClient(self._new_client)
+
+    def with_profile(
+        self, *, model: str, temperature: float, max_output_tokens: Optional[int] = None
+    ) -> "OpenAICompatibleLLM":
+        """A client for another model on the same server, sharing the connection pool and guard."""
+        sibling = copy.copy(self)
+        sibling.model = model
+        sibling.temperature = temperature
+        sibling.max_output_tokens = max_output_tokens
+        return sibling
+
+    @property
+    def gate(self) -> InflightGate:
+        return self._guard.gate
+
+    @property
+    def guard(self) -> ProviderGuard:
+        return self._guard
+
+    def stats(self) -> dict:
+        """Pool settings, adaptive limit and breaker state for monitoring."""
+        return {
+            "transport": "httpx",
+            "http2": self._http2,
+            "max_connections": self._limits.max_connections,
+            **self._guard.snapshot(),
+        }
+
+    def _new_client(self, **overrides: Any) -> httpx.AsyncClient:
+        options: Dict[str, Any] = {
+            "base_url": self.base_url,
+            "headers": self._headers,
+            "limits": self._limits,
+            "timeout": self._timeout,
+            "http2": self._http2,
+        }
+        if self._transport is not None:
+            options["transport"] = self._transport
+        options.update(overrides)
+        return httpx.AsyncClient(**options)
+
+    def _shared_client(self) -> Optional[httpx.AsyncClient]:
+        """The pooled client, or None when called from a different loop."""
+        return self._pool.get()
+
+    def _body(self, prompt: str, *, stream: bool = False, response_schema=None) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+        }
+        if self.max_output_tokens is not None:
+            body["max_tokens"] = self.max_output_tokens
+        if stream:
+            body["stream"] = True
+        if response_schema is not None:
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": dict(response_schema)},
+            }
+        return body
+
+    def complete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        """Not supported: a synchronous call would bypass the guard's breaker, gate and rate limit."""
+        raise NotImplementedError("OpenAICompatibleLLM is async-only; use acomplete (or LlamaIndexAgent.achat).")
+
+    async def acomplete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        """Async completion; ``response_schema`` requests ``json_schema`` structured output."""
+        body = self._body(prompt, response_schema=response_schema)
+        async with self._guard.call(tokens=estimate_tokens(prompt)):
+            client = self._shared_client()
+            if client is not None:
+                response = await client.post("/chat/completions", json=body)
+            else:
+                async with self._new_client(limits=httpx.Limits(max_connections=1)) as own:
+                    response = await own.post("/chat/completions", json=body)
+            response.raise_for_status()
+            data = response.json()
+        text = self._message_text(data)
+        await self._guard.charge(self._completion_tokens(data, text))
+        return SimpleNamespace(text=text)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async streaming completion yielding text deltas from the SSE stream."""
+        body = self._body(prompt, stream=True)
+        # Stream duration depends on output length, so it is not a latency signal.
+        produced = 0
+        async with self._guard.call(measure=False, tokens=estimate_tokens(prompt)):
+            client = self._shared_client()
+            own = None
+            if client is None:
+                client = own = self._new_client(limits=httpx.Limits(max_connections=1))
+            try:
+                async with client.stream("POST", "/chat/completions", json=body) as response:
+                    if response.is_error:
+                        await response.aread()
+                        response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        text = self._delta_text(line)
+                        if text is None:
+                            break
+                        if text:
+                            produced += estimate_tokens(text)
+                            yield text
+            finally:
+                await self._guard.charge(produced)
+                if own is not None:
+                    await own.aclose()
+
+    async def awarmup(self) -> None:
+        """Open a pooled connection (TLS handshake included) ahead of the first request."""
+        client = self._shared_client()
+        if client is not None:
+            response = await client.get("/models")
+            response.raise_for_status()
+
+    async def aclose(self) -> None:
+        """Close the pool; clients made by ``with_profile`` share it, so closing any closes all."""
+        await self._pool.aclose()
+
+    @staticmethod
+    def _message_text(data: Mapping[str, Any]) -> str:
+        choices = data.get("choices") or []
+        if not choices:
+            return ""
+        message = choices[0].get("message") or {}
+        return message.get("content") or ""
+
+    @staticmethod
+    def _completion_tokens(data: Mapping[str, Any], text: str) -> int:
+        """Output tokens as reported by the server, else estimated from the text."""
+        usage = data.get("usage") or {}
+        return usage.get("completion_tokens") or estimate_tokens(text)
+
+    @staticmethod
+    def _delta_text(line: str) -> Optional[str]:
+        """Text of one SSE line; "" for keep-alives and metadata, None at ``[DONE]``."""
+        if not line.startswith("data:"):
+            return ""
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return None
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            return ""
+        choices = chunk.get("choices") or []
+        if not choices:
+            return ""
+        return (choices[0].get("delta") or {}).get("content") or ""
@@ -0,0 +1,194 @@
+"""Record/replay provider for deterministic load and regression runs.
+
+In ``record`` mode every call goes to the real client and the prompt hash,
+response text and timing are appended to a cassette. In ``replay`` mode the
+cassette answers instead, sleeping for the recorded (optionally scaled)
+latency, so traffic can be re-run against new pipeline code offline.
+
+A cassette is JSON Lines, one call per line; a ``.gz`` suffix gzips it.
+Lines use short keys: ``k`` prompt hash, ``t`` seconds, ``r`` response text
+and, for streams, ``s`` as ``[seconds since previous chunk, text]`` pairs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, IO, List, Mapping, Optional
+
+
+class CassetteMissError(LookupError):
+    """The replayed prompt was never recorded."""
+
+
+def prompt_key(prompt: str, response_schema: Optional[Mapping[str, Any]] = None) -> str:
+    """Hash of what the provider saw; model and temperature are the recording's."""
+    material = json.dumps([prompt, response_schema], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded calls by prompt key; repeated prompts replay their recordings in turn."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._handle: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._load()
+
+    def _open(self, mode: str) -> IO[str]:
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return self.path.open(mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        with self._open("r") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # a torn last line from an interrupted recording
+                self._entries.setdefault(entry["k"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def next(self, key: str) -> Dict[str, Any]:
+        entries = self._entries.get(key)
+        if not entries:
+            raise CassetteMissError(f"No recording for prompt {key} in {self.path}.")
+        with self._lock:
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+        return entries[index % len(entries)]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._handle = self._open("a")
+            self._handle.write(line + "\n")
+            self._handle.flush()
+            self._entries.setdefault(entry["k"], []).append(entry)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+class ReplayLLM:
+    """Wraps a real client to record, or stands in for it to replay."""
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        *,
+        mode: str = "replay",
+        upstream: Any = None,
+        latency_scale: float = 1.0,
+    ) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode '{mode}'. Use 'record' or 'replay'.")
+        if mode == "record" and upstream is None:
+            raise ValueError("Record mode needs an upstream LLM client.")
+        self.cassette = cassette
+        self.mode = mode
+        self.upstream = upstream
+        self.latency_scale = latency_scale
+        self.provider = "replay"
+        self.model = getattr(upstream, "model", "cassette")
+        self.temperature = getattr(upstream, "temperature", None)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def _lookup(self, prompt: str, response_schema: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        try:
+            entry = self.cassette.next(prompt_key(prompt, response_schema))
+        except CassetteMissError:
+            self.misses += 1
+            raise
+        self.replayed += 1
+        return entry
+
+    def _record(self, prompt: str, response_schema, started: float, text: str, **extra: Any) -> None:
+        entry = {"k": prompt_key(prompt, response_schema), "t": round(time.perf_counter() - started, 4), "r": text}
+        entry.update(extra)
+        self.cassette.append(entry)
+        self.recorded += 1
+
+    def complete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        if self.mode == "record":
+            started = time.perf_counter()
+            options = {"response_schema": response_schema} if response_schema is not None else {}
+            result = self.upstream.complete(prompt, **options)
+            self._record(prompt, response_schema, started, _text(result))
+            return result
+        entry = self._lookup(prompt, response_schema)
+        time.sleep(entry["t"] * self.latency_scale)
+        return SimpleNamespace(text=entry["r"])
+
+    async def acomplete(self, prompt: str, *, response_schema: Optional[Mapping[str, Any]] = None):
+        if self.mode == "record":
+            started = time.perf_counter()
+            options = {"response_schema": response_schema} if response_schema is not None else {}
+            result = await self.upstream.acomplete(prompt, **options)
+            self._record(prompt, response_schema, started, _text(result))
+            return result
+        entry = self._lookup(prompt, response_schema)
+        await asyncio.sleep(entry["t"] * self.latency_scale)
+        return SimpleNamespace(text=entry["r"])
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        if self.mode == "record":
+            started = last = time.perf_counter()
+            chunks = []
+            async for piece in self.upstream.astream(prompt):
+                now = time.perf_counter()
+                chunks.append([round(now - last, 4), piece])
+                last = now
+                yield piece
+            self._record(prompt, None, started, "".join(piece for _, piece in chunks), s=chunks)
+            return
+        entry = self._lookup(prompt, None)
+        chunks = entry.get("s") or [[entry["t"], entry["r"]]]
+        for delay, piece in chunks:
+            await asyncio.sleep(delay * self.latency_scale)
+            yield piece
+
+    def stats(self) -> dict:
+        status = {
+            "mode": self.mode,
+            "cassette_entries": len(self.cassette),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+        if self.upstream is not None and hasattr(self.upstream, "stats"):
+            status["upstream"] = self.upstream.stats()
+        return status
+
+    async def awarmup(self) -> None:
+        if self.upstream is not None and hasattr(self.upstream, "awarmup"):
+            await self.upstream.awarmup()
+
+    async def aclose(self) -> None:
+        self.cassette.close()
+        if self.upstream is not None and hasattr(self.upstream, "aclose"):
+            await self.upstream.aclose()
+
+
+def _text(result: Any) -> str:
+    return result if isinstance(result, str) else getattr(result, "text", str(result))
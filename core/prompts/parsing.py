@@ -0,0 +1,228 @@
+"""Parsers for text-based and JSON LLM output."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from pydantic import ValidationError
+
+from core.schemas import CATEGORY_LABELS, ComplaintCategory, StructuredAnalysis
+
+# Section keys match the orchestrator's stage names.
+SECTION_ORDER: Tuple[str, ...] = ("classification", "emotion", "strategy", "reply")
+
+# Headings of the combined report, shared by the orchestrator and the UI.
+REPORT_TITLE = "تحليل شامل للشكوى"
+SECTION_HEADINGS: Dict[str, str] = {
+    "classification": "١. التصنيف",
+    "emotion": "٢. فهم المشاعر",
+    "strategy": "٣. خطة المعالجة",
+    "reply": "٤. الرد الرسمي",
+}
+
+# Accepted header titles per section, longest first so that "الرد الرسمي"
+# wins over a bare "الرد".
+SECTION_TITLES: Dict[str, Tuple[str, ...]] = {
+    "classification": ("تصنيف الشكوى", "التصنيف", "نوع الشكوى"),
+    "emotion": ("فهم المشاعر", "تحليل المشاعر", "المشاعر"),
+    "strategy": ("خطة المعالجة", "خطة الحل", "خطة العمل", "الاستراتيجية", "استراتيجية الحل"),
+    "reply": ("الرد الرسمي", "الرد على العميل", "الرد المقترح", "نص الرد"),
+}
+
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_ORDINALS = r"(?:أولا|ثانيا|ثالثا|رابعا)"
+# Leading markdown / numbering noise: "## ", "**", "١.", "2)", "- ", "أولاً:" ...
+_PREFIX = re.compile(
+    rf"^(?:[#>*_\-•\s]+)?(?:(?:[0-9٠-٩۰-۹]+|{_ORDINALS})\s*[.)\-:–]?\s*)?(?:[*_]+\s*)?"
+)
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+_SEPARATOR = re.compile(r"^[\s*_]*(?:[:：|\-–—]\s*)?")
+
+
+def format_report(sections: Mapping[str, str]) -> str:
+    """Markdown report of ``sections`` in pipeline order; missing sections are left out."""
+    body = "\n\n---\n\n".join(
+        f"## {SECTION_HEADINGS[name]}\n{sections[name]}" for name in SECTION_ORDER if name in sections
+    )
+    return f"# {REPORT_TITLE}\n\n{body}\n"
+
+
+def _clean(line: str) -> str:
+    return _DIACRITICS.sub("", line).replace("\u0640", "").strip()
+
+
+def _match_header(line: str, allowed: List[str]) -> Optional[Tuple[str, str]]:
+    """Return (section, inline remainder) if ``line`` is a section header."""
+    text = _PREFIX.sub("", _clean(line), count=1)
+    for section in allowed:
+        for title in SECTION_TITLES[section]:
+            if not text.startswith(title):
+                continue
+            rest = text[len(title):]
+            # A bare title, or a title followed by a separator and inline content.
+            if not rest.strip(" *_#"):
+                return section, ""
+            if re.match(r"^[\s*_]*[:：|\-–—]", rest):
+                return section, _SEPARATOR.sub("", rest, count=1).strip(" *_")
+    return None
+
+
+class SectionStream:
+    """Incrementally assign streamed text to sections, one line at a time.
+
+    Header detection needs a whole line, so text is released per completed
+    line; lines before the first header are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._current: Optional[str] = None
+        self._seen: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume a streamed delta and return ``(section, text)`` pieces."""
+        self._buffer += text
+        pieces: List[Tuple[str, str]] = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            pieces.extend(self._line(line, "\n"))
+        return pieces
+
+    def flush(self) -> List[Tuple[str, str]]:
+        """Release whatever is left after the stream ends."""
+        line, self._buffer = self._buffer, ""
+        return self._line(line, "") if line else []
+
+    def _line(self, line: str, end: str) -> List[Tuple[str, str]]:
+        pending = [name for name in SECTION_ORDER if name not in self._seen]
+        header = _match_header(line, pending) if pending else None
+        if header:
+            self._current, inline = header
+            self._seen.append(self._current)
+            return [(self._current, inline + end)] if inline else []
+        if self._current is None:
+            return []
+        return [(self._current, line + end)]
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """Split a one-shot analysis into its sections keyed by stage name.
+
+    Each section is recognised by its Arabic header, tolerating markdown
+    decoration, Arabic-Indic or Latin numbering, ordinal words, diacritics and
+    tatweel. Only the first header per section counts, so a title repeated inside
+    the reply body does not start a new section. Missing sections are omitted.
+    """
+    stream = SectionStream()
+    sections: Dict[str, List[str]] = {}
+    for name, piece in stream.feed(text) + stream.flush():
+        sections.setdefault(name, []).append(piece)
+
+    result: Dict[str, str] = {}
+    for name, pieces in sections.items():
+        body = "".join(pieces).strip()
+        # Drop horizontal rules the model uses between sections.
+        body = re.sub(r"(?:\n\s*(?:-{3,}|\*{3,}|_{3,})\s*)+$", "", body).strip()
+        if body:
+            result[name] = body
+    return result
+
+
+_NUMBERED_HEADER = re.compile(
+    r"^[\s=#*\[(]*الشكوى\s*(?:رقم\s*)?([0-9٠-٩]+)\s*[\s=#*\]):]*$"
+)
+
+
+def split_numbered(text: str, count: int) -> Dict[int, str]:
+    """Split a multi-complaint answer on ``=== الشكوى N ===`` markers.
+
+    Returns the non-empty answers for indexes 1..count; anything else
+    (unknown indexes, text before the first marker) is ignored.
+    """
+    answers: Dict[int, List[str]] = {}
+    current: Optional[int] = None
+    for line in text.splitlines():
+        match = _NUMBERED_HEADER.match(_clean(line))
+        if match:
+            index = int(match.group(1).translate(_DIGITS))
+            current = index if 1 <= index <= count and index not in answers else None
+            if current is not None:
+                answers[current] = []
+            continue
+        if current is not None:
+            answers[current].append(line)
+    result: Dict[int, str] = {}
+    for index, lines in answers.items():
+        body = "\n".join(lines).strip()
+        if body:
+            result[index] = body
+    return result
+
+
+# Looser spellings the model uses for the same categories, checked after the
+# exact labels. "أخرى" is deliberately absent: it is the fallback.
+_CATEGORY_HINTS: Tuple[Tuple[ComplaintCategory, str], ...] = (
+    (ComplaintCategory.DELIVERY, "التوصيل"),
+    (ComplaintCategory.DELIVERY, "الشحن"),
+    (ComplaintCategory.PAYMENT, "الدفع"),
+    (ComplaintCategory.TECHNICAL, "تقنية"),
+    (ComplaintCategory.INQUIRY, "استفسار"),
+    (ComplaintCategory.RETURN, "استرجاع"),
+    (ComplaintCategory.RETURN, "استبدال"),
+)
+
+
+def category_from_text(text: str) -> Optional[ComplaintCategory]:
+    """Map a free-text classification answer back to ``ComplaintCategory``.
+
+    The earliest label mentioned wins, so the chosen category beats labels
+    that only appear later in the explanation.
+    """
+    cleaned = _clean(text)
+    for value in ComplaintCategory:
+        if value.value in cleaned:
+            return value
+    best: Optional[Tuple[int, ComplaintCategory]] = None
+    candidates = [(category, label) for category, label in CATEGORY_LABELS.items()]
+    for category, hint in candidates + list(_CATEGORY_HINTS):
+        position = cleaned.find(hint)
+        if position >= 0 and (best is None or position < best[0]):
+            best = (position, category)
+    return best[1] if best else None
+
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u00ab": '"', "\u00bb": '"'})
+
+
+def _repair_json(text: str) -> str:
+    """Undo the usual damage: code fences, prose around the object, smart quotes, trailing commas."""
+    text = _FENCE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start : end + 1]
+    text = text.translate(_SMART_QUOTES)
+    return _TRAILING_COMMA.sub(r"\1", text)
+
+
+def parse_structured(text: str) -> StructuredAnalysis:
+    """Parse a structured-output reply, raising ``ValueError`` when it cannot be used.
+
+    Well-formed replies are validated straight from the JSON string; only a
+    failure pays for the local repair pass.
+    """
+    try:
+        return StructuredAnalysis.model_validate_json(text)
+    except ValidationError:
+        pass
+    repaired = _repair_json(text)
+    try:
+        return StructuredAnalysis.model_validate(json.loads(repaired))
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid JSON: {exc}") from exc
+    except ValidationError as exc:
+        # ValidationError is a ValueError; keep the message short for repair prompts.
+        raise ValueError(f"schema mismatch: {exc.errors(include_url=False, include_input=False)}") from exc
@@ -0,0 +1,88 @@
+"""Prompt builders for JSON output parsed into ``StructuredAnalysis``."""
+
+from __future__ import annotations
+
+from textwrap import dedent
+
+from core.schemas import ComplaintCategory
+
+from .base import BASE_PERSONA, FORMAL_REPLY_STYLE, JSON_STYLE, STRATEGY_TEMPLATE
+
+_STRING = {"type": "string"}
+
+# Response schema in the OpenAPI subset providers accept for constrained decoding.
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string", "enum": [category.value for category in ComplaintCategory]},
+        "confidence": {"type": "number"},
+        "rationale": _STRING,
+        "summary": _STRING,
+        "emotions": {"type": "array", "items": _STRING},
+        "risk_level": {"type": "string", "enum": ["low", "medium", "high"]},
+        "strategy": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action_title": _STRING,
+                    "owner_role": _STRING,
+                    "timeline": _STRING,
+                    "success_metric": _STRING,
+                },
+                "required": ["action_title", "owner_role", "timeline", "success_metric"],
+            },
+        },
+        "formal_reply": _STRING,
+    },
+    "required": [
+        "category",
+        "confidence",
+        "rationale",
+        "summary",
+        "emotions",
+        "risk_level",
+        "strategy",
+        "formal_reply",
+    ],
+}
+
+
+def build_structured_prompt(complaint: str, company: str, notes: str | None = None) -> str:
+    """Build a single prompt that returns the whole analysis as one compact JSON object."""
+    extra = f"\nملاحظات إضافية أو سياسات الشركة: {notes}" if notes else ""
+    categories = ", ".join(category.value for category in ComplaintCategory)
+
+    return dedent(
+        f"""
+        {BASE_PERSONA}
+        {JSON_STYLE}
+        {STRATEGY_TEMPLATE}
+        {FORMAL_REPLY_STYLE}
+
+        Analyze this complaint.
+        - Company: {company}
+        - Complaint: {complaint}
+        {extra}
+
+        Return ONE compact JSON object (no markdown, no extra whitespace) with keys:
+        "category" (one of: {categories}), "confidence" (0-1), "rationale" (one Arabic sentence),
+        "summary" (one Arabic sentence), "emotions" (list of Arabic words),
+        "risk_level" (low | medium | high), "strategy" (3-5 step objects), "formal_reply" (Arabic text).
+        """
+    ).strip()
+
+
+def build_repair_prompt(raw: str, error: str) -> str:
+    """Ask the model to fix its own malformed JSON without re-analyzing."""
+    return dedent(
+        f"""
+        {JSON_STYLE}
+        The JSON below failed validation: {error}
+
+        Return only the corrected JSON object with the keys category, confidence, rationale,
+        summary, emotions, risk_level, strategy, formal_reply. Keep the existing Arabic content.
+
+        {raw}
+        """
+    ).strip()
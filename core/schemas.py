@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from enum import Enum
 from typing import List, Optional
 
@@ -17,6 +18,17 @@ class ComplaintCategory(str, Enum):
     OTHER = "other"
 
 
+# Arabic labels the prompts ask the model to choose from.
+CATEGORY_LABELS = {
+    ComplaintCategory.DELIVERY: "مشكلة في التوصيل",
+    ComplaintCategory.PAYMENT: "مشكلة في الدفع",
+    ComplaintCategory.TECHNICAL: "مشكلة تقنية",
+    ComplaintCategory.INQUIRY: "استفسار عام",
+    ComplaintCategory.RETURN: "استرجاع/استبدال",
+    ComplaintCategory.OTHER: "أخرى",
+}
+
+
 class CompanyDetails(BaseModel):
     name: str = Field(..., min_length=2)
     service: Optional[str] = Field(
@@ -76,7 +88,80 @@ class ComplaintAnalysis(BaseModel):
     risk_level: str = "medium"
 
 
+class StructuredAnalysis(BaseModel):
+    """Compact JSON the structured-output prompt asks the model for."""
+
+    category: ComplaintCategory
+    confidence: float = Field(0.5, ge=0, le=1)
+    rationale: str = ""
+    summary: str
+    emotions: List[str] = Field(default_factory=list)
+    risk_level: str = Field(default="medium")
+    strategy: List[StrategyStep]
+    formal_reply: str
+
+    @field_validator("category", mode="before")
+    @classmethod
+    def _accept_arabic_label(cls, value):
+        for category, label in CATEGORY_LABELS.items():
+            if value == label:
+                return category
+        return value
+
+    @field_validator("risk_level")
+    @classmethod
+    def _validate_risk(cls, value: str) -> str:
+        return value if value in {"low", "medium", "high"} else "medium"
+
+    def to_analysis(self, router: Optional[RouterDecision] = None) -> ComplaintAnalysis:
+        """Build the API model; ``router`` overrides the model's own category."""
+        if router is None:
+            router = RouterDecision(category=self.category, confidence=self.confidence, rationale=self.rationale)
+        return ComplaintAnalysis(
+            summary=self.summary,
+            emotions=self.emotions,
+            strategy=self.strategy,
+            formal_reply=self.formal_reply,
+            category=router.category,
+            router=router,
+            risk_level=self.risk_level,
+        )
+
+
 class StreamChunk(BaseModel):
     section: str
     payload: str
 
+
+class BatchItem(BaseModel):
+    id: str = Field(..., min_length=1, description="Client-side identifier echoed back with the result.")
+    payload: ComplaintPayload
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1)
+
+
+class BatchResult(BaseModel):
+    id: str
+    ok: bool
+    result: Optional[str] = None
+    error: Optional[str] = None
+    duration_ms: float = 0.0
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobInfo(BaseModel):
+    id: str
+    status: JobStatus
+    attempts: int = 0
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[ComplaintAnalysis] = None
+    error: Optional[str] = None
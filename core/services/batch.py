@@ -0,0 +1,89 @@
+"""Bounded-concurrency batch analysis shared by the API and the CLI."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Union
+
+from core.schemas import BatchItem, BatchResult
+from core.services.logging import get_logger
+
+logger = get_logger(__name__)
+
+ItemSource = Union[Iterable[BatchItem], AsyncIterable[BatchItem]]
+
+
+async def _aiter(items: ItemSource) -> AsyncIterator[BatchItem]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:  # type: ignore[union-attr]
+            yield item
+    else:
+        for item in items:  # type: ignore[union-attr]
+            yield item
+
+
+async def analyze_one(orchestrator, item: BatchItem, *, mode: Optional[str] = None) -> BatchResult:
+    """Analyze a single item, turning failures into an error result."""
+    started = time.perf_counter()
+    try:
+        result = await orchestrator.aanalyze(item.payload, mode=mode)
+    except Exception as exc:
+        logger.warning("batch.item.failed", item=item.id, error=str(exc))
+        return BatchResult(
+            id=item.id,
+            ok=False,
+            error=f"{type(exc).__name__}: {exc}",
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+    return BatchResult(
+        id=item.id,
+        ok=True,
+        result=result,
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+async def run_batch(
+    orchestrator,
+    items: ItemSource,
+    *,
+    concurrency: int,
+    mode: Optional[str] = None,
+) -> AsyncIterator[BatchResult]:
+    """Yield results in completion order with at most ``concurrency`` items in flight.
+
+    Items are pulled lazily, so ``items`` may be a generator over a large
+    file. The result queue is bounded: a slow consumer pauses the workers
+    instead of buffering every result.
+    """
+    concurrency = max(1, concurrency)
+    source = _aiter(items)
+    pull_lock = asyncio.Lock()
+    results: asyncio.Queue[Optional[BatchResult]] = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker() -> None:
+        while True:
+            async with pull_lock:
+                item = await anext(source, None)
+            if item is None:
+                return
+            await results.put(await analyze_one(orchestrator, item, mode=mode))
+
+    async def supervise() -> None:
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await results.put(None)
+
+    supervisor = asyncio.create_task(supervise())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await supervisor
+    finally:
+        if not supervisor.done():
+            supervisor.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await supervisor
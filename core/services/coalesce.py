@@ -0,0 +1,78 @@
+"""Single-flight coalescing of identical in-flight analyses."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+
+from core.schemas import ComplaintPayload
+from core.services.normalize import normalize_arabic
+
+T = TypeVar("T")
+
+
+def coalesce_key(payload: ComplaintPayload, *parts: str) -> str:
+    """Key identical requests by normalized payload plus pipeline options."""
+    fields = (
+        normalize_arabic(payload.complaint_text),
+        normalize_arabic(payload.company.name),
+        normalize_arabic(payload.company.service or ""),
+        normalize_arabic(payload.notes or ""),
+        *parts,
+    )
+    return hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Call(Generic[T]):
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """Run one task per key; concurrent callers with the same key share its result.
+
+    Callers await the shared task through ``asyncio.shield`` so one caller
+    timing out does not cancel the work for the others. The task is only
+    cancelled once every caller has gone away. Failures propagate to every
+    caller and the key is released, so the next request starts fresh.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call[T]] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task, key=key, call=call: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Nobody may be left to observe the outcome of an abandoned task.
+        if not call.task.cancelled():
+            call.task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
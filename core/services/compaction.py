@@ -0,0 +1,189 @@
+"""Compaction of upstream agent outputs before they reach downstream prompts.
+
+Downstream agents only need the gist of earlier stages: the category and
+its reason, the list of emotions and the tone, and the strategy's step titles
+with their timelines. Each field is reduced to that, then the agent's context
+is held to a token budget.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import Dict, List, Mapping, Optional
+
+from core.prompts.parsing import category_from_text
+from core.schemas import CATEGORY_LABELS
+
+EMOTION_LEXICON = (
+    "غضب",
+    "إحباط",
+    "احباط",
+    "قلق",
+    "خيبة أمل",
+    "استياء",
+    "انزعاج",
+    "توتر",
+    "خوف",
+    "حزن",
+    "ارتباك",
+    "عدم ثقة",
+    "نفاد صبر",
+    "رضا",
+    "امتنان",
+)
+
+_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_MARKUP = re.compile(r"[*_`#>]+")
+_STEP = re.compile(r"^\s*(?:[-•]\s*)?(?:الخطوة\s*)?([0-9٠-٩]+)\s*[.):\-–]\s*(.*)$")
+_ELLIPSIS = " …"
+# Line ends and sentence ends, but not the dot after a step number.
+_BOUNDARY = re.compile(r"(?<=\n)|(?<=[^\d٠-٩][.!؟?]\s)")
+_FIELD = re.compile(r"^\s*[-•]?\s*([^:：]{2,25})[:：]\s*(.+)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a provider round-trip.
+
+    Arabic words are split by subword tokenizers into about 1.5 pieces on
+    average; punctuation is one token each.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(_TOKEN.findall(text)) * 1.5)
+
+
+def _plain(line: str) -> str:
+    return _MARKUP.sub("", line).strip()
+
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    for line in text.splitlines():
+        line = _plain(line)
+        if not line:
+            continue
+        sentence = re.split(r"(?<=[.!؟?])\s", line, maxsplit=1)[0]
+        return sentence[:limit]
+    return ""
+
+
+def compact_classification(text: str) -> str:
+    """Category label plus the first sentence that is not just the label."""
+    category = category_from_text(text)
+    reason = ""
+    for line in text.splitlines():
+        plain = _plain(line)
+        if not plain:
+            continue
+        if category is not None and CATEGORY_LABELS[category] in plain and len(plain) < 60:
+            continue
+        reason = _first_sentence(plain)
+        break
+    if category is None:
+        return reason or _first_sentence(text)
+    label = CATEGORY_LABELS[category]
+    return f"{label} — {reason}" if reason else label
+
+
+def compact_emotions(text: str) -> str:
+    """Emotions found in the analysis plus the suggested tone, if stated."""
+    found: List[str] = []
+    for emotion in EMOTION_LEXICON:
+        if emotion in text and emotion not in found:
+            found.append(emotion)
+    tone = ""
+    for line in text.splitlines():
+        if "نبرة" in line:
+            tone = _plain(line.split(":", 1)[-1] if ":" in line else line)[:120]
+            break
+    parts = []
+    if found:
+        parts.append("المشاعر: " + "، ".join(found))
+    if tone:
+        parts.append("النبرة: " + tone)
+    return " | ".join(parts) or _first_sentence(text)
+
+
+def compact_strategy(text: str) -> str:
+    """One line per step: its title (or action) and timeline."""
+    steps: List[Dict[str, str]] = []
+    for line in text.splitlines():
+        plain = _plain(line)
+        if not plain:
+            continue
+        step = _STEP.match(plain)
+        if step:
+            # "1. الإجراء المطلوب: ..." puts the first field on the step line.
+            field = _FIELD.match(step.group(2))
+            steps.append({"title": field.group(2).strip() if field else step.group(2).strip(" :")})
+            continue
+        field = _FIELD.match(plain)
+        if field and steps:
+            name, value = field.group(1), field.group(2).strip()
+            if "الإجراء" in name and not steps[-1]["title"]:
+                steps[-1]["title"] = value
+            elif "الزمني" in name or "المدة" in name:
+                steps[-1]["timeline"] = value
+    if not steps:
+        return "\n".join(_plain(line) for line in text.splitlines() if _plain(line))
+    lines = []
+    for index, step in enumerate(steps, start=1):
+        title = step.get("title") or "خطوة"
+        timeline = step.get("timeline")
+        lines.append(f"{index}. {title} ({timeline})" if timeline else f"{index}. {title}")
+    return "\n".join(lines)
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Cut ``text`` at a line or sentence boundary so it fits ``budget`` tokens."""
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    budget = max(1, budget - estimate_tokens(_ELLIPSIS))
+    pieces = _BOUNDARY.split(text)
+    kept: List[str] = []
+    used = 0
+    for piece in pieces:
+        cost = estimate_tokens(piece)
+        if used + cost > budget:
+            break
+        kept.append(piece)
+        used += cost
+    if not kept:
+        # A single very long sentence: fall back to a word cut.
+        words = text.split()
+        return " ".join(words[: max(1, int(budget / 1.5))]) + _ELLIPSIS
+    return "".join(kept).rstrip() + _ELLIPSIS
+
+
+EXTRACTORS = {
+    "classification": compact_classification,
+    "emotion": compact_emotions,
+    "strategy": compact_strategy,
+}
+
+
+class ContextCompactor:
+    """Reduce an agent's upstream inputs to essentials within a token budget."""
+
+    def __init__(self, budgets: Mapping[str, int]) -> None:
+        self.budgets = dict(budgets)
+
+    def compact(self, stage: str, inputs: Mapping[str, str]) -> Dict[str, str]:
+        compacted = {name: EXTRACTORS.get(name, lambda text: text)(text) for name, text in inputs.items()}
+        budget: Optional[int] = self.budgets.get(stage)
+        if budget is None or not compacted:
+            return compacted
+        costs = {name: estimate_tokens(text) for name, text in compacted.items()}
+        total = sum(costs.values())
+        if total <= budget:
+            return compacted
+        # Short fields are kept whole; the rest split what is left evenly.
+        shares: Dict[str, int] = {}
+        remaining = budget
+        ordered = sorted(compacted, key=costs.__getitem__)
+        for position, name in enumerate(ordered):
+            shares[name] = min(costs[name], remaining // (len(ordered) - position))
+            remaining -= shares[name]
+        return {name: truncate_to_budget(text, shares[name]) for name, text in compacted.items()}
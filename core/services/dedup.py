@@ -0,0 +1,168 @@
+"""Near-duplicate detection so repeated complaints reuse a prior analysis."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from core.schemas import ComplaintPayload
+from core.services.normalize import normalize_arabic
+
+FINGERPRINT_BITS = 64
+
+
+def shingles(text: str, size: int = 3) -> Counter:
+    """Character n-grams of normalized text; robust to word-level edits."""
+    if len(text) <= size:
+        return Counter([text])
+    return Counter(text[i : i + size] for i in range(len(text) - size + 1))
+
+
+def simhash(text: str, size: int = 3) -> int:
+    """64-bit SimHash over weighted character shingles."""
+    weights = [0] * FINGERPRINT_BITS
+    for gram, count in shingles(text, size).items():
+        value = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            if value >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def similarity(left: int, right: int) -> float:
+    return 1.0 - (left ^ right).bit_count() / FINGERPRINT_BITS
+
+
+@dataclass
+class _Entry:
+    fingerprint: int
+    sections: Dict[str, str]
+    stored_at: float
+
+
+class NearDuplicateIndex:
+    """Recent analyses per company, looked up by SimHash distance.
+
+    Fingerprints are split into ``max_distance + 1`` bands; by the pigeonhole
+    principle any fingerprint within ``max_distance`` bits shares at least one
+    band exactly, so a lookup only compares against that band's bucket.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.95,
+        max_entries: int = 5000,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        if not 0 < threshold <= 1:
+            raise ValueError("Similarity threshold must be in (0, 1].")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = int((1 - threshold) * FINGERPRINT_BITS)
+        self._bands = self._band_slices(self.max_distance + 1)
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, int], List[Tuple[str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _band_slices(count: int) -> List[Tuple[int, int]]:
+        count = min(count, FINGERPRINT_BITS)
+        edges = [round(i * FINGERPRINT_BITS / count) for i in range(count + 1)]
+        return [(edges[i], edges[i + 1] - edges[i]) for i in range(count)]
+
+    @staticmethod
+    def scope(payload: ComplaintPayload) -> str:
+        """Analyses are only shared within the same company, service and notes."""
+        parts = (payload.company.name, payload.company.service or "", payload.notes or "")
+        return "\x1f".join(normalize_arabic(part) for part in parts)
+
+    def _band_keys(self, scope: str, fingerprint: int) -> List[Tuple[str, int, int]]:
+        return [
+            (scope, index, fingerprint >> start & ((1 << width) - 1))
+            for index, (start, width) in enumerate(self._bands)
+        ]
+
+    def lookup(self, payload: ComplaintPayload) -> Optional[Dict[str, str]]:
+        """Return the stored sections of a recent near-duplicate, if any."""
+        scope = self.scope(payload)
+        text = normalize_arabic(payload.complaint_text)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+        entry = self._live((scope, digest))
+        if entry is not None:
+            self.hits += 1
+            return entry.sections
+
+        fingerprint = simhash(text)
+        best: Optional[_Entry] = None
+        best_score = self.threshold
+        seen = set()
+        for band_key in self._band_keys(scope, fingerprint):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry = self._live(key)
+                if entry is None:
+                    continue
+                score = similarity(fingerprint, entry.fingerprint)
+                if score >= best_score:
+                    best, best_score = entry, score
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return best.sections
+
+    def add(self, payload: ComplaintPayload, sections: Mapping[str, str]) -> None:
+        scope = self.scope(payload)
+        text = normalize_arabic(payload.complaint_text)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        key = (scope, digest)
+        if key in self._entries:
+            self._discard(key)
+        entry = _Entry(simhash(text), dict(sections), time.time())
+        self._entries[key] = entry
+        for band_key in self._band_keys(scope, entry.fingerprint):
+            self._buckets.setdefault(band_key, []).append(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+    def _live(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds is not None and time.time() - entry.stored_at > self.ttl_seconds:
+            self._discard(key)
+            return None
+        return entry
+
+    def _discard(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(key[0], entry.fingerprint):
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove(key)
+            except ValueError:
+                pass
+            if not bucket:
+                del self._buckets[band_key]
+
+    def stats(self) -> Dict[str, float]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,315 @@
+"""Durable job queue in local SQLite (WAL) and the worker pool that drains it.
+
+``POST /jobs`` stores the payload and answers at once; workers in every
+backend process claim jobs with a lease. A job whose worker crashes or
+stalls becomes visible again when its lease (the visibility timeout)
+expires, so jobs survive restarts and are retried up to ``max_attempts``.
+Workers stopped cleanly hand their jobs back at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from core.services.logging import get_logger
+from core.services.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+JOBS_FINISHED = REGISTRY.counter("jobs_finished_total", "Queued jobs by final outcome.", ["outcome"])
+JOB_DURATION = REGISTRY.histogram("job_duration_seconds", "Time from enqueue to completion.")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    payload: str
+    attempts: int
+    created_at: float
+    updated_at: float
+    result: Optional[str] = None
+    error: Optional[str] = None
+    lease: Optional[str] = None
+
+
+class JobStore:
+    """Jobs table shared by every process that opens the same file.
+
+    Claims run in ``BEGIN IMMEDIATE`` transactions, so two workers never
+    take the same job. Each claim gets a fresh lease token; finishing with a
+    stale token (the job was re-claimed after the lease expired) is ignored.
+    Claims also delete jobs finished more than ``retention_seconds`` ago, at
+    most once per ``prune_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        busy_timeout_ms: int = 5000,
+        retention_seconds: Optional[float] = None,
+        prune_interval: float = 60.0,
+    ) -> None:
+        self.path = Path(path)
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease TEXT,
+                visible_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+
+    def enqueue(self, payload: str) -> Job:
+        now = time.time()
+        job = Job(id=uuid.uuid4().hex, status=QUEUED, payload=payload, attempts=0, created_at=now, updated_at=now)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, attempts, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 0, ?, ?, ?)",
+                (job.id, QUEUED, payload, now, now, now),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, payload, attempts, created_at, updated_at, result, error, lease "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return Job(*row) if row is not None else None
+
+    def claim(self, visibility_timeout: float, max_attempts: int) -> Optional[Job]:
+        """Lease the oldest ready job: queued, or running with an expired lease.
+
+        Expired jobs that already used ``max_attempts`` are failed instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'visibility timeout expired', lease = NULL, "
+                    "updated_at = ? WHERE status = ? AND visible_at <= ? AND attempts >= ?",
+                    (FAILED, now, RUNNING, now, max_attempts),
+                )
+                if self.retention_seconds and now - self._pruned_at >= self.prune_interval:
+                    self._pruned_at = now
+                    self._conn.execute(
+                        "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                        (SUCCEEDED, FAILED, now - self.retention_seconds),
+                    )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND visible_at <= ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                lease = uuid.uuid4().hex
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, lease = ?, attempts = attempts + 1, visible_at = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (RUNNING, lease, now + visibility_timeout, now, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    def extend(self, job: Job, visibility_timeout: float) -> bool:
+        """Push the lease out again; False if the job was re-claimed meanwhile."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET visible_at = ?, updated_at = ? WHERE id = ? AND lease = ?",
+                (now + visibility_timeout, now, job.id, job.lease),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, result: str) -> bool:
+        return self._finish(job, SUCCEEDED, result=result)
+
+    def fail(self, job: Job, error: str, *, retry_after: Optional[float] = None) -> bool:
+        """Record a failed attempt; ``retry_after`` seconds re-queues it instead of failing it."""
+        if retry_after is None:
+            return self._finish(job, FAILED, error=error)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease = NULL, visible_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease = ?",
+                (QUEUED, error, now + retry_after, now, job.id, job.lease),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, job: Job) -> bool:
+        """Hand a leased job back untouched: visible now, and the attempt not counted."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, lease = NULL, attempts = MAX(attempts - 1, 0), visible_at = ?, "
+                "updated_at = ? WHERE id = ? AND lease = ?",
+                (QUEUED, now, now, job.id, job.lease),
+            )
+        return cursor.rowcount == 1
+
+    def _finish(self, job: Job, status: str, *, result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease = NULL, updated_at = ? "
+                "WHERE id = ? AND lease = ?",
+                (status, result, error, time.time(), job.id, job.lease),
+            )
+        return cursor.rowcount == 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+JobHandler = Callable[[str], Awaitable[str]]
+
+
+class JobWorkerPool:
+    """``workers`` asyncio tasks that claim jobs and run ``handler(payload) -> result``.
+
+    Store calls run in a thread because claims may wait on another
+    process's write lock. A running job's lease is renewed every third of
+    the visibility timeout, so only crashed or wedged workers lose it.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        *,
+        workers: int = 2,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 5.0,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._held: Dict[str, Job] = {}
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work(index)) for index in range(self.workers)]
+        logger.info("jobs.workers.started", workers=self.workers)
+
+    def notify(self) -> None:
+        """Wake idle workers early, e.g. right after an enqueue in this process."""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Cancel the workers and release the jobs they held, so a restart need not wait out the lease."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        held, self._held = list(self._held.values()), {}
+        for job in held:
+            if await asyncio.to_thread(self.store.release, job):
+                logger.info("jobs.run.released", job=job.id)
+
+    async def _work(self, index: int) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.visibility_timeout, self.max_attempts)
+            except sqlite3.OperationalError as exc:  # lock wait exceeded; try again later
+                logger.warning("jobs.claim.failed", worker=index, error=str(exc))
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        logger.info("jobs.run.start", job=job.id, attempt=job.attempts)
+        renew = asyncio.create_task(self._renew(job))
+        self._held[job.id] = job
+        try:
+            result = await self.handler(job.payload)
+        except asyncio.CancelledError:
+            # Shutdown: stop() releases the job still in _held.
+            raise
+        except Exception as exc:
+            self._held.pop(job.id, None)
+            error = f"{type(exc).__name__}: {exc}"
+            if job.attempts < self.max_attempts:
+                backoff = self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+                await asyncio.to_thread(self.store.fail, job, error, retry_after=backoff)
+                logger.warning("jobs.run.retry", job=job.id, attempt=job.attempts, error=error[:200])
+            else:
+                if await asyncio.to_thread(self.store.fail, job, error):
+                    JOBS_FINISHED.inc("failed")
+                logger.warning("jobs.run.failed", job=job.id, attempt=job.attempts, error=error[:200])
+            return
+        finally:
+            renew.cancel()
+        self._held.pop(job.id, None)
+        if await asyncio.to_thread(self.store.complete, job, result):
+            JOBS_FINISHED.inc("succeeded")
+            JOB_DURATION.observe(value=time.time() - job.created_at)
+            logger.info("jobs.run.done", job=job.id, attempt=job.attempts)
+        else:
+            logger.warning("jobs.run.stale", job=job.id)
+
+    async def _renew(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.store.extend, job, self.visibility_timeout):
+                return
@@ -0,0 +1,119 @@
+"""Micro-batching of classification requests into a single LLM call."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from core.agents.base import TokenSink
+from core.agents.classification import ClassificationAgent
+from core.prompts.parsing import split_numbered
+from core.schemas import ComplaintPayload
+from core.services.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _Pending:
+    payload: ComplaintPayload
+    future: asyncio.Future
+
+
+class ClassificationBatcher:
+    """Drop-in for ``ClassificationAgent.aclassify`` that groups concurrent calls.
+
+    Requests arriving within ``window_ms`` of the first pending one, or up to
+    ``max_items``, are sent as one numbered multi-complaint prompt. Items the
+    answer does not cover are retried individually, so a partial parse only
+    costs the extra calls for the missing items.
+    """
+
+    def __init__(self, agent: ClassificationAgent, *, window_ms: float = 25, max_items: int = 8) -> None:
+        self.agent = agent
+        self.window = window_ms / 1000
+        self.max_items = max(1, max_items)
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_items = 0
+        self.single_calls = 0
+        self.fallbacks = 0
+
+    async def aclassify(self, payload: ComplaintPayload, *, on_token: Optional[TokenSink] = None) -> str:
+        loop = asyncio.get_running_loop()
+        pending = _Pending(payload, loop.create_future())
+        self._pending.append(pending)
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        result = await pending.future
+        if on_token is not None:
+            on_token(result)
+        return result
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = [item for item in self._pending[: self.max_items] if not item.future.done()]
+            del self._pending[: self.max_items]
+            if batch:
+                task = asyncio.get_running_loop().create_task(self._run(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[_Pending]) -> None:
+        if len(batch) == 1:
+            self.single_calls += 1
+            await self._single(batch[0])
+            return
+
+        self.batches += 1
+        self.batched_items += len(batch)
+        answers: Dict[int, str] = {}
+        try:
+            raw = await self.agent.aclassify_many([item.payload for item in batch])
+            answers = split_numbered(raw, len(batch))
+        except Exception as exc:
+            logger.warning("classification.batch.failed", size=len(batch), error=str(exc))
+
+        missing = []
+        for index, item in enumerate(batch, start=1):
+            answer = answers.get(index)
+            if answer is None:
+                missing.append(item)
+            elif not item.future.done():
+                item.future.set_result(answer)
+
+        logger.info("classification.batch.done", size=len(batch), parsed=len(batch) - len(missing))
+        if missing:
+            self.fallbacks += len(missing)
+            await asyncio.gather(*(self._single(item) for item in missing))
+
+    async def _single(self, item: _Pending) -> None:
+        if item.future.done():
+            return
+        try:
+            result = await self.agent.aclassify(item.payload)
+        except Exception as exc:
+            if not item.future.done():
+                item.future.set_exception(exc)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "single_calls": self.single_calls,
+            "fallbacks": self.fallbacks,
+            "pending": len(self._pending),
+        }
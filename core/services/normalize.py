@@ -0,0 +1,46 @@
+"""Arabic text normalization shared by deduplication, coalescing and routing."""
+
+from __future__ import annotations
+
+import re
+
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_TATWEEL = "\u0640"
+_PUNCTUATION = re.compile(r"[^\w\s]|_", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+_CHAR_MAP = str.maketrans(
+    {
+        # Alef variants
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        # Final yaa / alef maqsura and taa marbuta
+        "ى": "ي",
+        "ة": "ه",
+        # Hamza on carriers
+        "ؤ": "و",
+        "ئ": "ي",
+        # Persian/Urdu look-alikes that show up in pasted text
+        "ی": "ي",
+        "ک": "ك",
+        # Arabic-Indic and Extended Arabic-Indic digits
+        **{chr(0x0660 + i): str(i) for i in range(10)},
+        **{chr(0x06F0 + i): str(i) for i in range(10)},
+    }
+)
+
+
+def normalize_arabic(text: str, *, strip_punctuation: bool = True) -> str:
+    """Fold spelling variants so near-identical complaints compare equal.
+
+    Removes diacritics and tatweel, unifies alef/yaa/taa-marbuta/hamza
+    variants, converts digits to ASCII, lowercases Latin text and collapses
+    whitespace.
+    """
+    text = _DIACRITICS.sub("", text).replace(_TATWEEL, "")
+    text = text.translate(_CHAR_MAP).lower()
+    if strip_punctuation:
+        text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
@@ -2,18 +2,45 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+import asyncio
+import contextlib
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional
 
 from core.agents.classification import ClassificationAgent
 from core.agents.emotion import EmotionAgent
+from core.agents.fused import FusedAnalysisAgent
 from core.agents.reply import ReplyAgent
 from core.agents.strategy import StrategyAgent
-from core.config import AppSettings
-from core.schemas import ComplaintPayload
+from core.agents.structured import StructuredAnalysisAgent
+from core.config import LLM_STAGES, AppSettings
+from core.prompts.parsing import SECTION_ORDER, SectionStream, format_report, split_sections
+from core.schemas import (
+    CATEGORY_LABELS,
+    ComplaintAnalysis,
+    ComplaintPayload,
+    RouterDecision,
+    StreamChunk,
+)
+from core.services.cache import ResponseCache
+from core.services.coalesce import SingleFlight, coalesce_key
+from core.services.compaction import ContextCompactor, estimate_tokens
+from core.services.dedup import NearDuplicateIndex
 from core.services.logging import get_logger
+from core.services.metrics import REGISTRY
+from core.services.microbatch import ClassificationBatcher
+from core.services.scheduler import Stage, StageScheduler, resolve_profile
 
 logger = get_logger(__name__)
 
+PIPELINE_RUNS = REGISTRY.counter("pipeline_runs_total", "Analyses by how they were produced.", ["path"])
+STAGE_LATENCY = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Multi-agent stage latency, including LLM gate waits.", ["stage"]
+)
+
+# Receives (section, text delta) while stages are still running.
+SectionSink = Callable[[str, str], None]
+
 
 class ComplaintOrchestrator:
     """Multi-agent orchestrator that combines all agents' outputs into one response."""
@@ -23,74 +50,414 @@ class ComplaintOrchestrator:
         *,
         settings: AppSettings,
         llm: Optional[Any] = None,
+        cache: Optional[ResponseCache] = None,
         verbose_agents: bool = False,
     ) -> None:
         self.settings = settings
         if llm is None:
-            llm = settings.build_llm()
-        self.llm = llm
-
-        # Create all agents using the same LLM
-        self.classification_agent = ClassificationAgent(llm=self.llm, verbose=verbose_agents)
-        self.emotion_agent = EmotionAgent(llm=self.llm, verbose=verbose_agents)
-        self.strategy_agent = StrategyAgent(llm=self.llm, verbose=verbose_agents)
-        self.reply_agent = ReplyAgent(llm=self.llm, verbose=verbose_agents)
-
-    async def aanalyze(self, payload: ComplaintPayload) -> str:
-        """Analyze complaint using multiple agents and combine results."""
-        logger.info("orchestrator.start", complaint=len(payload.complaint_text))
-
-        # Step 1: Classification
-        logger.info("agent.classification.start")
-        classification = await self.classification_agent.aclassify(payload)
-        logger.info("agent.classification.done", length=len(classification))
-
-        # Step 2: Emotion Analysis
-        logger.info("agent.emotion.start")
-        emotions = await self.emotion_agent.aanalyze_emotions(payload, classification)
-        logger.info("agent.emotion.done", length=len(emotions))
-
-        # Step 3: Strategy Creation
-        logger.info("agent.strategy.start")
-        strategy = await self.strategy_agent.acreate_strategy(payload, classification, emotions)
-        logger.info("agent.strategy.done", length=len(strategy))
-
-        # Step 4: Formal Reply
-        logger.info("agent.reply.start")
-        formal_reply = await self.reply_agent.acreate_reply(payload, classification, emotions, strategy)
-        logger.info("agent.reply.done", length=len(formal_reply))
+            # One client per distinct provider/model profile, shared by the agents using it
+            self.llms: Dict[str, Any] = settings.build_llms()
+            if cache is None:
+                cache = settings.build_cache()
+        else:
+            self.llms = {stage: llm for stage in LLM_STAGES}
+        self.llm = self.llms["default"]
+        self.cache = cache
+        self.dedup: Optional[NearDuplicateIndex] = None
+        if settings.dedup_enabled:
+            self.dedup = NearDuplicateIndex(
+                threshold=settings.dedup_threshold,
+                max_entries=settings.dedup_max_entries,
+                ttl_seconds=settings.dedup_ttl_seconds or None,
+            )
+        self.singleflight: Optional[SingleFlight[str]] = None
+        if settings.coalesce_enabled:
+            self.singleflight = SingleFlight()
 
-        # Combine all results into one comprehensive response
-        final_response = self._combine_results(classification, emotions, strategy, formal_reply)
+        # Downstream agents see only the essentials of upstream outputs.
+        self.compactor: Optional[ContextCompactor] = None
+        if settings.context_compaction:
+            self.compactor = ContextCompactor(
+                {
+                    "emotion": settings.context_budget_emotion,
+                    "strategy": settings.context_budget_strategy,
+                    "reply": settings.context_budget_reply,
+                }
+            )
+        self.context_tokens = {"upstream": 0, "sent": 0}
+
+        # Deadlines, retries and hedging for every agent's LLM calls
+        self.caller = settings.build_caller()
+
+        # Create all agents with their stage's LLM and the shared response cache and call policy
+        shared = {"verbose": verbose_agents, "cache": self.cache, "caller": self.caller}
+        self.classification_agent = ClassificationAgent(llm=self.llms["classification"], **shared)
+        self.emotion_agent = EmotionAgent(llm=self.llms["emotion"], **shared)
+        self.strategy_agent = StrategyAgent(llm=self.llms["strategy"], **shared)
+        self.reply_agent = ReplyAgent(llm=self.llms["reply"], **shared)
+        self.fused_agent = FusedAnalysisAgent(llm=self.llm, **shared)
+        self.structured_agent = StructuredAnalysisAgent(
+            llm=self.llm, **shared, max_repairs=settings.structured_max_repairs
+        )
+
+        # Confident local predictions skip the classification LLM call.
+        self.router = None
+        if settings.router_model_path:
+            from core.services.router import FastPathRouter  # NumPy is only needed when enabled
+
+            self.router = FastPathRouter.load(settings.router_model_path)
+        self.router_hits = 0
+        self.router_misses = 0
+
+        # Under high ingest, concurrent classifications share one LLM call.
+        self.classifier: Any = self.classification_agent
+        if settings.classify_batch_enabled:
+            self.classifier = ClassificationBatcher(
+                self.classification_agent,
+                window_ms=settings.classify_batch_window_ms,
+                max_items=settings.classify_batch_max_items,
+            )
+
+    @property
+    def clients(self) -> List[Any]:
+        """Distinct LLM clients, the default one first."""
+        distinct: Dict[int, Any] = {}
+        for llm in self.llms.values():
+            distinct.setdefault(id(llm), llm)
+        return list(distinct.values())
+
+    async def astart(self) -> None:
+        """Warm the LLM clients so the first request does not pay connection setup."""
+        if not self.settings.llm_warmup:
+            return
+        clients = [llm for llm in self.clients if hasattr(llm, "awarmup")]
+        if not clients:
+            return
+        started = time.perf_counter()
+        results = await asyncio.gather(*(llm.awarmup() for llm in clients), return_exceptions=True)
+        for llm, result in zip(clients, results):
+            if isinstance(result, Exception):  # a cold client still works, just slower
+                logger.warning("orchestrator.warmup.failed", model=getattr(llm, "model", ""), error=str(result))
+        elapsed = time.perf_counter() - started
+        logger.info("orchestrator.warmup.done", clients=len(clients), duration_ms=round(elapsed * 1000, 1))
+
+    async def aclose(self) -> None:
+        """Release the LLM clients' connections and their guards' rate-limit databases."""
+        guards: Dict[int, Any] = {}
+        for llm in self.clients:
+            if hasattr(llm, "aclose"):
+                await llm.aclose()
+            guard = getattr(llm, "guard", None)
+            if guard is not None:
+                guards.setdefault(id(guard), guard)
+        for guard in guards.values():
+            guard.close()
+        if self.cache is not None:
+            self.cache.close()
+        logger.info("orchestrator.closed")
+
+    async def aanalyze(
+        self,
+        payload: ComplaintPayload,
+        *,
+        mode: Optional[str] = None,
+        profile: Optional[str] = None,
+    ) -> str:
+        """Analyze complaint using multiple agents and combine results.
+
+        Identical requests that arrive while one is already running share its
+        result instead of starting a second pipeline.
+        """
+        mode_name = self._resolve_mode(mode)
+        profile_name = profile or self.settings.pipeline_profile
+        if self.singleflight is None:
+            return await self._aanalyze(payload, mode_name, profile_name)
+        key = coalesce_key(payload, mode_name, profile_name)
+        return await self.singleflight.run(key, lambda: self._aanalyze(payload, mode_name, profile_name))
+
+    async def aanalyze_structured(self, payload: ComplaintPayload) -> ComplaintAnalysis:
+        """Analyze complaint in one JSON call and return the validated model."""
+        if self.singleflight is None:
+            return await self._aanalyze_structured(payload)
+        key = coalesce_key(payload, "structured")
+        return await self.singleflight.run(key, lambda: self._aanalyze_structured(payload))
+
+    async def _aanalyze_structured(self, payload: ComplaintPayload) -> ComplaintAnalysis:
+        logger.info("orchestrator.start", complaint=len(payload.complaint_text), mode="structured")
+        started = time.perf_counter()
+        draft = await self.structured_agent.aanalyze(payload)
+        PIPELINE_RUNS.inc("structured")
+        # A confident local prediction outranks the model's own category.
+        analysis = draft.to_analysis(self._route_decision(payload))
+        logger.info(
+            "agent.structured.done",
+            category=analysis.category.value,
+            steps=len(analysis.strategy),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        return analysis
+
+    async def _aanalyze(self, payload: ComplaintPayload, mode_name: str, profile_name: str) -> str:
+        reused = self._lookup_duplicate(payload)
+        if reused is not None:
+            PIPELINE_RUNS.inc("dedup")
+            return self._finish(reused)
+
+        sections: Optional[Mapping[str, str]] = None
+        if mode_name == "fused":
+            sections = await self._arun_fused(payload)
+            if sections is None:
+                logger.warning("orchestrator.fused.fallback")
+            else:
+                PIPELINE_RUNS.inc("fused")
+        if sections is None:
+            sections = await self._arun_agents(payload, profile_name)
+            PIPELINE_RUNS.inc("multi_agent")
+        self._remember(payload, sections)
+        return self._finish(sections)
+
+    async def astream(
+        self,
+        payload: ComplaintPayload,
+        *,
+        mode: Optional[str] = None,
+        profile: Optional[str] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        """Yield each stage's tokens as ``StreamChunk`` records while the pipeline runs.
+
+        Chunks carry the stage name as ``section``; with a parallel profile the
+        sections of concurrently running stages interleave.
+        """
+        mode_name = self._resolve_mode(mode)
+        queue: asyncio.Queue[Optional[StreamChunk]] = asyncio.Queue()
+
+        def emit(section: str, text: str) -> None:
+            if text:
+                queue.put_nowait(StreamChunk(section=section, payload=text))
+
+        async def produce() -> None:
+            try:
+                reused = self._lookup_duplicate(payload)
+                if reused is not None:
+                    for section in SECTION_ORDER:
+                        emit(section, reused[section])
+                    return
+                if mode_name == "fused":
+                    sections = await self._astream_fused(payload, emit)
+                else:
+                    profile_name = profile or self.settings.pipeline_profile
+                    sections = await self._arun_agents(payload, profile_name, sink=emit)
+                if sections is not None:
+                    self._remember(payload, sections)
+            finally:
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(produce())
+        try:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            # Surface a failed stage to the consumer once the queue drains.
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+
+    def _resolve_mode(self, mode: Optional[str]) -> str:
+        mode_name = mode or self.settings.pipeline_mode
+        if mode_name not in ("multi_agent", "fused"):
+            raise ValueError(f"Unknown pipeline mode '{mode_name}'. Use 'multi_agent' or 'fused'.")
+        return mode_name
+
+    async def _arun_agents(
+        self,
+        payload: ComplaintPayload,
+        profile: str,
+        sink: Optional[SectionSink] = None,
+    ) -> Mapping[str, str]:
+        """Run the four agents through the stage scheduler."""
+        logger.info(
+            "orchestrator.start",
+            complaint=len(payload.complaint_text),
+            mode="multi_agent",
+            profile=profile,
+        )
 
+        prompt_tokens: Dict[str, int] = {}
+        scheduler = StageScheduler(self._build_stages(payload, profile, sink, prompt_tokens))
+        run = await scheduler.run()
+        for name, value in run.timings.items():
+            STAGE_LATENCY.observe(name, value=value)
+
+        logger.info(
+            "orchestrator.stages",
+            duration_ms=round(run.total * 1000, 1),
+            stage_ms={name: round(value * 1000, 1) for name, value in run.timings.items()},
+            prompt_tokens=prompt_tokens,
+        )
+        return run.outputs
+
+    async def _arun_fused(self, payload: ComplaintPayload) -> Optional[Mapping[str, str]]:
+        """Run the one-shot prompt; return None when the reply cannot be split."""
+        logger.info("orchestrator.start", complaint=len(payload.complaint_text), mode="fused")
+        started = time.perf_counter()
+        raw = await self.fused_agent.aanalyze(payload)
+        sections = split_sections(raw)
+        missing = [name for name in SECTION_ORDER if name not in sections]
+        logger.info(
+            "agent.fused.done",
+            length=len(raw),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            missing=missing,
+        )
+        return None if missing else sections
+
+    async def _astream_fused(
+        self,
+        payload: ComplaintPayload,
+        sink: SectionSink,
+    ) -> Optional[Mapping[str, str]]:
+        """Stream the one-shot prompt, routing each line to its section."""
+        logger.info(
+            "orchestrator.start",
+            complaint=len(payload.complaint_text),
+            mode="fused",
+            stream=True,
+        )
+        splitter = SectionStream()
+
+        def on_token(text: str) -> None:
+            for section, piece in splitter.feed(text):
+                sink(section, piece)
+
+        raw = await self.fused_agent.aanalyze(payload, on_token=on_token)
+        for section, piece in splitter.flush():
+            sink(section, piece)
+        logger.info("orchestrator.end", total_length=len(raw))
+        sections = split_sections(raw)
+        return sections if all(name in sections for name in SECTION_ORDER) else None
+
+    def _route_decision(self, payload: ComplaintPayload) -> Optional[RouterDecision]:
+        """The local router's decision when it is confident enough to skip the LLM."""
+        if self.router is None:
+            return None
+        decision = self.router.route(payload)
+        if decision.confidence < self.settings.router_threshold:
+            self.router_misses += 1
+            return None
+        self.router_hits += 1
+        logger.info("router.fastpath", category=decision.category.value, confidence=decision.confidence)
+        return decision
+
+    def _route(self, payload: ComplaintPayload) -> Optional[str]:
+        """Classification text from the local router, or None to ask the LLM."""
+        decision = self._route_decision(payload)
+        if decision is None:
+            return None
+        return f"نوع الشكوى: {CATEGORY_LABELS[decision.category]}\nالسبب: {decision.rationale}"
+
+    def _lookup_duplicate(self, payload: ComplaintPayload) -> Optional[Mapping[str, str]]:
+        """Reuse a recent analysis of a near-identical complaint from the same company."""
+        if self.dedup is None:
+            return None
+        sections = self.dedup.lookup(payload)
+        if sections is not None:
+            logger.info("orchestrator.dedup.hit", complaint=len(payload.complaint_text))
+        return sections
+
+    def _remember(self, payload: ComplaintPayload, sections: Mapping[str, str]) -> None:
+        if self.dedup is not None:
+            self.dedup.add(payload, sections)
+
+    def _finish(self, sections: Mapping[str, str]) -> str:
+        # Combine all results into one comprehensive response
+        final_response = self._combine_results(
+            sections["classification"],
+            sections["emotion"],
+            sections["strategy"],
+            sections["reply"],
+        )
         logger.info("orchestrator.end", total_length=len(final_response))
         return final_response
 
-    def _combine_results(
+    def _build_stages(
         self,
-        classification: str,
-        emotions: str,
-        strategy: str,
-        formal_reply: str,
-    ) -> str:
-        """Combine all agent outputs into one formatted response."""
-        return f"""# تحليل شامل للشكوى
+        payload: ComplaintPayload,
+        profile: str,
+        sink: Optional[SectionSink] = None,
+        prompt_tokens: Optional[Dict[str, int]] = None,
+    ) -> List[Stage]:
+        """Bind each agent to the upstream outputs the profile allows it to see.
 
-## ١. التصنيف
-{classification}
+        Upstream outputs are compacted before they are passed on, and the
+        estimated prompt tokens of each stage are written to ``prompt_tokens``.
+        """
+        requires = resolve_profile(profile)
+        complaint_tokens = estimate_tokens(payload.complaint_text)
 
----
+        def context(stage: str, inputs: Mapping[str, str]) -> Mapping[str, str]:
+            sent = inputs if self.compactor is None else self.compactor.compact(stage, inputs)
+            upstream = sum(estimate_tokens(text) for text in inputs.values())
+            used = sum(estimate_tokens(text) for text in sent.values())
+            self.context_tokens["upstream"] += upstream
+            self.context_tokens["sent"] += used
+            if prompt_tokens is not None:
+                prompt_tokens[stage] = complaint_tokens + used
+            return sent
 
-## ٢. فهم المشاعر
-{emotions}
+        def tap(section: str) -> Optional[Callable[[str], None]]:
+            if sink is None:
+                return None
+            return lambda text: sink(section, text)
 
----
+        async def classification(inputs: Mapping[str, str]) -> str:
+            context("classification", inputs)
+            routed = self._route(payload)
+            if routed is not None:
+                if sink is not None:
+                    sink("classification", routed)
+                return routed
+            return await self.classifier.aclassify(payload, on_token=tap("classification"))
 
-## ٣. خطة المعالجة
-{strategy}
+        async def emotion(inputs: Mapping[str, str]) -> str:
+            inputs = context("emotion", inputs)
+            return await self.emotion_agent.aanalyze_emotions(
+                payload, inputs.get("classification"), on_token=tap("emotion")
+            )
 
----
+        async def strategy(inputs: Mapping[str, str]) -> str:
+            inputs = context("strategy", inputs)
+            return await self.strategy_agent.acreate_strategy(
+                payload, inputs["classification"], inputs.get("emotion"), on_token=tap("strategy")
+            )
 
-## ٤. الرد الرسمي
-{formal_reply}
-"""
+        async def reply(inputs: Mapping[str, str]) -> str:
+            inputs = context("reply", inputs)
+            return await self.reply_agent.acreate_reply(
+                payload,
+                inputs["classification"],
+                inputs["emotion"],
+                inputs["strategy"],
+                on_token=tap("reply"),
+            )
+
+        runners = {
+            "classification": classification,
+            "emotion": emotion,
+            "strategy": strategy,
+            "reply": reply,
+        }
+        return [Stage(name=name, run=runners[name], requires=requires[name]) for name in runners]
+
+    def _combine_results(
+        self,
+        classification: str,
+        emotions: str,
+        strategy: str,
+        formal_reply: str,
+    ) -> str:
+        """Combine all agent outputs into one formatted response."""
+        return format_report(
+            {"classification": classification, "emotion": emotions, "strategy": strategy, "reply": formal_reply}
+        )
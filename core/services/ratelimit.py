@@ -0,0 +1,200 @@
+"""Token-bucket rate limits shared by every process on the host.
+
+Provider quotas (requests and tokens per minute) are per API key, not per
+process, so several uvicorn workers each keeping their own count overshoot
+them together. The buckets live in one small SQLite file instead; each
+acquire is a single ``BEGIN IMMEDIATE`` transaction (tens of microseconds
+uncontended, no fsync), so all processes draw from one budget.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.services.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class SharedRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one quota scope.
+
+    Each bucket holds up to a minute's allowance and refills continuously.
+    ``acquire`` takes one request plus the prompt's tokens, waiting until
+    both buckets can pay; ``debit`` charges output tokens after the call and
+    may leave the token bucket in debt, which delays later acquires.
+    A limit of 0 disables that dimension.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        scope: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        busy_timeout_ms: int = 2000,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.scope = scope
+        # (bucket name, capacity, refill per second)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        if requests_per_minute:
+            self._buckets[f"{scope}:requests"] = (float(requests_per_minute), requests_per_minute / 60.0)
+        if tokens_per_minute:
+            self._buckets[f"{scope}:tokens"] = (float(tokens_per_minute), tokens_per_minute / 60.0)
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Bucket levels are soft state; losing the last writes in a crash is harmless.
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+            [(name, capacity, now) for name, (capacity, _) in self._buckets.items()],
+        )
+        # Monitoring reads use their own connection: under WAL they never wait for a
+        # writer, while ``_lock`` may be held by a thread waiting on another process.
+        self._reader = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._buckets)
+
+    def _costs(self, requests: float, tokens: float) -> List[Tuple[str, float]]:
+        costs = []
+        for name, (capacity, _) in self._buckets.items():
+            cost = requests if name.endswith(":requests") else tokens
+            # A single call larger than the whole bucket would wait forever.
+            costs.append((name, min(cost, capacity)))
+        return costs
+
+    def _levels(self, now: float, conn: Optional[sqlite3.Connection] = None) -> Dict[str, float]:
+        names = list(self._buckets)
+        marks = ",".join("?" * len(names))
+        rows = (conn or self._conn).execute(
+            f"SELECT name, level, updated_at FROM buckets WHERE name IN ({marks})", names
+        ).fetchall()
+        levels = {}
+        for name, level, updated_at in rows:
+            capacity, rate = self._buckets[name]
+            levels[name] = min(capacity, level + max(0.0, now - updated_at) * rate)
+        return levels
+
+    def try_acquire(self, *, requests: float = 1, tokens: float = 0) -> float:
+        """Pay for a call if every bucket can; otherwise return seconds until they can."""
+        if not self._buckets:
+            return 0.0
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = self._levels(now)
+                wait = 0.0
+                for name, cost in self._costs(requests, tokens):
+                    short = cost - levels[name]
+                    if short > 0:
+                        wait = max(wait, short / self._buckets[name][1])
+                if wait == 0.0:
+                    self._conn.executemany(
+                        "UPDATE buckets SET level = ?, updated_at = ? WHERE name = ?",
+                        [(levels[name] - cost, now, name) for name, cost in self._costs(requests, tokens)],
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire(self, *, requests: float = 1, tokens: float = 0) -> float:
+        """Wait until the call fits the shared budget; returns the seconds waited.
+
+        The transactions run in a worker thread: a ``BEGIN IMMEDIATE`` held
+        by another process can block for up to ``busy_timeout_ms``.
+        """
+        if not self._buckets:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, requests=requests, tokens=tokens)
+            if wait <= 0:
+                break
+            # Other processes draw from the same buckets, so re-check after sleeping.
+            await asyncio.sleep(wait)
+            waited += wait
+        if waited:
+            self.waits += 1
+            self.waited_seconds += waited
+            logger.info("ratelimit.waited", scope=self.scope, seconds=round(waited, 3))
+        return waited
+
+    def debit(self, tokens: float) -> None:
+        """Charge tokens already spent (the model's output), going into debt if needed."""
+        if tokens:
+            self._adjust({f"{self.scope}:tokens": -tokens})
+
+    def refund(self, *, requests: float = 1, tokens: float = 0) -> None:
+        """Give back what ``try_acquire`` took for a call that was never sent."""
+        self._adjust({name: cost for name, cost in self._costs(requests, tokens)})
+
+    def _adjust(self, deltas: Dict[str, float]) -> None:
+        deltas = {name: delta for name, delta in deltas.items() if delta and name in self._buckets}
+        if not deltas:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = self._levels(now)
+                self._conn.executemany(
+                    "UPDATE buckets SET level = ?, updated_at = ? WHERE name = ?",
+                    [
+                        (min(self._buckets[name][0], levels[name] + delta), now, name)
+                        for name, delta in deltas.items()
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def adebit(self, tokens: float) -> None:
+        """``debit`` off the event loop."""
+        if tokens and f"{self.scope}:tokens" in self._buckets:
+            await asyncio.to_thread(self.debit, tokens)
+
+    async def arefund(self, *, requests: float = 1, tokens: float = 0) -> None:
+        """``refund`` off the event loop."""
+        if self._buckets:
+            await asyncio.to_thread(self.refund, requests=requests, tokens=tokens)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Bucket levels for monitoring; safe to call on the event loop."""
+        with self._read_lock:
+            levels = self._levels(time.time(), self._reader) if self._buckets else {}
+        status: Dict[str, object] = {
+            name.rsplit(":", 1)[1]: {"level": round(levels.get(name, 0.0), 1), "capacity": capacity}
+            for name, (capacity, _) in self._buckets.items()
+        }
+        status["waits"] = self.waits
+        status["waited_seconds"] = round(self.waited_seconds, 3)
+        return status
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
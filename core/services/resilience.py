@@ -0,0 +1,256 @@
+"""Deadlines, retries and hedging for LLM calls.
+
+Each stage call gets one deadline, its stage timeout, shared by all attempts
+and the backoff between them. Transient provider errors are retried with
+jittered exponential backoff (``tenacity``) while the deadline allows. With hedging on, a second
+identical call is fired once an attempt outlives the stage's observed p95
+latency; the first to succeed wins and the other is cancelled. Hedges are
+capped at a share of calls so a slow provider does not double our load.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Mapping, Optional, TypeVar
+
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from core.services.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Monotonic deadline of the stage call running in this context. Deadlines reach
+# the provider call as a plain cancellation; this tells them apart from hedge
+# losers and client disconnects.
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("llm_call_deadline", default=None)
+# asyncio.wait_for fires on the loop clock, which may run a hair early.
+_DEADLINE_SLACK = 0.005
+
+
+def deadline_expired() -> bool:
+    """Whether the current stage call's deadline has passed (see ``ResilientCaller``)."""
+    deadline = _DEADLINE.get()
+    return deadline is not None and time.monotonic() >= deadline - _DEADLINE_SLACK
+
+# Provider exception class names worth retrying (google.api_core, openai, httpx).
+_TRANSIENT_NAMES = {
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TooManyRequests",
+    "ResourceExhausted",
+    "GatewayTimeout",
+    "APITimeoutError",
+    "APIConnectionError",
+    "RateLimitError",
+    "ConnectError",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "RemoteProtocolError",
+    "ReadError",
+    "WriteError",
+    "WriteTimeout",
+    "PoolTimeout",
+}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether retrying the same call has a reasonable chance of succeeding."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies for one stage."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class CallPolicy:
+    timeout_seconds: Optional[float] = 60.0
+    stage_timeouts: Mapping[str, float] = field(default_factory=dict)
+    retries: int = 2
+    backoff_seconds: float = 0.5
+    backoff_max_seconds: float = 8.0
+    hedge: bool = False
+    hedge_max_ratio: float = 0.05
+    hedge_min_samples: int = 20
+
+    def timeout_for(self, stage: str) -> Optional[float]:
+        timeout = self.stage_timeouts.get(stage, self.timeout_seconds)
+        return timeout or None
+
+
+class ResilientCaller:
+    """Run LLM calls for named stages under a ``CallPolicy``."""
+
+    def __init__(self, policy: Optional[CallPolicy] = None) -> None:
+        self.policy = policy or CallPolicy()
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def latency(self, stage: str) -> LatencyTracker:
+        return self._latency.setdefault(stage, LatencyTracker())
+
+    async def call(
+        self,
+        stage: str,
+        factory: Callable[[], Awaitable[T]],
+        *,
+        hedge: bool = True,
+        can_retry: Callable[[], bool] = lambda: True,
+    ) -> T:
+        """Await ``factory()`` with the stage's deadline, retries and hedging.
+
+        The stage timeout bounds the whole call: attempts get what is left of
+        it, and no retry is started whose backoff would run past it.
+
+        ``factory`` must start a fresh call each time it is invoked. Pass
+        ``hedge=False`` and a ``can_retry`` guard for calls with side effects,
+        such as streams that already forwarded tokens.
+        """
+        policy = self.policy
+        self.calls += 1
+        timeout = policy.timeout_for(stage)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        def should_retry(exc: BaseException) -> bool:
+            return is_transient(exc) and can_retry()
+
+        def before_sleep(state) -> None:
+            self.retries += 1
+            logger.warning(
+                "llm.retry",
+                stage=stage,
+                attempt=state.attempt_number,
+                error=type(state.outcome.exception()).__name__,
+            )
+
+        out_of_attempts = stop_after_attempt(policy.retries + 1)
+
+        def should_stop(state) -> bool:
+            if out_of_attempts(state):
+                return True
+            return deadline is not None and time.monotonic() + state.upcoming_sleep >= deadline
+
+        retrying = AsyncRetrying(
+            stop=should_stop,
+            wait=wait_random_exponential(multiplier=policy.backoff_seconds, max=policy.backoff_max_seconds),
+            retry=retry_if_exception(should_retry),
+            before_sleep=before_sleep,
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                return await self._attempt(stage, factory, hedge and policy.hedge, deadline)
+        raise AssertionError("unreachable")  # reraise=True always returns or raises
+
+    async def _attempt(
+        self, stage: str, factory: Callable[[], Awaitable[T]], hedge: bool, deadline: Optional[float]
+    ) -> T:
+        timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        started = time.perf_counter()
+        token = _DEADLINE.set(deadline)
+        try:
+            if hedge:
+                result = await asyncio.wait_for(self._hedged(stage, factory), timeout)
+            else:
+                result = await asyncio.wait_for(factory(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("llm.timeout", stage=stage, timeout_seconds=self.policy.timeout_for(stage))
+            raise
+        finally:
+            _DEADLINE.reset(token)
+        self.latency(stage).add(time.perf_counter() - started)
+        return result
+
+    def _hedge_delay(self, stage: str) -> Optional[float]:
+        tracker = self.latency(stage)
+        if len(tracker) < self.policy.hedge_min_samples:
+            return None
+        if self.hedges_fired >= self.policy.hedge_max_ratio * self.calls:
+            return None
+        return tracker.quantile(0.95)
+
+    async def _hedged(self, stage: str, factory: Callable[[], Awaitable[T]]) -> T:
+        delay = self._hedge_delay(stage)
+        primary = asyncio.ensure_future(factory())
+        if delay is None:
+            return await primary
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+        # Re-check the budget: other calls may have hedged while we waited.
+        if self._hedge_delay(stage) is None:
+            return await primary
+
+        self.hedges_fired += 1
+        backup = asyncio.ensure_future(factory())
+        logger.info("llm.hedge.fired", stage=stage, after_ms=round(delay * 1000, 1))
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+
+    def stats(self) -> Dict[str, float]:
+        latency = {
+            stage: round((tracker.quantile(0.95) or 0.0) * 1000, 1)
+            for stage, tracker in self._latency.items()
+        }
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "p95_ms": latency,
+        }
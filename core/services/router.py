@@ -0,0 +1,181 @@
+"""Local fast-path classifier that can skip the classification LLM call.
+
+Character n-gram hashing features feed a multinomial logistic regression
+trained offline with NumPy. Only predictions above a confidence threshold
+are trusted; everything else still goes to ``ClassificationAgent``.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.schemas import CATEGORY_LABELS, ComplaintCategory, ComplaintPayload, RouterDecision
+from core.services.normalize import normalize_arabic
+
+CLASSES: Tuple[ComplaintCategory, ...] = tuple(ComplaintCategory)
+
+
+class HashingVectorizer:
+    """Hash character n-grams of normalized text into a fixed-size sparse vector."""
+
+    def __init__(self, n_features: int = 1 << 18, ngram_range: Tuple[int, int] = (2, 4)) -> None:
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+
+    def transform_one(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, L2-normalized counts) for one document."""
+        padded = f" {normalize_arabic(text)} "
+        counts: Dict[int, int] = {}
+        low, high = self.ngram_range
+        for size in range(low, high + 1):
+            for start in range(len(padded) - size + 1):
+                index = zlib.crc32(padded[start : start + size].encode("utf-8")) % self.n_features
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            counts[0] = 1
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values /= np.sqrt(np.dot(values, values))
+        return indices, values
+
+    def transform(self, texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorize many documents into CSR arrays (indptr, indices, values)."""
+        indptr = [0]
+        all_indices: List[np.ndarray] = []
+        all_values: List[np.ndarray] = []
+        for text in texts:
+            indices, values = self.transform_one(text)
+            all_indices.append(indices)
+            all_values.append(values)
+            indptr.append(indptr[-1] + len(indices))
+        return (
+            np.asarray(indptr, dtype=np.int64),
+            np.concatenate(all_indices) if all_indices else np.zeros(0, dtype=np.int64),
+            np.concatenate(all_values) if all_values else np.zeros(0, dtype=np.float32),
+        )
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+@dataclass
+class TrainingReport:
+    samples: int
+    epochs: int
+    final_loss: float
+
+
+class FastPathRouter:
+    """Linear model over hashed n-grams producing a ``RouterDecision``."""
+
+    def __init__(
+        self,
+        vectorizer: Optional[HashingVectorizer] = None,
+        weights: Optional[np.ndarray] = None,
+        bias: Optional[np.ndarray] = None,
+    ) -> None:
+        self.vectorizer = vectorizer or HashingVectorizer()
+        n_features = self.vectorizer.n_features
+        if weights is None:
+            weights = np.zeros((n_features, len(CLASSES)), dtype=np.float32)
+        if bias is None:
+            bias = np.zeros(len(CLASSES), dtype=np.float32)
+        self.weights = weights
+        self.bias = bias
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        indices, values = self.vectorizer.transform_one(text)
+        logits = values @ self.weights[indices] + self.bias
+        return _softmax(logits)
+
+    def route(self, payload: ComplaintPayload) -> RouterDecision:
+        return self.decide(payload.complaint_text)
+
+    def decide(self, text: str) -> RouterDecision:
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        confidence = min(max(float(probabilities[best]), 0.0), 1.0)
+        category = CLASSES[best]
+        label = CATEGORY_LABELS[category]
+        return RouterDecision(
+            category=category,
+            confidence=round(confidence, 4),
+            rationale=f"تصنيف آلي بواسطة المصنف المحلي: {label} (ثقة {confidence:.2f})",
+        )
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[ComplaintCategory],
+        *,
+        epochs: int = 20,
+        learning_rate: float = 5.0,
+        l2: float = 1e-6,
+        batch_size: int = 64,
+        seed: int = 13,
+    ) -> TrainingReport:
+        """Mini-batch gradient descent on the cross-entropy loss."""
+        indptr, indices, values = self.vectorizer.transform(texts)
+        targets = np.asarray([CLASSES.index(label) for label in labels], dtype=np.int64)
+        samples = len(targets)
+        rng = np.random.default_rng(seed)
+        loss = float("nan")
+
+        for _ in range(epochs):
+            order = rng.permutation(samples)
+            epoch_loss = 0.0
+            for start in range(0, samples, batch_size):
+                batch = order[start : start + batch_size]
+                starts, ends = indptr[batch], indptr[batch + 1]
+                gather = np.concatenate([np.arange(begin, end) for begin, end in zip(starts, ends)])
+                local = np.repeat(np.arange(len(batch)), ends - starts)
+                batch_indices = indices[gather]
+                batch_values = values[gather]
+
+                logits = np.zeros((len(batch), len(CLASSES)), dtype=np.float32)
+                np.add.at(logits, local, batch_values[:, None] * self.weights[batch_indices])
+                probabilities = _softmax(logits + self.bias)
+                picked = (np.arange(len(batch)), targets[batch])
+                epoch_loss -= float(np.log(probabilities[picked] + 1e-12).sum())
+
+                gradient = probabilities
+                gradient[picked] -= 1.0
+                gradient /= len(batch)
+                weight_grad = batch_values[:, None] * gradient[local]
+                np.add.at(self.weights, batch_indices, -learning_rate * weight_grad)
+                self.weights[batch_indices] *= 1.0 - learning_rate * l2
+                self.bias -= learning_rate * gradient.sum(axis=0)
+            loss = epoch_loss / max(samples, 1)
+
+        return TrainingReport(samples=samples, epochs=epochs, final_loss=round(loss, 5))
+
+    def save(self, path: str) -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "classes": [category.value for category in CLASSES],
+            "n_features": self.vectorizer.n_features,
+            "ngram_range": list(self.vectorizer.ngram_range),
+        }
+        with target.open("wb") as handle:
+            np.savez_compressed(handle, weights=self.weights, bias=self.bias, meta=json.dumps(meta))
+
+    @classmethod
+    def load(cls, path: str) -> "FastPathRouter":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["classes"] != [category.value for category in CLASSES]:
+                raise ValueError(f"Router model at {path} was trained on different categories.")
+            vectorizer = HashingVectorizer(meta["n_features"], tuple(meta["ngram_range"]))
+            weights = data["weights"].astype(np.float32)
+            bias = data["bias"].astype(np.float32)
+        return cls(vectorizer, weights=weights, bias=bias)
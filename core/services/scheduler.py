@@ -0,0 +1,143 @@
+"""Dependency-aware stage scheduler for the agent pipeline."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, Tuple
+
+from core.services.logging import get_logger
+
+logger = get_logger(__name__)
+
+StageFn = Callable[[Mapping[str, str]], Awaitable[str]]
+
+
+# Which upstream stages each agent waits for. Every profile produces the same
+# four sections; they only differ in how much of the upstream context an agent
+# sees and therefore how much of the pipeline can overlap.
+DEPENDENCY_PROFILES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    # Original behaviour: every agent sees every previous output.
+    "sequential": {
+        "classification": (),
+        "emotion": ("classification",),
+        "strategy": ("classification", "emotion"),
+        "reply": ("classification", "emotion", "strategy"),
+    },
+    # Emotion analysis only needs the complaint text, so it runs alongside
+    # classification.
+    "parallel": {
+        "classification": (),
+        "emotion": (),
+        "strategy": ("classification", "emotion"),
+        "reply": ("classification", "emotion", "strategy"),
+    },
+    # Strategy starts as soon as the category is known; emotions only gate
+    # the customer-facing reply.
+    "wide": {
+        "classification": (),
+        "emotion": (),
+        "strategy": ("classification",),
+        "reply": ("classification", "emotion", "strategy"),
+    },
+}
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A single pipeline step and the upstream outputs it needs."""
+
+    name: str
+    run: StageFn
+    requires: Tuple[str, ...] = ()
+
+
+@dataclass
+class ScheduleResult:
+    outputs: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    total: float = 0.0
+
+
+class StageScheduler:
+    """Run stages as asyncio tasks, starting each one as soon as its inputs exist."""
+
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages: List[Stage] = self._toposort(list(stages))
+
+    @staticmethod
+    def _toposort(stages: List[Stage]) -> List[Stage]:
+        by_name = {stage.name: stage for stage in stages}
+        if len(by_name) != len(stages):
+            raise ValueError("Duplicate stage names in pipeline.")
+        for stage in stages:
+            missing = [dep for dep in stage.requires if dep not in by_name]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+        ordered: List[Stage] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str) -> None:
+            mark = state.get(name)
+            if mark == 2:
+                return
+            if mark == 1:
+                raise ValueError(f"Dependency cycle detected at stage '{name}'.")
+            state[name] = 1
+            for dep in by_name[name].requires:
+                visit(dep)
+            state[name] = 2
+            ordered.append(by_name[name])
+
+        for stage in stages:
+            visit(stage.name)
+        return ordered
+
+    async def run(self) -> ScheduleResult:
+        """Execute the DAG and return every stage output with per-stage timings."""
+        result = ScheduleResult()
+        tasks: Dict[str, asyncio.Task] = {}
+        started = time.perf_counter()
+
+        async def execute(stage: Stage, deps: List[asyncio.Task]) -> str:
+            if deps:
+                await asyncio.gather(*deps)
+            inputs = {name: result.outputs[name] for name in stage.requires}
+            logger.info(f"agent.{stage.name}.start", waits_for=list(stage.requires))
+            stage_start = time.perf_counter()
+            output = await stage.run(inputs)
+            elapsed = time.perf_counter() - stage_start
+            result.outputs[stage.name] = output
+            result.timings[stage.name] = elapsed
+            logger.info(
+                f"agent.{stage.name}.done",
+                length=len(output),
+                duration_ms=round(elapsed * 1000, 1),
+            )
+            return output
+
+        for stage in self.stages:
+            deps = [tasks[name] for name in stage.requires]
+            tasks[stage.name] = asyncio.create_task(execute(stage, deps), name=f"stage:{stage.name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        result.total = time.perf_counter() - started
+        return result
+
+
+def resolve_profile(name: str) -> Dict[str, Tuple[str, ...]]:
+    """Look up a dependency profile by name."""
+    if name not in DEPENDENCY_PROFILES:
+        raise ValueError(
+            f"Unknown pipeline profile '{name}'. Choose one of: {', '.join(DEPENDENCY_PROFILES)}."
+        )
+    return DEPENDENCY_PROFILES[name]
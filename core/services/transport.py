@@ -0,0 +1,432 @@
+"""Concurrency control for outbound LLM calls."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from core.services.metrics import REGISTRY
+from core.services.ratelimit import SharedRateLimiter
+from core.services.resilience import deadline_expired, is_transient
+
+LLM_REQUESTS = REGISTRY.counter("llm_requests_total", "Provider calls by outcome.", ["provider", "outcome"])
+LLM_LATENCY = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Provider call latency, excluding time queued at the gate.", ["provider"]
+)
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for an in-flight slot.", ["provider"]
+)
+LLM_RATE_WAIT = REGISTRY.histogram(
+    "llm_rate_limit_wait_seconds", "Time spent waiting for the shared rate-limit budget.", ["provider"]
+)
+
+
+class LLMBackpressureError(RuntimeError):
+    """Raised when the LLM wait queue is full and a call is rejected outright."""
+
+
+class InflightGate:
+    """FIFO gate capping concurrent provider calls, with a bounded wait queue.
+
+    Unlike ``asyncio.Semaphore`` the limit can be changed at runtime and the gate
+    keeps the counters we need for monitoring. The Streamlit app runs one loop
+    per click, in several threads, against one cached client; the counters are
+    therefore guarded by a thread lock, and a waiter on another loop is woken
+    through that loop's ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, limit: int, max_waiting: Optional[int] = None) -> None:
+        if limit < 1:
+            raise ValueError("In-flight limit must be at least 1.")
+        self._limit = limit
+        self.max_waiting = max_waiting if max_waiting and max_waiting > 0 else None
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.rejected = 0
+        self.queued = 0
+        self.peak_waiting = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @limit.setter
+    def limit(self, value: int) -> None:
+        with self._lock:
+            self._limit = max(1, int(value))
+            self._wake()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def reject_if_full(self) -> None:
+        """Raise ``LLMBackpressureError`` if ``acquire`` would reject right now."""
+        if self._in_flight < self._limit and not self._waiters:
+            return
+        if self.max_waiting is not None and len(self._waiters) >= self.max_waiting:
+            self.rejected += 1
+            raise LLMBackpressureError(
+                f"LLM queue is full ({len(self._waiters)} waiting, {self._in_flight} in flight)."
+            )
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self._in_flight < self._limit and not self._waiters:
+                self._in_flight += 1
+                self.acquired += 1
+                return
+            self.reject_if_full()
+
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            self.queued += 1
+            self.peak_waiting = max(self.peak_waiting, len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just before cancellation; pass it on.
+                self.release()
+            else:
+                with self._lock, contextlib.suppress(ValueError):
+                    self._waiters.remove(future)
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.acquired += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters; the caller holds ``_lock``."""
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        while self._waiters and self._in_flight < self._limit:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._in_flight += 1
+            loop = future.get_loop()
+            if loop is current:
+                future.set_result(None)
+                continue
+            try:
+                loop.call_soon_threadsafe(self._hand_over, future)
+            except RuntimeError:  # that loop is closed; its waiter is gone
+                self._in_flight -= 1
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        """Runs on the waiter's loop; the waiter may have been cancelled meanwhile."""
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Current counters, suitable for logging or a health endpoint."""
+        return {
+            "limit": self._limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "peak_waiting": self.peak_waiting,
+            "acquired": self.acquired,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float = 0.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Errors that mean "slow down" rather than "this request is bad".
+_OVERLOAD_NAMES = {"ResourceExhausted", "TooManyRequests", "RateLimitError", "ServiceUnavailable"}
+
+
+def is_overload(exc: BaseException) -> bool:
+    if type(exc).__name__ in _OVERLOAD_NAMES:
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status in (429, 503)
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease control of a gate's limit.
+
+    The limit grows by one after a full window of healthy calls and is cut by
+    ``decrease`` on throttling errors or when latency exceeds ``tolerance``
+    times the learned baseline. Cuts are spaced by at least the baseline
+    latency so one burst of errors counts as a single congestion signal.
+    """
+
+    def __init__(
+        self,
+        gate: InflightGate,
+        *,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        decrease: float = 0.5,
+        tolerance: float = 2.0,
+    ) -> None:
+        self.gate = gate
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or gate.limit)
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.baseline: Optional[float] = None
+        self._credit = 0.0
+        self._last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    def on_success(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            if self.baseline is None:
+                self.baseline = latency
+            elif latency > self.tolerance * self.baseline:
+                self._cut()
+                return
+            else:
+                # Slow-moving average so the baseline tracks prompt size drift.
+                self.baseline += 0.05 * (latency - self.baseline)
+        self._credit += 1.0 / self.gate.limit
+        if self._credit >= 1.0:
+            self._credit = 0.0
+            if self.gate.limit < self.max_limit:
+                self.gate.limit += 1
+                self.increases += 1
+
+    def on_overload(self) -> None:
+        self._cut()
+
+    def _cut(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self._credit = 0.0
+        new_limit = max(self.min_limit, int(self.gate.limit * self.decrease))
+        if new_limit < self.gate.limit:
+            self.gate.limit = new_limit
+            self.decreases += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "limit": self.gate.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "baseline_ms": round((self.baseline or 0.0) * 1000, 1),
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+class CircuitBreaker:
+    """Fail fast after ``failure_threshold`` consecutive provider failures.
+
+    After ``reset_seconds`` open, one probe call is let through (half-open);
+    its success closes the circuit and its failure re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def before_call(self) -> bool:
+        """Admit a call or raise ``CircuitOpenError``; returns True for a probe."""
+        state = self.state
+        if state == self.CLOSED:
+            return False
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"LLM provider circuit is open; retry in {retry_in:.0f}s.", retry_after=retry_in)
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def abandon_probe(self) -> None:
+        """A probe was cancelled before it told us anything; allow another."""
+        self._probing = False
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class ProviderGuard:
+    """Breaker, shared rate limit, adaptive limit and in-flight gate around one provider client."""
+
+    def __init__(
+        self,
+        gate: InflightGate,
+        *,
+        limiter: Optional[AIMDLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+        provider: str = "llm",
+    ) -> None:
+        self.gate = gate
+        self.limiter = limiter
+        self.breaker = breaker
+        self.rate_limiter = rate_limiter
+        self.provider = provider
+
+    @contextlib.asynccontextmanager
+    async def call(self, *, measure: bool = True, tokens: int = 0) -> AsyncIterator[None]:
+        """Hold a provider slot; ``measure=False`` skips the latency signal (streams).
+
+        ``tokens`` (the prompt's estimate) is drawn from the shared
+        tokens-per-minute budget along with one request.
+        """
+        try:
+            probe = self.breaker.before_call() if self.breaker is not None else False
+        except CircuitOpenError:
+            LLM_REQUESTS.inc(self.provider, "circuit_open")
+            raise
+        queued = time.perf_counter()
+        sent = paid = False
+        try:
+            if self.rate_limiter is not None:
+                # Do not spend shared budget on a call the gate would reject anyway.
+                self.gate.reject_if_full()
+                waited = await self.rate_limiter.acquire(tokens=tokens)
+                paid = True
+                LLM_RATE_WAIT.observe(self.provider, value=waited)
+            async with self.gate.slot():
+                sent = True
+                started = time.perf_counter()
+                LLM_QUEUE_WAIT.observe(self.provider, value=started - queued)
+                yield
+                elapsed = time.perf_counter() - started
+        except asyncio.CancelledError:
+            if sent and deadline_expired():
+                # A stage deadline: the provider is too slow, which is a congestion signal.
+                LLM_REQUESTS.inc(self.provider, "timeout")
+                if self.limiter is not None:
+                    self.limiter.on_overload()
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+            else:
+                # Out of time in our own queue or rate limit, a hedge loser or a client
+                # disconnect: none of these says anything about the provider.
+                LLM_REQUESTS.inc(self.provider, "queue_timeout" if deadline_expired() else "cancelled")
+                if probe:
+                    self.breaker.abandon_probe()
+            raise
+        except LLMBackpressureError:
+            # Rejected by our own gate; the provider was never asked.
+            LLM_REQUESTS.inc(self.provider, "rejected")
+            if probe:
+                self.breaker.abandon_probe()
+            if paid and not sent:
+                # The queue filled up while we waited for the rate limit.
+                await self.rate_limiter.arefund(tokens=tokens)
+            raise
+        except Exception as exc:
+            overload = is_overload(exc)
+            LLM_REQUESTS.inc(self.provider, "overload" if overload else "error")
+            if self.limiter is not None and overload:
+                self.limiter.on_overload()
+            if self.breaker is not None:
+                if is_transient(exc):
+                    self.breaker.record_failure()
+                elif probe:
+                    # A request-level error still proves the provider answers.
+                    self.breaker.record_success()
+            raise
+        LLM_REQUESTS.inc(self.provider, "ok")
+        if measure:
+            LLM_LATENCY.observe(self.provider, value=elapsed)
+        if self.limiter is not None:
+            self.limiter.on_success(elapsed if measure else None)
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    async def charge(self, tokens: int) -> None:
+        """Count output tokens against the shared budget once a call has returned."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.adebit(tokens)
+
+    def close(self) -> None:
+        """Close the shared rate limiter's database connection."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.close()
+
+    def snapshot(self) -> Dict[str, object]:
+        status: Dict[str, object] = dict(self.gate.snapshot())
+        if self.limiter is not None:
+            status["adaptive"] = self.limiter.snapshot()
+        if self.rate_limiter is not None:
+            status["rate_limit"] = self.rate_limiter.snapshot()
+        if self.breaker is not None:
+            status["breaker"] = self.breaker.snapshot()
+        return status
@@ -1,6 +1,7 @@
 import asyncio
 import os
 import sys
+import time
 from pathlib import Path
 
 import streamlit as st
@@ -10,8 +11,9 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from core.config import get_settings
+from core.prompts.parsing import SECTION_ORDER
 from core.schemas import ComplaintPayload, CompanyDetails
-from core.services.orchestrator import ComplaintOrchestrator
+from frontend.backend_client import BackendStreamClient, render_report
 
 # Page configuration
 st.set_page_config(
@@ -114,19 +116,57 @@ def _ensure_llm_key() -> None:
 
 
 @st.cache_resource
-def get_orchestrator() -> ComplaintOrchestrator:
-    """Get cached orchestrator instance."""
+def get_orchestrator():
+    """Get cached orchestrator instance (only when the UI runs the pipeline itself)."""
+    from core.services.orchestrator import ComplaintOrchestrator
+
     _ensure_llm_key()
     settings = get_settings()
     return ComplaintOrchestrator(settings=settings, verbose_agents=True)
 
 
+@st.cache_resource
+def get_backend_client() -> BackendStreamClient:
+    """One pooled HTTP client shared by every session of this UI process."""
+    settings = get_settings()
+    return BackendStreamClient(
+        settings.frontend_backend_url,
+        timeout_seconds=settings.frontend_timeout_seconds,
+        max_connections=settings.frontend_max_connections,
+    )
+
+
 def analyze_locally(payload: ComplaintPayload) -> str:
     """Analyze complaint and return plain Arabic text."""
     orchestrator = get_orchestrator()
     return asyncio.run(orchestrator.aanalyze(payload))
 
 
+def analyze_remotely(payload: ComplaintPayload) -> str:
+    """Stream the analysis from the backend into the same styled container as local mode."""
+    st.markdown("---")
+    st.markdown("### 📊 نتائج التحليل")
+    placeholder = st.empty()
+    sections = {section: "" for section in SECTION_ORDER}
+    last_paint = 0.0
+    for chunk in get_backend_client().stream(payload):
+        if chunk.section not in sections:
+            continue
+        sections[chunk.section] += chunk.payload
+        # Repaint at most every 50 ms; each repaint is a message to the browser.
+        now = time.monotonic()
+        if now - last_paint >= 0.05:
+            _paint(placeholder, render_report(sections))
+            last_paint = now
+    report = render_report(sections)
+    _paint(placeholder, report)
+    return report
+
+
+def _paint(placeholder, analysis_text: str) -> None:
+    placeholder.markdown(f'<div class="analysis-container">{analysis_text}</div>', unsafe_allow_html=True)
+
+
 # Sidebar
 with st.sidebar:
     st.markdown("### ⚙️ إعدادات الشركة")
@@ -184,18 +224,22 @@ if analyze_button and complaint_text:
     )
 
     try:
-        with st.spinner("🔄 جارٍ تحليل الشكوى باستخدام الذكاء الاصطناعي..."):
-            analysis_text = analyze_locally(payload_model)
+        if get_settings().frontend_backend_url:
+            analysis_text = analyze_remotely(payload_model)
+            st.success("✅ تم توليد التحليل بنجاح!")
+        else:
+            with st.spinner("🔄 جارٍ تحليل الشكوى باستخدام الذكاء الاصطناعي..."):
+                analysis_text = analyze_locally(payload_model)
 
-        st.success("✅ تم توليد التحليل بنجاح!")
-        
-        # Display the analysis in a styled container
-        st.markdown("---")
-        st.markdown("### 📊 نتائج التحليل")
-        st.markdown(
-            f'<div class="analysis-container">{analysis_text}</div>',
-            unsafe_allow_html=True
-        )
+            st.success("✅ تم توليد التحليل بنجاح!")
+
+            # Display the analysis in a styled container
+            st.markdown("---")
+            st.markdown("### 📊 نتائج التحليل")
+            st.markdown(
+                f'<div class="analysis-container">{analysis_text}</div>',
+                unsafe_allow_html=True
+            )
         
         # Add download button for the analysis
         st.download_button(
@@ -0,0 +1,68 @@
+"""Client for the backend's NDJSON stream, used when the UI does not run the pipeline itself."""
+
+from __future__ import annotations
+
+import json
+from typing import Iterator, Mapping, Optional
+
+import httpx
+
+from core.prompts.parsing import format_report
+from core.schemas import ComplaintPayload, StreamChunk
+
+
+class BackendStreamError(RuntimeError):
+    """The backend reported a failure inside an already started stream."""
+
+
+class BackendStreamClient:
+    """Pooled synchronous client for ``POST /analyze/stream``.
+
+    Streamlit runs each session's script in its own thread; one
+    ``httpx.Client`` (thread-safe) is shared by all of them, so reruns reuse
+    warm keep-alive connections instead of opening one per click.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout_seconds: Optional[float] = 120.0,
+        max_connections: int = 20,
+        transport: Optional[httpx.BaseTransport] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        options = {}
+        if transport is not None:
+            options["transport"] = transport
+        # Streams are slow to finish but quick to start; only the gaps are bounded.
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(timeout_seconds, connect=10.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            **options,
+        )
+
+    def stream(self, payload: ComplaintPayload, *, mode: Optional[str] = None) -> Iterator[StreamChunk]:
+        """Yield section deltas as the backend produces them."""
+        params = {"mode": mode} if mode else {}
+        body = json.loads(payload.model_dump_json())
+        with self._client.stream("POST", "/analyze/stream", json=body, params=params) as response:
+            if response.is_error:
+                response.read()
+                response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                chunk = StreamChunk.model_validate_json(line)
+                if chunk.section == "error":
+                    raise BackendStreamError(chunk.payload)
+                yield chunk
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def render_report(sections: Mapping[str, str]) -> str:
+    """Markdown report of the sections received so far, laid out like the in-process one."""
+    return format_report({section: text.strip() for section, text in sections.items() if text.strip()})
@@ -0,0 +1,69 @@
+import json
+
+import httpx
+import pytest
+
+from benchmarks.fake_llm import FakeLLM, FakeLLMProfile
+from core.config import AppSettings
+from core.schemas import CompanyDetails, ComplaintPayload, StreamChunk
+from core.services.orchestrator import ComplaintOrchestrator
+from frontend.backend_client import BackendStreamClient, BackendStreamError, render_report
+
+
+def build_payload() -> ComplaintPayload:
+    return ComplaintPayload(
+        complaint_text="طلبت شحنة غذاء وتأخر السائق ساعتين ولم يرد على الاتصالات.",
+        company=CompanyDetails(name="سريع", service="توصيل المنازل"),
+    )
+
+
+def ndjson(*chunks: StreamChunk) -> bytes:
+    return "".join(chunk.model_dump_json() + "\n" for chunk in chunks).encode("utf-8")
+
+
+def test_stream_yields_sections_in_arrival_order():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        body = ndjson(
+            StreamChunk(section="classification", payload="تأخير "),
+            StreamChunk(section="emotion", payload="غضب"),
+            StreamChunk(section="classification", payload="في التوصيل"),
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "application/x-ndjson"})
+
+    client = BackendStreamClient("http://backend:8080/", transport=httpx.MockTransport(handler))
+    chunks = list(client.stream(build_payload(), mode="fused"))
+    client.close()
+
+    assert [chunk.section for chunk in chunks] == ["classification", "emotion", "classification"]
+    assert str(seen[0].url) == "http://backend:8080/analyze/stream?mode=fused"
+    assert json.loads(seen[0].content)["company"]["name"] == "سريع"
+
+    sections = {"emotion": "غضب", "classification": "تأخير في التوصيل"}
+    report = render_report(sections)
+    assert report.index("التصنيف") < report.index("فهم المشاعر")
+    assert "خطة المعالجة" not in report
+
+
+def test_streamed_report_matches_in_process_layout():
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(LLM_WARMUP=False), llm=FakeLLM(FakeLLMProfile()))
+    texts = {"classification": "تأخير", "emotion": "غضب", "strategy": "تعويض", "reply": "نعتذر"}
+    combined = orchestrator._combine_results(texts["classification"], texts["emotion"], texts["strategy"], texts["reply"])
+    assert render_report(texts) == combined
+
+
+def test_stream_raises_on_in_band_and_http_errors():
+    failing = BackendStreamClient(
+        "http://backend",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=ndjson(StreamChunk(section="error", payload="quota")))
+        ),
+    )
+    with pytest.raises(BackendStreamError, match="quota"):
+        list(failing.stream(build_payload()))
+
+    unavailable = BackendStreamClient("http://backend", transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    with pytest.raises(httpx.HTTPStatusError):
+        list(unavailable.stream(build_payload()))
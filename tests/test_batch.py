@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from core.schemas import BatchItem, CompanyDetails, ComplaintPayload
+from core.services.batch import run_batch
+
+
+class SlowOrchestrator:
+    def __init__(self) -> None:
+        self.active = 0
+        self.peak = 0
+
+    async def aanalyze(self, payload: ComplaintPayload, mode=None) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            delay = float(payload.notes or 0)
+            await asyncio.sleep(delay)
+            if "فشل" in payload.complaint_text:
+                raise RuntimeError("provider down")
+            return payload.complaint_text
+        finally:
+            self.active -= 1
+
+
+def item(item_id: str, text: str, delay: float) -> BatchItem:
+    return BatchItem(
+        id=item_id,
+        payload=ComplaintPayload(
+            complaint_text=text,
+            company=CompanyDetails(name="سريع"),
+            notes=str(delay),
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_batch_streams_out_of_order_and_isolates_errors():
+    orchestrator = SlowOrchestrator()
+    items = [
+        item("slow", "شكوى بطيئة جداً في المعالجة", 0.05),
+        item("bad", "شكوى ستؤدي إلى فشل المزود", 0.0),
+        item("fast", "شكوى سريعة في المعالجة", 0.01),
+    ]
+
+    results = [result async for result in run_batch(orchestrator, iter(items), concurrency=2)]
+
+    assert [result.id for result in results] == ["bad", "fast", "slow"]
+    assert results[0].ok is False and "provider down" in results[0].error
+    assert results[2].result == "شكوى بطيئة جداً في المعالجة"
+    assert orchestrator.peak == 2
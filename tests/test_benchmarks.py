@@ -0,0 +1,44 @@
+import json
+
+from benchmarks.imports import ROOT, parse_importtime, sample, script_imports
+from benchmarks.run import main, percentile
+
+
+def test_percentile_interpolates():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert percentile([5.0], 0.99) == 5.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_benchmark_reports_json(tmp_path):
+    output = tmp_path / "bench.json"
+    fast = ["--latency-ms", "1", "--latency-sigma", "0", "--tokens-per-second", "1000000", "-n", "6"]
+
+    assert main(["--target", "orchestrator", "-c", "1,3", "-o", str(output), *fast]) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert [result["concurrency"] for result in report["results"]] == [1, 3]
+    first = report["results"][0]
+    assert first["requests"] == 6 and first["errors"] == 0
+    assert first["llm_calls"] == 24
+    assert set(first["latency_ms"]) == {"mean", "p50", "p90", "p95", "p99", "max"}
+
+    assert main(["--target", "api", "--endpoint", "stream", "-c", "2", "-o", str(output), *fast]) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["results"][0]["errors"] == 0
+
+
+def test_importtime_rows_and_script_imports():
+    rows = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   core.schemas\n"
+        "import time:       300 |        420 | core.config\n"
+    )
+    assert rows[0] == {"name": "core.schemas", "depth": 1, "self_us": 120, "cumulative_us": 120}
+    assert rows[1]["depth"] == 0
+    assert "core.config" in script_imports(ROOT / "frontend" / "app.py")
+
+
+def test_provider_sdks_load_only_when_a_client_is_built():
+    loaded = {row["name"] for row in sample(["backend.main"])["rows"]}
+    assert "core.config" in loaded
+    assert not {"google.generativeai", "httpx", "core.llm.gemini"} & loaded
@@ -0,0 +1,87 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from core.agents.base import LlamaIndexAgent
+from core.services.cache import MemoryLRUCache, ResponseCache, SQLiteCache, make_cache_key
+
+
+class CountingLLM:
+    provider = "fake"
+    model = "fake-1"
+    temperature = 0.2
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def acomplete(self, prompt: str):
+        self.calls += 1
+        return SimpleNamespace(text=f"جواب {self.calls}")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+
+def test_disk_hits_are_promoted_and_survive_restart(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    first = ResponseCache(disk=SQLiteCache(str(path)))
+    key = make_cache_key("fake", "fake-1", 0.2, "prompt")
+    first.set(key, "value")
+    first.close()
+
+    second = ResponseCache(memory=MemoryLRUCache(8), disk=SQLiteCache(str(path)))
+    assert second.get(key) == "value"
+    assert second.get(key) == "value"
+    assert second.stats()["disk_hits"] == 1
+    assert second.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_enforces_size_budget(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=1000)
+    for index in range(SQLiteCache._EVICT_EVERY):
+        disk.set(f"k{index}", "x" * 100)
+    (total,) = disk._conn.execute("SELECT SUM(size) FROM llm_cache").fetchone()
+    assert total <= 1000
+    assert disk.get(f"k{SQLiteCache._EVICT_EVERY - 1}") is not None
+
+
+@pytest.mark.asyncio
+async def test_agent_reuses_cached_answer():
+    llm = CountingLLM()
+    agent = LlamaIndexAgent(llm=llm, system_prompt="نظام", cache=ResponseCache(memory=MemoryLRUCache(8)))
+
+    first = await agent.achat("رسالة")
+    second = await agent.achat("رسالة")
+
+    assert first == second
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cache_calls_keep_disk_io_off_the_loop(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    threads = []
+    original = disk.get
+
+    def recording_get(key):
+        threads.append(threading.get_ident())
+        return original(key)
+
+    disk.get = recording_get
+    cache = ResponseCache(memory=MemoryLRUCache(8), disk=disk)
+    await cache.aset("k", "v")
+    cache.memory.delete("k")
+    assert await cache.aget("k") == "v"
+    assert await cache.aget("k") == "v"  # promoted to memory
+    assert threads and threading.get_ident() not in threads and len(threads) == 1
+    await cache.adelete("k")
+    assert await cache.aget("k") is None
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
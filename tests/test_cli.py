@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core import cli
+from core.config import AppSettings
+from core.services.orchestrator import ComplaintOrchestrator
+
+
+class EchoLLM:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def acomplete(self, prompt: str):
+        self.calls += 1
+        return SimpleNamespace(text="نتيجة")
+
+
+def write_rows(path, count):
+    with path.open("w", encoding="utf-8") as handle:
+        for index in range(count):
+            row = {
+                "id": f"c{index}",
+                "complaint_text": f"شكوى رقم {index} عن تأخير التوصيل لعدة أيام",
+                "company": "سريع",
+            }
+            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+        handle.write(json.dumps({"id": "short", "complaint_text": "قصير"}) + "\n")
+
+
+@pytest.mark.asyncio
+async def test_analyze_file_resumes_from_output(tmp_path, monkeypatch):
+    llm = EchoLLM()
+    settings = AppSettings(DEDUP_ENABLED=False)
+    monkeypatch.setattr(cli, "get_settings", lambda: settings)
+    monkeypatch.setattr(
+        cli, "ComplaintOrchestrator", lambda settings: ComplaintOrchestrator(settings=settings, llm=llm)
+    )
+    source = tmp_path / "in.jsonl"
+    output = tmp_path / "out.jsonl"
+    write_rows(source, 5)
+    args = cli.build_parser().parse_args(["analyze-file", str(source), "-o", str(output), "--limit", "3"])
+
+    assert await cli.analyze_file(args) == 0
+    assert llm.calls == 3 * 4
+
+    # Simulate a crash that tore the last line, then resume without a limit.
+    with output.open("a", encoding="utf-8") as handle:
+        handle.write('{"id": "c9", "ok": tr')
+    args = cli.build_parser().parse_args(["analyze-file", str(source), "-o", str(output)])
+    assert await cli.analyze_file(args) == 0
+
+    ids = [json.loads(line)["id"] for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(ids) == [f"c{index}" for index in range(5)]
+    assert llm.calls == 5 * 4
+    errors = (tmp_path / "out.jsonl.errors").read_text(encoding="utf-8")
+    assert "row-6" in errors
+
+    # Invalid rows are recorded by input row, so another resume does not report them again.
+    assert await cli.analyze_file(args) == 0
+    assert (tmp_path / "out.jsonl.errors").read_text(encoding="utf-8") == errors
+    assert llm.calls == 5 * 4
+
+
+def test_progress_interval_must_be_positive(capsys):
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(["analyze-file", "in.jsonl", "-o", "out.jsonl", "--progress-every", "0"])
+    assert "positive integer" in capsys.readouterr().err
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from core.services.coalesce import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "done"
+
+    results = await asyncio.gather(*(flight.run("k", work) for _ in range(5)))
+
+    assert results == ["done"] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+
+@pytest.mark.asyncio
+async def test_failure_propagates_and_key_is_released():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0)
+        raise RuntimeError("provider down")
+
+    outcomes = await asyncio.gather(flight.run("k", boom), flight.run("k", boom), return_exceptions=True)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_keeps_work_for_others():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.02)
+        return "done"
+
+    leader = asyncio.create_task(flight.run("k", work))
+    await started.wait()
+    follower = asyncio.create_task(flight.run("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
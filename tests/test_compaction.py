@@ -0,0 +1,60 @@
+from core.services.compaction import (
+    ContextCompactor,
+    compact_classification,
+    compact_emotions,
+    compact_strategy,
+    estimate_tokens,
+    truncate_to_budget,
+)
+
+STRATEGY = """
+**خطة الحل:**
+
+1. **التواصل مع العميل**
+   - الإجراء المطلوب: الاتصال بالعميل والاعتذار عن التأخير.
+   - المسؤول: فريق خدمة العملاء
+   - الجدول الزمني: خلال 24 ساعة
+   - معيار النجاح: تأكيد العميل استلام الاعتذار.
+
+2. الإجراء المطلوب: تتبع الشحنة مع شركة الشحن.
+   - المسؤول: قسم الشحن
+   - الجدول الزمني: خلال يومين
+"""
+
+
+def test_compact_classification_keeps_label_and_reason():
+    text = "**نوع الشكوى:** مشكلة في التوصيل\nالسبب: تأخر الطلب أسبوعًا كاملًا. وتفاصيل أخرى طويلة."
+    assert compact_classification(text) == "مشكلة في التوصيل — السبب: تأخر الطلب أسبوعًا كاملًا."
+
+
+def test_compact_emotions_lists_emotions_and_tone():
+    text = "المشاعر الأساسية: العميل يشعر بغضب شديد وإحباط.\nشرح مطول...\nالنبرة المقترحة: هادئة ومتعاطفة"
+    assert compact_emotions(text) == "المشاعر: غضب، إحباط | النبرة: هادئة ومتعاطفة"
+
+
+def test_compact_strategy_keeps_step_titles_and_timelines():
+    assert compact_strategy(STRATEGY) == (
+        "1. التواصل مع العميل (خلال 24 ساعة)\n2. تتبع الشحنة مع شركة الشحن. (خلال يومين)"
+    )
+
+
+def test_truncate_to_budget_cuts_at_sentence_boundary():
+    text = "جملة أولى قصيرة. " + "كلمة " * 200
+    cut = truncate_to_budget(text, 10)
+    assert cut == "جملة أولى قصيرة. …"
+    assert estimate_tokens(truncate_to_budget("كلمة " * 200, 30)) <= 32
+
+
+def test_compactor_enforces_budget():
+    compactor = ContextCompactor({"reply": 40})
+    inputs = {
+        "classification": "نوع الشكوى: مشكلة في التوصيل\nالسبب: تأخر.",
+        "emotion": "غضب\n" + "شرح " * 300,
+        "strategy": STRATEGY + "\n".join(f"{i}. خطوة إضافية طويلة جدا رقم {i}" for i in range(3, 40)),
+    }
+    compacted = compactor.compact("reply", inputs)
+    assert set(compacted) == set(inputs)
+    assert sum(estimate_tokens(text) for text in compacted.values()) <= 40 + 3
+    assert sum(estimate_tokens(text) for text in compacted.values()) < sum(
+        estimate_tokens(text) for text in inputs.values()
+    ) / 5
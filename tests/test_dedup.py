@@ -0,0 +1,25 @@
+from core.schemas import CompanyDetails, ComplaintPayload
+from core.services.dedup import NearDuplicateIndex
+from core.services.normalize import normalize_arabic
+
+BASE = "طلبت شحنة غذاء من المتجر وتأخر السائق ساعتين كاملتين ولم يرد على الاتصالات المتكررة، وأريد استرجاع المبلغ فوراً."
+
+
+def payload(text: str, company: str = "سريع") -> ComplaintPayload:
+    return ComplaintPayload(complaint_text=text, company=CompanyDetails(name=company))
+
+
+def test_normalize_folds_spelling_variants():
+    assert normalize_arabic("إسترجاعُ  المبلغِ   فـــوراً") == normalize_arabic("استرجاع المبلغ فورا")
+    assert normalize_arabic("الطلبية رقم ١٢٣") == "الطلبيه رقم 123"
+
+
+def test_near_duplicate_is_reused_within_company_only():
+    index = NearDuplicateIndex(threshold=0.9)
+    sections = {"classification": "توصيل", "emotion": "غضب", "strategy": "خطة", "reply": "رد"}
+    index.add(payload(BASE), sections)
+
+    variant = BASE.replace("أريد", "اريد").replace("كاملتين", "كاملتين تقريبا")
+    assert index.lookup(payload(variant)) == sections
+    assert index.lookup(payload(BASE, company="شركة أخرى")) is None
+    assert index.lookup(payload("المنتج وصل مكسوراً وأحتاج استبداله بمنتج جديد سليم")) is None
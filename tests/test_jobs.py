@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.main import _run_job, app
+from benchmarks.fake_llm import FakeLLM, FakeLLMProfile
+from core.config import AppSettings
+from core.services.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobStore, JobWorkerPool
+from core.services.orchestrator import ComplaintOrchestrator
+
+
+def test_expired_lease_makes_job_visible_again_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    queued = store.enqueue('{"n": 1}')
+    first = store.claim(visibility_timeout=0.05, max_attempts=2)
+    assert first.id == queued.id and first.status == RUNNING
+    assert store.claim(visibility_timeout=0.05, max_attempts=2) is None
+    store.close()
+
+    # The worker "crashed"; a new process reopens the queue after the lease expires.
+    time.sleep(0.06)
+    store = JobStore(path)
+    second = store.claim(visibility_timeout=60, max_attempts=2)
+    assert (second.id, second.attempts) == (queued.id, 2)
+    assert not store.complete(first, "stale")
+    assert store.complete(second, "done")
+    assert store.get(queued.id).result == "done"
+    assert store.stats()[SUCCEEDED] == 1
+
+
+def test_jobs_out_of_attempts_fail_when_lease_expires(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = store.enqueue("{}")
+    store.claim(visibility_timeout=0, max_attempts=1)
+    assert store.claim(visibility_timeout=0, max_attempts=1) is None
+    assert store.get(job.id).status == FAILED
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_retries_failed_attempts(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    calls = []
+
+    async def handler(payload: str) -> str:
+        calls.append(payload)
+        if len(calls) == 1:
+            raise ConnectionError("provider unreachable")
+        return payload.upper()
+
+    pool = JobWorkerPool(store, handler, workers=2, retry_backoff_seconds=0, poll_interval=0.01)
+    pool.start()
+    job = store.enqueue("ok")
+    for _ in range(200):
+        if store.get(job.id).status == SUCCEEDED:
+            break
+        await asyncio.sleep(0.01)
+    await pool.stop()
+
+    finished = store.get(job.id)
+    assert (finished.status, finished.result, finished.attempts) == (SUCCEEDED, "OK", 2)
+    assert calls == ["ok", "ok"]
+
+
+@pytest.mark.asyncio
+async def test_stopping_workers_hands_running_jobs_back(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    started = asyncio.Event()
+
+    async def handler(payload: str) -> str:
+        started.set()
+        await asyncio.sleep(60)
+        return payload
+
+    pool = JobWorkerPool(store, handler, workers=1, visibility_timeout=300, poll_interval=0.01)
+    pool.start()
+    job = store.enqueue("slow")
+    await asyncio.wait_for(started.wait(), 2)
+    assert store.get(job.id).status == RUNNING
+    await pool.stop()
+
+    released = store.get(job.id)
+    assert (released.status, released.attempts, released.lease) == (QUEUED, 0, None)
+    # Visible at once to the next process, without waiting out the 300s lease.
+    assert store.claim(visibility_timeout=300, max_attempts=3).attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_jobs_api_returns_id_then_result(tmp_path):
+    llm = FakeLLM(FakeLLMProfile(latency_ms=1, latency_sigma=0, output_tokens=30, tokens_per_second=1e6))
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(LLM_WARMUP=False), llm=llm)
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    pool = JobWorkerPool(store, lambda payload: _run_job(orchestrator, payload), poll_interval=0.01)
+    app.state.orchestrator, app.state.jobs, app.state.job_workers = orchestrator, store, pool
+    body = {
+        "complaint_text": "طلبت شحنة غذاء وتأخر السائق ساعتين ولم يرد على الاتصالات.",
+        "company": {"name": "سريع", "service": "توصيل المنازل"},
+    }
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            created = await client.post("/jobs", json=body)
+            assert created.status_code == 202
+            assert created.json()["status"] == QUEUED
+            assert created.headers["location"] == f"/jobs/{created.json()['id']}"
+
+            pool.start()
+            for _ in range(200):
+                job = (await client.get(created.headers["location"])).json()
+                if job["status"] == SUCCEEDED:
+                    break
+                await asyncio.sleep(0.01)
+            assert job["result"]["category"] == "delivery_issue"
+            assert (await client.get("/jobs/missing")).status_code == 404
+    finally:
+        await pool.stop()
+        del app.state.orchestrator, app.state.jobs, app.state.job_workers
+        store.close()
+
+
+def test_claims_prune_jobs_finished_before_the_retention_window(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), retention_seconds=0.05, prune_interval=0)
+    old = store.enqueue("old")
+    store.complete(store.claim(visibility_timeout=60, max_attempts=1), "done")
+    time.sleep(0.06)
+    fresh = store.enqueue("fresh")
+    store.complete(store.claim(visibility_timeout=60, max_attempts=1), "done")
+
+    store.claim(visibility_timeout=60, max_attempts=1)
+    assert store.get(old.id) is None
+    assert store.get(fresh.id).status == SUCCEEDED
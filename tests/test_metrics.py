@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from core.services.metrics import MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ["agent"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["agent"], buckets=(0.1, 1))
+    calls.inc("reply")
+    calls.inc("reply", amount=2)
+    latency.observe("reply", value=0.05)
+    latency.observe("reply", value=0.5)
+    latency.observe("reply", value=3)
+
+    text = registry.render()
+
+    assert '# TYPE calls_total counter\ncalls_total{agent="reply"} 3\n' in text
+    assert 'latency_seconds_bucket{agent="reply",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{agent="reply",le="1"} 2' in text
+    assert 'latency_seconds_bucket{agent="reply",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{agent="reply"} 3' in text
+    assert latency.quantile(0.5, "reply") == 1
+    assert registry.counter("calls_total", "Calls.", ["agent"]) is calls
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Calls.")
+
+
+def test_metrics_endpoint_records_http_requests():
+    # Without the lifespan no orchestrator (or API key) is needed.
+    client = TestClient(app)
+    assert client.get("/health").status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in response.text
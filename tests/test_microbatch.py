@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.agents.classification import ClassificationAgent
+from core.prompts.parsing import split_numbered
+from core.schemas import CompanyDetails, ComplaintPayload
+from core.services.microbatch import ClassificationBatcher
+
+
+class BatchLLM:
+    """Answers numbered prompts, but drops the answer for the last complaint."""
+
+    def __init__(self) -> None:
+        self.prompts = []
+
+    async def acomplete(self, prompt: str):
+        self.prompts.append(prompt)
+        count = prompt.count("=== الشكوى ") - 1  # the format instruction mentions it once
+        if count > 1:
+            text = "\n".join(f"=== الشكوى {index} ===\nتصنيف {index}" for index in range(1, count))
+        else:
+            text = "تصنيف فردي"
+        return SimpleNamespace(text=text)
+
+
+def payload(index: int) -> ComplaintPayload:
+    return ComplaintPayload(complaint_text=f"شكوى رقم {index} حول تأخر الشحنة", company=CompanyDetails(name="سريع"))
+
+
+def test_split_numbered_accepts_arabic_digits():
+    assert split_numbered("=== الشكوى ١ ===\nأ\n=== الشكوى 2 ===\nب", 2) == {1: "أ", 2: "ب"}
+
+
+@pytest.mark.asyncio
+async def test_batcher_groups_calls_and_falls_back_for_missing_items():
+    llm = BatchLLM()
+    batcher = ClassificationBatcher(ClassificationAgent(llm=llm), window_ms=5, max_items=8)
+
+    results = await asyncio.gather(*(batcher.aclassify(payload(index)) for index in range(3)))
+
+    assert results == ["تصنيف 1", "تصنيف 2", "تصنيف فردي"]
+    assert len(llm.prompts) == 2
+    assert batcher.stats()["fallbacks"] == 1
@@ -0,0 +1,121 @@
+import json
+
+import httpx
+import pytest
+
+from core.config import AppSettings
+from core.llm.openai_compat import OpenAICompatibleLLM
+from core.services.resilience import is_transient
+from core.services.transport import is_overload
+
+
+def completion(text: str) -> dict:
+    return {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+
+
+def sse(*pieces: str) -> bytes:
+    lines = [": keep-alive"]
+    lines += ["data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}) for piece in pieces]
+    lines.append("data: [DONE]")
+    return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def build_client(handler, **kwargs) -> OpenAICompatibleLLM:
+    return OpenAICompatibleLLM(
+        model="local-model",
+        api_key="secret",
+        base_url="http://inference.local/v1/",
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_acomplete_reuses_pooled_client_and_sends_schema():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=completion("مرحبا"))
+
+    llm = build_client(handler)
+    assert (await llm.acomplete("hello")).text == "مرحبا"
+    pooled = llm._pool.client
+    await llm.acomplete("hello", response_schema={"type": "object"})
+    assert llm._pool.client is pooled
+    await llm.aclose()
+
+    assert str(requests[0].url) == "http://inference.local/v1/chat/completions"
+    assert requests[0].headers["authorization"] == "Bearer secret"
+    first, second = (json.loads(request.content) for request in requests)
+    assert first["model"] == "local-model" and "response_format" not in first
+    assert second["response_format"]["json_schema"]["schema"] == {"type": "object"}
+
+
+@pytest.mark.asyncio
+async def test_astream_yields_deltas_until_done():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=sse("مرح", "", "با"), headers={"content-type": "text/event-stream"})
+
+    llm = build_client(handler)
+    assert [piece async for piece in llm.astream("hello")] == ["مرح", "با"]
+    assert llm.stats()["transport"] == "httpx"
+    await llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_throttling_surfaces_as_overload():
+    llm = build_client(lambda request: httpx.Response(429, json={"error": "slow down"}))
+    with pytest.raises(httpx.HTTPStatusError) as caught:
+        await llm.acomplete("hello")
+    assert is_overload(caught.value)
+    with pytest.raises(httpx.HTTPStatusError):
+        [piece async for piece in llm.astream("hello")]
+    await llm.aclose()
+
+
+def test_settings_build_openai_provider_for_keyless_local_server():
+    settings = AppSettings(
+        LLM_PROVIDER="openai",
+        LLM_API_KEY="",
+        LLM_BASE_URL="http://localhost:8000/v1",
+        LLM_MODEL="qwen2.5-7b",
+        LLM_POOL_MAX_CONNECTIONS=4,
+    )
+    llm = settings.build_llm()
+    assert isinstance(llm, OpenAICompatibleLLM)
+    assert llm.base_url == "http://localhost:8000/v1"
+    assert llm.stats()["max_connections"] == 4
+
+    with pytest.raises(ValueError):
+        AppSettings(LLM_PROVIDER="openai", LLM_API_KEY="").build_llm()
+
+
+def test_default_key_is_never_sent_to_another_provider():
+    settings = AppSettings(LLM_PROVIDER="gemini", LLM_API_KEY="gemini-secret", LLM_PROVIDER_REPLY="openai")
+    with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+        settings.build_llm("reply")
+
+    settings = AppSettings(
+        LLM_PROVIDER="gemini", LLM_API_KEY="gemini-secret", LLM_PROVIDER_REPLY="openai", OPENAI_API_KEY="openai-secret"
+    )
+    reply = settings.build_llm("reply")
+    assert reply._headers == {"Authorization": "Bearer openai-secret"}
+    assert reply.base_url == "https://api.openai.com/v1"
+
+    # A keyless local default plus a Gemini agent with a key of its own.
+    local = AppSettings(
+        LLM_PROVIDER="openai", LLM_BASE_URL="http://localhost:8000/v1", LLM_PROVIDER_REPLY="gemini", GEMINI_API_KEY="g"
+    )
+    assert local.provider_credentials("gemini") == ("g", None)
+    assert local.provider_credentials("openai") == ("", "http://localhost:8000/v1")
+
+
+def test_sync_path_is_refused_and_connection_resets_are_transient():
+    llm = build_client(lambda request: httpx.Response(200, json=completion("x")))
+    with pytest.raises(NotImplementedError):
+        llm.complete("hello")
+    request = httpx.Request("POST", "http://inference.local/v1/chat/completions")
+    for error in (httpx.ReadError, httpx.WriteError, httpx.WriteTimeout, httpx.PoolTimeout):
+        assert is_transient(error("connection reset", request=request))
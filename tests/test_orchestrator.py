@@ -1,73 +1,11 @@
-import asyncio
-
 import pytest
 
-from core.schemas import (
-    ClassificationResult,
-    ComplaintAnalysis,
-    ComplaintCategory,
-    ComplaintPayload,
-    CompanyDetails,
-    ResolutionBundle,
-    RouterDecision,
-    StrategyStep,
-)
-from core.services.orchestrator import ComplaintOrchestrator
+from backend.main import _collect_component_metrics
+from benchmarks.fake_llm import FakeLLM, FakeLLMProfile
 from core.config import AppSettings
-
-
-class FakeRouter:
-    async def aroute(self, payload: ComplaintPayload) -> RouterDecision:
-        return RouterDecision(
-            category=ComplaintCategory.DELIVERY,
-            confidence=0.9,
-            rationale="نص يصف تأخير التوصيل",
-        )
-
-
-class FakeClassifier:
-    async def aclassify(self, payload: ComplaintPayload, routed_category: ComplaintCategory) -> ClassificationResult:
-        return ClassificationResult(
-            category=routed_category,
-            summary="تأخر السائق ولم يتواصل مع العميل.",
-            emotions=["غضب", "قلق"],
-            risk_level="high",
-        )
-
-
-class FakeResolution:
-    async def aresolve(self, payload: ComplaintPayload, classification: ClassificationResult) -> ResolutionBundle:
-        steps = [
-            StrategyStep(
-                action_title="الاتصال بالعميل خلال 15 دقيقة",
-                owner_role="فريق خدمة العملاء",
-                timeline="فوري",
-                success_metric="تأكيد الرضا في المكالمة",
-            ),
-            StrategyStep(
-                action_title="مراجعة أداء السائق",
-                owner_role="فريق العمليات",
-                timeline="24 ساعة",
-                success_metric="اكتمال تقرير المتابعة",
-            ),
-            StrategyStep(
-                action_title="تعويض العميل بقسيمة",
-                owner_role="فريق الولاء",
-                timeline="24 ساعة",
-                success_metric="إرسال القسيمة",
-            ),
-        ]
-        return ResolutionBundle(strategy=steps, formal_reply="نعتذر عن التأخير...")
-
-
-class FakePolicy:
-    async def areview(self, payload, classification, resolution) -> dict:
-        return {
-            "summary": classification.summary,
-            "emotions": classification.emotions,
-            "strategy": [step.model_dump() for step in resolution.strategy],
-            "formal_reply": resolution.formal_reply,
-        }
+from core.schemas import ComplaintAnalysis, ComplaintCategory, ComplaintPayload, CompanyDetails
+from core.services.metrics import REGISTRY
+from core.services.orchestrator import ComplaintOrchestrator
 
 
 def build_payload() -> ComplaintPayload:
@@ -78,19 +16,74 @@ def build_payload() -> ComplaintPayload:
     )
 
 
+def build_orchestrator(**overrides) -> ComplaintOrchestrator:
+    llm = FakeLLM(FakeLLMProfile(latency_ms=1, latency_sigma=0, output_tokens=30, tokens_per_second=1e6))
+    return ComplaintOrchestrator(settings=AppSettings(LLM_WARMUP=False, **overrides), llm=llm)
+
+
 @pytest.mark.asyncio
-async def test_orchestrator_with_fake_agents():
-    orchestrator = ComplaintOrchestrator(
-        settings=AppSettings(),
-        router_agent=FakeRouter(),
-        classifier_agent=FakeClassifier(),
-        resolution_agent=FakeResolution(),
-        policy_agent=FakePolicy(),
-    )
+async def test_orchestrator_structured_analysis():
+    orchestrator = build_orchestrator()
+
+    analysis = await orchestrator.aanalyze_structured(build_payload())
 
-    analysis = await orchestrator.aanalyze(build_payload())
     assert isinstance(analysis, ComplaintAnalysis)
     assert analysis.category == ComplaintCategory.DELIVERY
     assert len(analysis.strategy) == 3
     assert "نعتذر" in analysis.formal_reply
 
+
+@pytest.mark.asyncio
+async def test_orchestrator_text_report_runs_every_agent():
+    orchestrator = build_orchestrator(PIPELINE_PROFILE="sequential")
+
+    report = await orchestrator.aanalyze(build_payload())
+
+    assert orchestrator.llm.calls == 4
+    for title in ("## ١. التصنيف", "## ٢. فهم المشاعر", "## ٣. خطة المعالجة", "## ٤. الرد الرسمي"):
+        assert title in report
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_fused_mode_uses_one_call():
+    orchestrator = build_orchestrator()
+
+    await orchestrator.aanalyze(build_payload(), mode="fused")
+
+    assert orchestrator.llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_shares_one_client_per_model_profile():
+    settings = AppSettings(
+        LLM_PROVIDER="openai",
+        LLM_API_KEY="",
+        LLM_BASE_URL="http://localhost:8000/v1",
+        LLM_MODEL="large",
+        LLM_MODEL_CLASSIFICATION="small",
+        LLM_MAX_OUTPUT_TOKENS_CLASSIFICATION=64,
+        LLM_MODEL_EMOTION="small",
+        LLM_MAX_OUTPUT_TOKENS_EMOTION=64,
+        LLM_TEMPERATURE_REPLY=0.5,
+        LLM_CACHE_ENABLED=False,
+        LLM_WARMUP=False,
+    )
+    orchestrator = ComplaintOrchestrator(settings=settings)
+
+    classifier = orchestrator.llms["classification"]
+    assert classifier is orchestrator.llms["emotion"]
+    assert orchestrator.classification_agent.agent_wrapper.llm is classifier
+    assert (classifier.model, classifier.max_output_tokens) == ("small", 64)
+    assert orchestrator.llms["strategy"] is orchestrator.llm
+    assert orchestrator.fused_agent.agent_wrapper.llm is orchestrator.llm
+    assert orchestrator.llms["reply"].temperature == 0.5
+    assert len(orchestrator.clients) == 3
+    # One guard and one connection pool for the provider, whatever the model.
+    assert classifier.guard is orchestrator.llm.guard is orchestrator.llms["reply"].guard
+    assert classifier._pool is orchestrator.llm._pool
+
+    _collect_component_metrics(orchestrator)
+    metrics = REGISTRY.render()
+    assert 'llm_gate{client="default+strategy",field="limit"}' in metrics
+    assert 'llm_gate{client="classification+emotion",field="limit"}' in metrics
+    await orchestrator.aclose()
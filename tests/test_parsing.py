@@ -0,0 +1,32 @@
+from core.prompts.parsing import split_sections
+
+
+def test_split_sections_handles_mixed_headers():
+    text = """
+**١. التصنيف**
+التصنيف | مشكلة في التوصيل
+السبب: تأخر الطلب.
+
+## 2) تحليل المشاعر:
+غضب، إحباط
+
+---
+ثالثاً: خطة المعالجة
+- الاتصال بالعميل خلال 24 ساعة
+
+٤. الرد الرسميّ
+عزيزنا العميل، نعتذر عن التأخير.
+التصنيف: لا يبدأ قسمًا جديدًا هنا.
+"""
+    sections = split_sections(text)
+
+    assert list(sections) == ["classification", "emotion", "strategy", "reply"]
+    assert sections["classification"].startswith("التصنيف | مشكلة في التوصيل")
+    assert sections["emotion"] == "غضب، إحباط"
+    assert "24 ساعة" in sections["strategy"]
+    assert sections["reply"].endswith("لا يبدأ قسمًا جديدًا هنا.")
+
+
+def test_split_sections_inline_header_content():
+    sections = split_sections("التصنيف: استفسار عام\nالمشاعر - قلق")
+    assert sections == {"classification": "استفسار عام", "emotion": "قلق"}
@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from core.config import AppSettings
+from core.services.orchestrator import ComplaintOrchestrator
+from core.services.ratelimit import SharedRateLimiter
+from core.services.transport import InflightGate, LLMBackpressureError, ProviderGuard
+
+
+def _drain(path: str, attempts: int) -> int:
+    limiter = SharedRateLimiter(path, scope="gemini:flash", requests_per_minute=50)
+    granted = sum(limiter.try_acquire() == 0 for _ in range(attempts))
+    limiter.close()
+    return granted
+
+
+def test_worker_processes_share_one_request_budget(tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite3")
+    SharedRateLimiter(path, scope="gemini:flash", requests_per_minute=50).close()
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        granted = list(pool.map(_drain, [path] * 4, [30] * 4))
+
+    # 50 per minute refills under one request in the test's runtime.
+    assert 50 <= sum(granted) <= 51
+
+
+def test_token_budget_waits_for_both_dimensions_and_debits_output(tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite3")
+    first = SharedRateLimiter(path, scope="openai:small", requests_per_minute=600, tokens_per_minute=600)
+    second = SharedRateLimiter(path, scope="openai:small", requests_per_minute=600, tokens_per_minute=600)
+
+    assert first.try_acquire(tokens=500) == 0
+    second.debit(200)
+    wait = second.try_acquire(tokens=50)
+    assert wait == pytest.approx(15, abs=0.2)  # 150 tokens short at 10 per second
+    assert second.snapshot()["requests"]["level"] == pytest.approx(599, abs=1)
+    # Another scope (model) has a budget of its own.
+    assert SharedRateLimiter(path, scope="openai:large", tokens_per_minute=600).try_acquire(tokens=500) == 0
+
+
+@pytest.mark.asyncio
+async def test_guard_waits_for_shared_budget(tmp_path):
+    limiter = SharedRateLimiter(str(tmp_path / "ratelimit.sqlite3"), scope="gemini:flash", tokens_per_minute=600)
+    guard = ProviderGuard(InflightGate(4), rate_limiter=limiter, provider="gemini")
+    async with guard.call(tokens=600):
+        pass
+    await guard.charge(1)
+
+    started = time.perf_counter()
+    async with guard.call(tokens=1):
+        pass
+    assert 0.15 < time.perf_counter() - started < 0.5
+    assert guard.snapshot()["rate_limit"]["waits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_runs_off_the_event_loop_and_orchestrator_closes_it(tmp_path):
+    settings = AppSettings(
+        LLM_PROVIDER="openai",
+        LLM_API_KEY="",
+        LLM_BASE_URL="http://localhost:8000/v1",
+        LLM_RATE_LIMIT_TPM=600,
+        LLM_RATE_LIMIT_PATH=str(tmp_path / "ratelimit.sqlite3"),
+        LLM_CACHE_ENABLED=False,
+        LLM_WARMUP=False,
+    )
+    orchestrator = ComplaintOrchestrator(settings=settings)
+    limiter = orchestrator.llm.guard.rate_limiter
+    threads = []
+    original = limiter.try_acquire
+
+    def recording(**kwargs):
+        threads.append(threading.get_ident())
+        return original(**kwargs)
+
+    limiter.try_acquire = recording
+    async with orchestrator.llm.guard.call(tokens=10):
+        pass
+    assert threads and threading.get_ident() not in threads
+
+    await orchestrator.aclose()
+    with pytest.raises(sqlite3.ProgrammingError):
+        original(tokens=1)
+
+
+@pytest.mark.asyncio
+async def test_rejected_calls_spend_no_budget_and_snapshot_skips_the_write_lock(tmp_path):
+    limiter = SharedRateLimiter(str(tmp_path / "ratelimit.sqlite3"), scope="gemini:flash", requests_per_minute=60)
+    gate = InflightGate(1, max_waiting=1)
+    guard = ProviderGuard(gate, rate_limiter=limiter, provider="gemini")
+    await gate.acquire()
+    waiter = asyncio.ensure_future(gate.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(LLMBackpressureError):
+        async with guard.call():
+            pass
+    assert limiter.snapshot()["requests"]["level"] == pytest.approx(60, abs=0.5)
+
+    # Another thread waiting on the write lock must not stall monitoring reads.
+    with limiter._lock:
+        assert limiter.snapshot()["requests"]["capacity"] == 60
+    waiter.cancel()
+    gate.release()
+    limiter.close()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.fake_llm import FakeLLM, FakeLLMProfile
+from core.config import AppSettings
+from core.llm.replay import Cassette, CassetteMissError, ReplayLLM, prompt_key
+from core.schemas import CompanyDetails, ComplaintPayload
+from core.services.orchestrator import ComplaintOrchestrator
+
+
+def build_payload() -> ComplaintPayload:
+    return ComplaintPayload(
+        complaint_text="طلبت شحنة غذاء وتأخر السائق ساعتين ولم يرد على الاتصالات.",
+        company=CompanyDetails(name="سريع", service="توصيل المنازل"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_without_upstream(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    upstream = FakeLLM(FakeLLMProfile(latency_ms=20, latency_sigma=0, output_tokens=20, tokens_per_second=1e6))
+    recorder = ReplayLLM(Cassette(path), mode="record", upstream=upstream)
+    settings = AppSettings(LLM_WARMUP=False, DEDUP_ENABLED=False)
+
+    recorded = ComplaintOrchestrator(settings=settings, llm=recorder)
+    original = await recorded.aanalyze(build_payload())
+    chunks = [chunk async for chunk in recorded.astream(build_payload(), mode="fused")]
+    await recorded.aclose()
+    assert recorder.recorded == 5
+
+    player = ReplayLLM(Cassette(path), mode="replay", latency_scale=0)
+    replayed = ComplaintOrchestrator(settings=settings, llm=player)
+    started = time.perf_counter()
+    assert await replayed.aanalyze(build_payload()) == original
+    replayed_chunks = [chunk async for chunk in replayed.astream(build_payload(), mode="fused")]
+    assert time.perf_counter() - started < 0.05
+    assert replayed_chunks == chunks
+    assert player.stats()["replayed"] == 5
+
+
+@pytest.mark.asyncio
+async def test_replay_scales_latency_and_reports_misses(tmp_path):
+    cassette = Cassette(str(tmp_path / "cassette.jsonl"))
+    player = ReplayLLM(cassette, latency_scale=0.5)
+    cassette.append({"k": prompt_key("hello"), "t": 0.1, "r": "مرحبا"})
+    started = time.perf_counter()
+    assert (await player.acomplete("hello")).text == "مرحبا"
+    assert 0.04 < time.perf_counter() - started < 0.09
+
+    with pytest.raises(CassetteMissError):
+        await asyncio.wait_for(player.acomplete("never recorded"), 1)
+    assert player.misses == 1
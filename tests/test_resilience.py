@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from core.agents.base import LlamaIndexAgent
+from core.services.resilience import CallPolicy, ResilientCaller
+
+
+class ServiceUnavailable(Exception):
+    """Stands in for google.api_core.exceptions.ServiceUnavailable."""
+
+
+def fast_policy(**overrides) -> CallPolicy:
+    options = {"timeout_seconds": 1.0, "retries": 2, "backoff_seconds": 0, "backoff_max_seconds": 0}
+    options.update(overrides)
+    return CallPolicy(**options)
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    caller = ResilientCaller(fast_policy())
+    attempts = []
+
+    async def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ServiceUnavailable("503")
+        return "ok"
+
+    assert await caller.call("reply", flaky) == "ok"
+    assert caller.retries == 2
+
+
+@pytest.mark.asyncio
+async def test_other_errors_and_timeouts():
+    caller = ResilientCaller(fast_policy(stage_timeouts={"reply": 0.01}, retries=1))
+    attempts = []
+
+    async def broken() -> str:
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        await caller.call("classification", broken)
+    assert len(attempts) == 1
+
+    async def stuck() -> str:
+        await asyncio.sleep(1)
+        return "late"
+
+    with pytest.raises(asyncio.TimeoutError):
+        await caller.call("reply", stuck)
+    # The stage timeout covers all attempts, so nothing is left for a retry.
+    assert caller.timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_stage_timeout_bounds_retries_and_backoff():
+    caller = ResilientCaller(fast_policy(timeout_seconds=0.2, retries=5, backoff_seconds=0.04, backoff_max_seconds=0.08))
+    attempts = []
+
+    async def slow_then_failing() -> str:
+        attempts.append(1)
+        await asyncio.sleep(0.06)
+        raise ServiceUnavailable("503")
+
+    started = asyncio.get_running_loop().time()
+    with pytest.raises((ServiceUnavailable, asyncio.TimeoutError)):
+        await caller.call("reply", slow_then_failing)
+    assert asyncio.get_running_loop().time() - started < 0.25
+    assert 1 < len(attempts) < 6
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_p95_and_cancels_loser():
+    caller = ResilientCaller(fast_policy(hedge=True, hedge_min_samples=5, hedge_max_ratio=0.5))
+    for _ in range(10):
+        caller.latency("emotion").add(0.01)
+    caller.calls = 10
+    cancelled = []
+    started = []
+
+    async def slow_then_fast() -> str:
+        started.append(1)
+        try:
+            await asyncio.sleep(1 if len(started) == 1 else 0)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return f"call-{len(started)}"
+
+    assert await caller.call("emotion", slow_then_fast) == "call-2"
+    assert (caller.hedges_fired, caller.hedges_won) == (1, 1)
+    assert cancelled == [1]
+
+    # Once hedges reach the budget (50% of calls) slow calls are left alone.
+    caller.hedges_fired = caller.calls
+
+    async def slowish() -> str:
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert await caller.call("emotion", slowish) == "primary"
+    assert caller.hedges_fired == caller.calls - 1
+
+
+@pytest.mark.asyncio
+async def test_stream_is_not_retried_after_tokens_were_forwarded():
+    class BrokenStream:
+        calls = 0
+
+        async def astream(self, prompt: str):
+            BrokenStream.calls += 1
+            yield "جزء"
+            raise ServiceUnavailable("stream dropped")
+
+    agent = LlamaIndexAgent(
+        llm=BrokenStream(), system_prompt="", name="reply", caller=ResilientCaller(fast_policy())
+    )
+    tokens = []
+    with pytest.raises(ServiceUnavailable):
+        await agent.achat("مرحبا", on_token=tokens.append)
+    assert BrokenStream.calls == 1
+    assert tokens == ["جزء"]
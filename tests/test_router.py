@@ -0,0 +1,30 @@
+import itertools
+
+from core.schemas import ComplaintCategory
+from core.services.router import FastPathRouter
+
+PHRASES = {
+    ComplaintCategory.DELIVERY: ["تأخر وصول الطلب", "السائق لم يصل حتى الآن", "الشحنة متأخرة"],
+    ComplaintCategory.PAYMENT: ["تم خصم المبلغ مرتين", "رفضت البطاقة عند الدفع", "خصم من حسابي بدون طلب"],
+    ComplaintCategory.TECHNICAL: ["التطبيق يتوقف فجأة", "لا أستطيع تسجيل الدخول", "رسالة خطأ في الموقع"],
+}
+SUFFIXES = ["اليوم", "منذ يومين", "للمرة الثانية", "وأنا منزعج جداً"]
+
+
+def test_router_learns_separable_categories(tmp_path):
+    texts, labels = [], []
+    for category, phrases in PHRASES.items():
+        for phrase, suffix in itertools.product(phrases, SUFFIXES):
+            texts.append(f"{phrase} {suffix}")
+            labels.append(category)
+
+    router = FastPathRouter()
+    router.fit(texts, labels, epochs=30)
+    path = tmp_path / "router.npz"
+    router.save(str(path))
+    loaded = FastPathRouter.load(str(path))
+
+    decision = loaded.decide("الشحنة متأخرة كثيراً")
+    assert decision.category == ComplaintCategory.DELIVERY
+    assert decision.confidence > 0.5
+    assert loaded.decide("تم خصم المبلغ مرتين من البطاقة").category == ComplaintCategory.PAYMENT
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from core.services.scheduler import DEPENDENCY_PROFILES, Stage, StageScheduler
+
+
+def _stage(name, requires, log, delay=0.02):
+    async def run(inputs):
+        log.append(("start", name, sorted(inputs)))
+        await asyncio.sleep(delay)
+        log.append(("done", name))
+        return f"{name}-out"
+
+    return Stage(name=name, run=run, requires=requires)
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_overlap():
+    log = []
+    profile = DEPENDENCY_PROFILES["parallel"]
+    scheduler = StageScheduler(_stage(name, deps, log) for name, deps in profile.items())
+
+    result = await scheduler.run()
+
+    assert result.outputs["reply"] == "reply-out"
+    assert set(result.timings) == set(profile)
+    first_two = {entry[1] for entry in log[:2]}
+    assert first_two == {"classification", "emotion"}
+    assert ("start", "reply", ["classification", "emotion", "strategy"]) in log
+
+
+def test_cycle_is_rejected():
+    async def noop(inputs):
+        return ""
+
+    with pytest.raises(ValueError):
+        StageScheduler([Stage("a", noop, ("b",)), Stage("b", noop, ("a",))])
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import AppSettings
+from core.schemas import CompanyDetails, ComplaintPayload
+from core.services.orchestrator import ComplaintOrchestrator
+
+
+class StreamingLLM:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    async def acomplete(self, prompt: str):
+        return SimpleNamespace(text=self.text)
+
+    async def astream(self, prompt: str):
+        for word in self.text.split(" "):
+            await asyncio.sleep(0)
+            yield word + " "
+
+
+def build_payload() -> ComplaintPayload:
+    return ComplaintPayload(
+        complaint_text="طلبت شحنة غذاء وتأخر السائق ساعتين ولم يرد على الاتصالات.",
+        company=CompanyDetails(name="سريع", service="توصيل المنازل"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_astream_tags_tokens_with_sections():
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(), llm=StreamingLLM("رد من النموذج"))
+
+    chunks = [chunk async for chunk in orchestrator.astream(build_payload(), profile="sequential")]
+
+    sections = [chunk.section for chunk in chunks]
+    assert sections[0] == "classification"
+    assert sections[-1] == "reply"
+    assert sections.count("emotion") == 3
+    assert "".join(c.payload for c in chunks if c.section == "strategy").strip() == "رد من النموذج"
+
+
+@pytest.mark.asyncio
+async def test_astream_fused_splits_sections():
+    text = "١. التصنيف\nتوصيل\n٢. فهم المشاعر\nغضب\n٣. خطة المعالجة\nاتصال\n٤. الرد الرسمي\nنعتذر"
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(), llm=StreamingLLM(text))
+
+    chunks = [chunk async for chunk in orchestrator.astream(build_payload(), mode="fused")]
+
+    joined = {}
+    for chunk in chunks:
+        joined[chunk.section] = joined.get(chunk.section, "") + chunk.payload
+    assert list(joined) == ["classification", "emotion", "strategy", "reply"]
+    assert joined["reply"].strip() == "نعتذر"
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from backend.main import app, get_orchestrator
+from core.config import AppSettings
+from core.prompts.parsing import parse_structured
+from core.schemas import CompanyDetails, ComplaintCategory, ComplaintPayload
+from core.services.cache import MemoryLRUCache, ResponseCache, SQLiteCache
+from core.services.orchestrator import ComplaintOrchestrator
+from core.services.transport import CircuitOpenError, LLMBackpressureError
+
+ANALYSIS = {
+    "category": "delivery_issue",
+    "confidence": 0.9,
+    "rationale": "تأخر الطلب",
+    "summary": "تأخر توصيل الطلب ساعتين.",
+    "emotions": ["غضب", "إحباط"],
+    "risk_level": "high",
+    "strategy": [
+        {
+            "action_title": "التواصل مع العميل",
+            "owner_role": "فريق خدمة العملاء",
+            "timeline": "خلال 24 ساعة",
+            "success_metric": "تأكيد العميل",
+        }
+    ],
+    "formal_reply": "عزيزنا العميل، نعتذر عن التأخير.",
+}
+
+
+class ScriptedLLM:
+    def __init__(self, *replies: str) -> None:
+        self.replies = list(replies)
+        self.schemas = []
+
+    async def acomplete(self, prompt: str, *, response_schema=None):
+        self.schemas.append(response_schema)
+        return SimpleNamespace(text=self.replies.pop(0))
+
+
+def build_payload() -> ComplaintPayload:
+    return ComplaintPayload(
+        complaint_text="طلبت شحنة غذاء وتأخر السائق ساعتين ولم يرد على الاتصالات.",
+        company=CompanyDetails(name="سريع", service="توصيل المنازل"),
+    )
+
+
+def test_parse_structured_repairs_fences_and_trailing_commas():
+    raw = "إليك النتيجة:\n```json\n" + json.dumps(ANALYSIS, ensure_ascii=False)[:-1] + ",}\n```"
+    parsed = parse_structured(raw.replace('"delivery_issue"', '"مشكلة في التوصيل"'))
+    assert parsed.category is ComplaintCategory.DELIVERY
+    assert parsed.strategy[0].timeline == "خلال 24 ساعة"
+
+
+@pytest.mark.asyncio
+async def test_aanalyze_structured_uses_schema_and_one_repair():
+    llm = ScriptedLLM('{"category": "delivery_issue", "summary": ', json.dumps(ANALYSIS, ensure_ascii=False))
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(), llm=llm)
+
+    analysis = await orchestrator.aanalyze_structured(build_payload())
+
+    assert analysis.router.category is ComplaintCategory.DELIVERY
+    assert analysis.emotions == ["غضب", "إحباط"]
+    assert orchestrator.structured_agent.repairs == 1
+    assert all(schema is not None for schema in llm.schemas)
+
+
+@pytest.mark.asyncio
+async def test_aanalyze_structured_gives_up_after_max_repairs():
+    llm = ScriptedLLM("not json", "still not json")
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(STRUCTURED_MAX_REPAIRS=1), llm=llm)
+
+    with pytest.raises(ValueError):
+        await orchestrator.aanalyze_structured(build_payload())
+
+
+@pytest.mark.asyncio
+async def test_invalid_replies_are_not_cached(tmp_path):
+    truncated = '{"category": "delivery_issue", "summary": '
+    llm = ScriptedLLM(truncated, truncated, json.dumps(ANALYSIS, ensure_ascii=False))
+    cache = ResponseCache(memory=MemoryLRUCache(8), disk=SQLiteCache(str(tmp_path / "cache.sqlite3")))
+    orchestrator = ComplaintOrchestrator(settings=AppSettings(COALESCE_ENABLED=False), llm=llm, cache=cache)
+
+    with pytest.raises(ValueError):
+        await orchestrator.aanalyze_structured(build_payload())
+    assert cache.writes == 0
+
+    analysis = await orchestrator.aanalyze_structured(build_payload())
+    assert analysis.category is ComplaintCategory.DELIVERY
+    assert len(llm.schemas) == 3
+    # The valid reply is cached and answers the next identical request.
+    await orchestrator.aanalyze_structured(build_payload())
+    assert len(llm.schemas) == 3
+
+
+class FailingOrchestrator:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+    async def aanalyze_structured(self, payload):
+        raise self.error
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error, status, retry_after",
+    [
+        (CircuitOpenError("circuit is open", retry_after=12.3), 503, "13"),
+        (LLMBackpressureError("queue is full"), 503, "1"),
+        (asyncio.TimeoutError(), 504, None),
+        (ValueError("bad JSON"), 502, None),
+    ],
+)
+async def test_analyze_maps_provider_failures_to_http_errors(error, status, retry_after):
+    app.dependency_overrides[get_orchestrator] = lambda: FailingOrchestrator(error)
+    body = {"complaint_text": "طلبت شحنة غذاء وتأخر السائق ساعتين.", "company": {"name": "سريع"}}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/analyze", json=body)
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == status
+    assert response.headers.get("retry-after") == retry_after
@@ -0,0 +1,186 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from core.services.resilience import CallPolicy, ResilientCaller
+from core.services.transport import (
+    AIMDLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    InflightGate,
+    LLMBackpressureError,
+    ProviderGuard,
+)
+
+
+class TooManyRequests(Exception):
+    """Stands in for google.api_core.exceptions.TooManyRequests."""
+
+
+@pytest.mark.asyncio
+async def test_gate_caps_concurrency_and_rejects_when_queue_full():
+    gate = InflightGate(2, max_waiting=1)
+    peak = 0
+    release = asyncio.Event()
+
+    async def call():
+        nonlocal peak
+        async with gate.slot():
+            peak = max(peak, gate.in_flight)
+            await release.wait()
+
+    running = [asyncio.create_task(call()) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert gate.in_flight == 2
+    assert gate.waiting == 1
+
+    with pytest.raises(LLMBackpressureError):
+        await gate.acquire()
+
+    release.set()
+    await asyncio.gather(*running)
+    assert peak == 2
+    assert gate.snapshot()["rejected"] == 1
+    assert gate.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    gate = InflightGate(1)
+    await gate.acquire()
+    waiter = asyncio.create_task(gate.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    gate.release()
+    assert gate.in_flight == 0
+    assert gate.waiting == 0
+
+
+def test_aimd_halves_on_overload_and_probes_back_up():
+    gate = InflightGate(8)
+    limiter = AIMDLimiter(gate, min_limit=1, max_limit=8)
+    limiter.on_overload()
+    assert gate.limit == 4
+    for _ in range(4):
+        limiter.on_success()
+    assert gate.limit == 5
+
+    limiter.baseline = 0.1
+    limiter._last_decrease = 0.0
+    limiter.on_success(0.5)  # five times the baseline
+    assert gate.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_then_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    guard = ProviderGuard(InflightGate(4), limiter=None, breaker=breaker)
+
+    async def call(error=None):
+        async with guard.call():
+            if error is not None:
+                raise error
+
+    for _ in range(2):
+        with pytest.raises(TooManyRequests):
+            await call(TooManyRequests())
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await call()
+
+    await asyncio.sleep(0.06)
+    assert breaker.state == "half_open"
+    await call()
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "opened": 1, "rejected": 1}
+
+
+@pytest.mark.asyncio
+async def test_deadlines_trip_breaker_and_cut_limit_but_hedge_losers_do_not():
+    gate = InflightGate(8)
+    limiter = AIMDLimiter(gate, min_limit=1, max_limit=8)
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    guard = ProviderGuard(gate, limiter=limiter, breaker=breaker)
+    caller = ResilientCaller(CallPolicy(timeout_seconds=0.02, retries=0))
+
+    async def slow_call():
+        async with guard.call():
+            await asyncio.sleep(1)
+
+    # Cancelled well before any deadline, like a hedge loser or a client disconnect.
+    task = asyncio.ensure_future(caller.call("reply", slow_call))
+    await asyncio.sleep(0.005)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert breaker.snapshot()["consecutive_failures"] == 0 and gate.limit == 8
+
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await caller.call("reply", slow_call)
+    assert breaker.state == "open"
+    assert gate.limit < 8 and limiter.decreases >= 1
+
+
+@pytest.mark.asyncio
+async def test_local_backpressure_does_not_close_half_open_breaker():
+    gate = InflightGate(1, max_waiting=1)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    guard = ProviderGuard(gate, breaker=breaker)
+    breaker.record_failure()
+    await asyncio.sleep(0.02)
+
+    await gate.acquire()
+    waiter = asyncio.ensure_future(gate.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(LLMBackpressureError):
+        async with guard.call():
+            pass
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True  # the probe slot is free again
+
+    waiter.cancel()
+    gate.release()
+
+
+@pytest.mark.asyncio
+async def test_deadline_spent_waiting_for_a_slot_is_not_a_provider_failure():
+    gate = InflightGate(4)
+    limiter = AIMDLimiter(gate, min_limit=1, max_limit=4)
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    guard = ProviderGuard(gate, limiter=limiter, breaker=breaker)
+    caller = ResilientCaller(CallPolicy(timeout_seconds=0.02, retries=0))
+    for _ in range(4):  # healthy calls hold every slot
+        await gate.acquire()
+
+    async def queued_call():
+        async with guard.call():
+            pass
+
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await caller.call("reply", queued_call)
+    assert breaker.state == "closed" and breaker.snapshot()["consecutive_failures"] == 0
+    assert gate.limit == 4 and limiter.decreases == 0
+    for _ in range(4):
+        gate.release()
+
+
+@pytest.mark.asyncio
+async def test_gate_wakes_a_waiter_on_another_threads_loop():
+    gate = InflightGate(1)
+    await gate.acquire()
+
+    async def other_session() -> int:
+        async with gate.slot():
+            return gate.in_flight
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        result = pool.submit(asyncio.run, other_session())
+        while gate.waiting == 0:
+            await asyncio.sleep(0.001)
+        gate.release()
+        assert await asyncio.wrap_future(result) == 1
+    assert gate.in_flight == 0 and gate.waiting == 0